@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Startup-time budget check for the command-line entry points.
+
+Runs each command with ``--help`` under ``python -X importtime`` in a fresh
+interpreter, sums the reported import times and fails if a command goes over
+its budget or imports a heavy dependency it should only load on demand:
+
+    python benchmarks/check_startup.py
+    python benchmarks/check_startup.py --budget-ms 200 --top 15
+
+The import total is measured by the interpreter itself, so it is far less
+noisy than wall-clock time; the best of --repeat runs is reported.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Commands checked by default, as argv after the interpreter
+COMMANDS = (
+    ('cli.py', '--help'),
+    ('cli.py', 'extract', '--help'),
+    ('cli.py', 'generate', '--help'),
+    ('cli.py', 'evaluate', '--help'),
+    ('cli.py', 'stream', '--help'),
+    ('cli.py', 'dedup', '--help'),
+    ('main.py', '--help'),
+    ('run_generation.py', '--help'),
+    ('run_attack_prompts.py', '--help'),
+    ('run_streaming.py', '--help'),
+    ('merge_shards.py', '--help'),
+    ('dedup_dataset.py', '--help'),
+)
+# Top-level packages that must only be imported by the code paths that use them
+HEAVY_MODULES = ('openai', 'httpx', 'pypdf', 'datasets', 'art', 'pyarrow', 'pandas', 'numpy', 'zstandard')
+DEFAULT_BUDGET_MS = 250.0
+DEFAULT_REPEAT = 3
+
+
+def measure(command: Tuple[str, ...]) -> Tuple[float, float, Dict[str, int]]:
+    """Run one command under -X importtime.
+
+    Returns:
+        (summed import time in ms, wall time in ms, self time in us per imported module).
+    """
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', *command],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if completed.returncode != 0:
+        raise RuntimeError(f"{' '.join(command)} exited with {completed.returncode}:\n{completed.stderr[-2000:]}")
+
+    modules = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(self_us)
+    return sum(modules.values()) / 1000, wall_ms, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check CLI startup import time against a budget')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help='Maximum summed import time per command, in milliseconds')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help='Runs per command; the fastest one is compared with the budget')
+    parser.add_argument('--top', type=int, default=0,
+                        help='Also list the N slowest modules of every command')
+
+    args = parser.parse_args()
+
+    failures: List[str] = []
+    print(f"{'command':<32}{'imports ms':>12}{'wall ms':>10}{'modules':>9}")
+    for command in COMMANDS:
+        label = ' '.join(command)
+        runs = [measure(command) for _ in range(max(1, args.repeat))]
+        import_ms, wall_ms, modules = min(runs, key=lambda run: run[0])
+        heavy = sorted({name.split('.')[0] for name in modules} & set(HEAVY_MODULES))
+        over = import_ms > args.budget_ms
+        status = []
+        if over:
+            status.append('OVER BUDGET')
+            failures.append(f'{label}: {import_ms:.1f} ms of imports (budget {args.budget_ms:.0f} ms)')
+        if heavy:
+            status.append(f"imports {', '.join(heavy)}")
+            failures.append(f"{label}: imports {', '.join(heavy)} at startup")
+        print(f"{label:<32}{import_ms:>12.1f}{wall_ms:>10.1f}{len(modules):>9}  {'  '.join(status)}")
+        for name, self_us in sorted(modules.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {self_us / 1000:>8.1f} ms  {name}")
+
+    if failures:
+        print(f"\n{len(failures)} startup check(s) failed:")
+        for failure in failures:
+            print(f'  {failure}')
+        sys.exit(1)
+    print(f'\nAll commands within the {args.budget_ms:.0f} ms import budget.')
+
+
+if __name__ == '__main__':
+    main()
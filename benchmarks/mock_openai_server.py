@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible chat-completions server for load testing.
+
+Serves POST .../chat/completions (streaming and non-streaming) with a
+configurable latency distribution, simulated token generation rate and
+injected 429/500/timeout failures, so concurrency, retry and throughput
+behaviour can be exercised without network access or API spend.
+
+    python benchmarks/mock_openai_server.py --port 8000 --latency lognormal:-1.5,0.6 \\
+        --tokens-per-sec 80 --error-rate-429 0.05 --rpm-limit 600
+    OPENROUTER_BASE_URL=http://127.0.0.1:8000/v1 python run_attack_prompts.py
+
+GET /stats returns request and error counters as JSON.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict
+
+REFUSAL = "I'm sorry, but I can't help with that request."
+FILLER = "This is a simulated response from the local mock server used for load testing."
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """Parse a latency distribution spec into a sampler returning seconds.
+
+    Supported specs: ``fixed:S``, ``uniform:LOW,HIGH``, ``exponential:MEAN``
+    and ``lognormal:MU,SIGMA`` (parameters of the underlying normal, in log-seconds).
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",")] if params else []
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "exponential":
+        return lambda: random.expovariate(1.0 / values[0])
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(values[0], values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+class MockState:
+    """Server configuration plus thread-safe counters and the RPM window."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.sample_latency = parse_latency(args.latency)
+        self.model_latency = {}
+        for override in args.model_latency or []:
+            model, _, spec = override.partition("=")
+            self.model_latency[model] = parse_latency(spec)
+        self.lock = threading.Lock()
+        self.window = deque()
+        self.stats = {"requests": 0, "completed": 0, "streamed": 0, "rate_limited": 0,
+                      "server_errors": 0, "timeouts": 0, "in_flight": 0, "max_in_flight": 0}
+
+    def count(self, key: str, delta: int = 1) -> None:
+        with self.lock:
+            self.stats[key] += delta
+            if key == "in_flight":
+                self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+
+    def over_concurrency_limit(self) -> bool:
+        if not self.args.max_in_flight:
+            return False
+        with self.lock:
+            return self.stats["in_flight"] >= self.args.max_in_flight
+
+    def over_rpm_limit(self) -> bool:
+        if not self.args.rpm_limit:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            while self.window and now - self.window[0] > 60:
+                self.window.popleft()
+            if len(self.window) >= self.args.rpm_limit:
+                return True
+            self.window.append(now)
+            return False
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    state: MockState = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.state.args.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Dict[str, str] = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: int, message: str, error_type: str, headers: Dict[str, str] = None) -> None:
+        self._send_json(status, {"error": {"message": message, "type": error_type, "code": status}}, headers)
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "mock-model", "object": "model"}]})
+        elif self.path.rstrip("/").endswith("/stats"):
+            with self.state.lock:
+                self._send_json(200, dict(self.state.stats))
+        else:
+            self._send_error(404, f"Unknown path: {self.path}", "not_found")
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_error(400, "Invalid JSON body", "invalid_request_error")
+            return
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_error(404, f"Unknown path: {self.path}", "not_found")
+            return
+
+        state = self.state
+        args = state.args
+        state.count("requests")
+
+        if (state.over_rpm_limit() or state.over_concurrency_limit()
+                or random.random() < args.error_rate_429):
+            state.count("rate_limited")
+            self._send_error(429, "Rate limit exceeded", "rate_limit_error",
+                             {"Retry-After": str(args.retry_after)})
+            return
+        if random.random() < args.error_rate_500:
+            state.count("server_errors")
+            self._send_error(500, "Internal server error", "server_error")
+            return
+        if random.random() < args.timeout_rate:
+            state.count("timeouts")
+            time.sleep(args.timeout_seconds)
+            self.close_connection = True
+            return
+
+        state.count("in_flight")
+        try:
+            self._complete(request)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            state.count("in_flight", -1)
+
+    def _complete(self, request: Dict[str, Any]) -> None:
+        args = self.state.args
+        messages = request.get("messages", [])
+        prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in messages)
+        completion_tokens = args.response_tokens
+        if request.get("max_tokens"):
+            completion_tokens = min(completion_tokens, int(request["max_tokens"]))
+
+        words = (REFUSAL + " " + " ".join([FILLER] * (completion_tokens // 10 + 1))).split()
+        # Roughly one token per word for simulation purposes
+        tokens = [word + " " for word in words[:max(1, completion_tokens)]]
+        model = request.get("model", "mock-model")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                 "total_tokens": prompt_tokens + len(tokens)}
+        token_delay = 1.0 / args.tokens_per_sec if args.tokens_per_sec else 0.0
+
+        # Time to first token
+        sample_latency = self.state.model_latency.get(model, self.state.sample_latency)
+        prefill = prompt_tokens / args.prompt_tokens_per_sec if args.prompt_tokens_per_sec else 0.0
+        time.sleep(max(0.0, sample_latency()) + prefill)
+
+        if not request.get("stream"):
+            time.sleep(token_delay * len(tokens))
+            self.state.count("completed")
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "".join(tokens).strip()}}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta: Dict[str, Any], finish_reason: str = None, extra: Dict[str, Any] = None) -> None:
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            chunk.update(extra or {})
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        event({"role": "assistant", "content": ""})
+        for token in tokens:
+            event({"content": token})
+            if token_delay:
+                time.sleep(token_delay)
+        include_usage = (request.get("stream_options") or {}).get("include_usage")
+        event({}, "stop", {"usage": usage} if include_usage else None)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.state.count("completed")
+        self.state.count("streamed")
+
+
+class MockServer(ThreadingHTTPServer):
+    # The default backlog of 5 drops connection bursts from highly concurrent clients
+    request_queue_size = 1024
+
+
+def make_server(args: argparse.Namespace) -> MockServer:
+    """Build (but do not start) a mock server for the given options."""
+    handler = type("BoundMockHandler", (MockHandler,), {"state": MockState(args)})
+    server = MockServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible mock chat-completions server")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on (0 picks a free port)")
+    parser.add_argument("--latency", type=str, default="fixed:0.05",
+                        help="Time-to-first-token distribution: fixed:S, uniform:LO,HI, "
+                             "exponential:MEAN or lognormal:MU,SIGMA")
+    parser.add_argument("--model-latency", type=str, nargs="+", default=None, metavar="MODEL=SPEC",
+                        help="Per-model latency overrides, e.g. slow/model=fixed:2")
+    parser.add_argument("--prompt-tokens-per-sec", type=float, default=0.0,
+                        help="Simulated prompt processing rate added to the time to first token, "
+                             "so long prompts answer later (0 = instant)")
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0,
+                        help="Simulated generation rate after the first token (0 = instant)")
+    parser.add_argument("--response-tokens", type=int, default=64,
+                        help="Completion length in tokens, capped by the request's max_tokens")
+    parser.add_argument("--error-rate-429", type=float, default=0.0, help="Fraction of requests answered 429")
+    parser.add_argument("--error-rate-500", type=float, default=0.0, help="Fraction of requests answered 500")
+    parser.add_argument("--timeout-rate", type=float, default=0.0,
+                        help="Fraction of requests that hang and are then dropped")
+    parser.add_argument("--timeout-seconds", type=float, default=120.0, help="How long a timed-out request hangs")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After header sent with 429s")
+    parser.add_argument("--rpm-limit", type=int, default=0,
+                        help="Answer 429 once this many requests were accepted in the last minute (0 = off)")
+    parser.add_argument("--max-in-flight", type=int, default=0,
+                        help="Answer 429 while this many requests are already in flight (0 = off)")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    server = make_server(args)
+    host, port = server.server_address[:2]
+    print(f"Mock OpenAI server listening on http://{host}:{port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for the generation, loading and evaluation paths.
+
+Each (benchmark, rows) case runs in a fresh process so its peak RSS is
+isolated, and reports records/sec, p50/p99 per-record latency and peak RSS.
+Inputs are synthesized lazily, one row at a time, so peak RSS reflects the
+code under test rather than the input size, and million-row cases fit in memory.
+Results can be saved as a JSON baseline and compared against a previous one:
+
+    python benchmarks/run_benchmarks.py --sizes 1000 100000 --save benchmarks/baselines/main.json
+    python benchmarks/run_benchmarks.py --sizes 1000 100000 --compare benchmarks/baselines/main.json
+
+No network access or API key is needed; the evaluation benchmark talks to an
+in-process stand-in for the OpenAI client, or with --eval-base-url to a real
+HTTP server such as benchmarks/mock_openai_server.py.
+"""
+
+import argparse
+import array
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+VANILLA_PROMPTS = os.path.join(ROOT, 'generator', 'vanilla_prompts.jsonl')
+STRATEGY_PATH = os.path.join(ROOT, 'generator', 'extracted_strategy.json')
+BENCHMARKS = ('transform', 'load', 'json_extract', 'evaluate')
+DEFAULT_SIZES = (1000, 10000)
+SEED = 1234
+
+
+def load_vanilla_prompts() -> List[str]:
+    with open(VANILLA_PROMPTS, 'r', encoding='utf-8') as f:
+        return [json.loads(line)['vanilla'] for line in f if line.strip()]
+
+
+def synthetic_prompts(rows: int) -> Iterator[str]:
+    """Cycle the bundled vanilla prompts, tagging repeats so every row is distinct."""
+    base = load_vanilla_prompts()
+    for i in range(rows):
+        prompt = base[i % len(base)]
+        yield prompt if i < len(base) else f"{prompt} (variant {i // len(base)})"
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def timed_loop(items: Iterable[Any], step: Callable[[Any], Any]) -> Tuple[Sequence[float], float]:
+    """Time ``step`` on every item; producing the items is left out of the total."""
+    latencies = array.array('d')
+    for item in items:
+        started = time.perf_counter()
+        step(item)
+        latencies.append(time.perf_counter() - started)
+    return latencies, sum(latencies)
+
+
+def bench_transform(rows: int, workdir: str) -> Tuple[Sequence[float], float]:
+    """Per-prompt latency of DatasetGenerator._apply_artprompt with the batch RNG used by transform_batch."""
+    from generator.generator import DatasetGenerator
+
+    with open(STRATEGY_PATH, 'r', encoding='utf-8') as f:
+        generator = DatasetGenerator(json.load(f), max_concurrent=1)
+    rng = random.Random(SEED)
+    return timed_loop(synthetic_prompts(rows), lambda prompt: generator._apply_artprompt(prompt, rng))
+
+
+def bench_load(rows: int, workdir: str) -> Tuple[Sequence[float], float]:
+    """Per-record latency of the streaming local JSONL loader used by generate_adversarial_pairs."""
+    from src.loaders import iter_jsonl
+
+    path = os.path.join(workdir, 'prompts.jsonl')
+    with open(path, 'w', encoding='utf-8') as f:
+        for prompt in synthetic_prompts(rows):
+            f.write(json.dumps({'vanilla': prompt}, ensure_ascii=False) + '\n')
+
+    latencies = array.array('d')
+    loop_started = started = time.perf_counter()
+    for _ in iter_jsonl(path):
+        now = time.perf_counter()
+        latencies.append(now - started)
+        started = now
+    return latencies, time.perf_counter() - loop_started
+
+
+def bench_json_extract(rows: int, workdir: str) -> Tuple[Sequence[float], float]:
+    """Per-response latency of extract_first_json_object on fenced, chatty model output."""
+    from src.paper_agent import extract_first_json_object
+
+    with open(STRATEGY_PATH, 'r', encoding='utf-8') as f:
+        strategy = json.dumps(json.load(f), indent=2, ensure_ascii=False)
+    responses = (
+        f"Here is the strategy ({i}):\n```json\n{strategy}\n```\nLet me know if you need more." if i % 2
+        else f"{strategy}\n{{\"trailing\": {i}}}"
+        for i in range(rows)
+    )
+    return timed_loop(responses, extract_first_json_object)
+
+
+class _FakeCompletions:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def create(self, model, messages, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        message = types.SimpleNamespace(content=f"I can't help with that. ({len(messages[-1]['content'])})")
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+
+class _FakeAsyncOpenAI:
+    latency = 0.0
+
+    def __init__(self, **kwargs):
+        self.chat = types.SimpleNamespace(completions=_FakeCompletions(self.latency))
+
+    async def close(self):
+        pass
+
+
+def bench_evaluate(rows: int, workdir: str, latency: float = 0.0, max_concurrent: int = 50,
+                   base_url: Optional[str] = None) -> Tuple[Sequence[float], float]:
+    """Per-record latency of the run_attack_prompts evaluation loop, from its first request to its last response.
+
+    Uses an in-process stand-in client, or the real client against ``base_url`` if given.
+    """
+    import run_attack_prompts
+    from generator.generator import DatasetGenerator
+
+    with open(STRATEGY_PATH, 'r', encoding='utf-8') as f:
+        generator = DatasetGenerator(json.load(f), max_concurrent=1)
+    prompts = synthetic_prompts(rows)
+    path = os.path.join(workdir, 'dataset.jsonl')
+    with open(path, 'w', encoding='utf-8') as f:
+        for seed in itertools.count(SEED):
+            chunk = list(itertools.islice(prompts, 1000))
+            if not chunk:
+                break
+            for prompt, attack_prompt in zip(chunk, generator.transform_batch(chunk, seed)):
+                f.write(json.dumps({
+                    'original_prompt': prompt,
+                    'attack_prompt': attack_prompt,
+                    'target_response': '',
+                    'strategy_name': generator.strategy_name,
+                }) + '\n')
+
+    # First request sent and last response received per record, 8 bytes each
+    starts = array.array('d', [0.0]) * rows
+    ends = array.array('d', [0.0]) * rows
+    evaluate_call = run_attack_prompts.evaluate_call
+
+    async def timed_evaluate_call(client, limiter, journal, record, index, *args, **kwargs):
+        if not starts[index]:
+            starts[index] = time.perf_counter()
+        try:
+            return await evaluate_call(client, limiter, journal, record, index, *args, **kwargs)
+        finally:
+            ends[index] = time.perf_counter()
+
+    if base_url is None:
+        import openai
+
+        # process_dataset imports the client class from openai when it runs
+        _FakeAsyncOpenAI.latency = latency
+        openai.AsyncOpenAI = _FakeAsyncOpenAI
+    run_attack_prompts.OPENROUTER_API_KEY = 'benchmark'
+    run_attack_prompts.evaluate_call = timed_evaluate_call
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(run_attack_prompts.process_dataset(
+            input_file=path,
+            max_concurrent=max_concurrent,
+            base_url=base_url or run_attack_prompts.BASE_URL,
+            cache_path=None
+        ))
+    elapsed = time.perf_counter() - started
+    return array.array('d', (end - start for start, end in zip(starts, ends) if end)), elapsed
+
+
+BENCHMARK_FUNCS = {
+    'transform': bench_transform,
+    'load': bench_load,
+    'json_extract': bench_json_extract,
+    'evaluate': bench_evaluate,
+}
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_case(name: str, rows: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one benchmark case; meant to be called in a fresh worker process."""
+    with tempfile.TemporaryDirectory() as workdir:
+        # Each benchmark times only its hot section, not input synthesis
+        latencies, elapsed = BENCHMARK_FUNCS[name](rows, workdir, **options)
+    # Read before sorting, which copies the latencies
+    peak_rss = peak_rss_mb()
+
+    latencies = sorted(latencies)
+    return {
+        'benchmark': name,
+        'rows': rows,
+        'seconds': round(elapsed, 4),
+        'records_per_sec': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 4),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 4),
+        'peak_rss_mb': round(peak_rss, 1),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> int:
+    """Print per-case deltas against a baseline; return the number of regressions."""
+    previous = {(r['benchmark'], r['rows']): r for r in baseline.get('results', [])}
+    regressions = 0
+    print(f"\nComparison with baseline {baseline.get('meta', {}).get('commit', '?')} "
+          f"(regression threshold {threshold:.0%}):")
+    for result in results:
+        old = previous.get((result['benchmark'], result['rows']))
+        if old is None:
+            print(f"  {result['benchmark']:<14}{result['rows']:>10}  (no baseline)")
+            continue
+        throughput = result['records_per_sec'] / old['records_per_sec'] - 1 if old['records_per_sec'] else 0.0
+        rss = result['peak_rss_mb'] / old['peak_rss_mb'] - 1 if old['peak_rss_mb'] else 0.0
+        regressed = throughput < -threshold or rss > threshold
+        regressions += regressed
+        print(f"  {result['benchmark']:<14}{result['rows']:>10}  throughput {throughput:+7.1%}  "
+              f"peak RSS {rss:+7.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run offline throughput benchmarks')
+    parser.add_argument('--benchmarks', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS),
+                        help='Benchmarks to run (default: all)')
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(DEFAULT_SIZES),
+                        help='Synthetic input sizes in rows, e.g. 1000 100000 1000000')
+    parser.add_argument('--eval-latency', type=float, default=0.0,
+                        help='Simulated per-request latency of the stand-in model, in seconds')
+    parser.add_argument('--eval-concurrency', type=int, default=50,
+                        help='max_concurrent used by the evaluation benchmark')
+    parser.add_argument('--eval-base-url', type=str, default=None,
+                        help='Evaluate against this OpenAI-compatible server, e.g. the local mock, '
+                             'instead of the in-process stand-in')
+    parser.add_argument('--save', type=str, default=None,
+                        help='Write results to this JSON baseline file')
+    parser.add_argument('--compare', type=str, default=None,
+                        help='Compare results against this JSON baseline file')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Relative slowdown or RSS growth reported as a regression')
+
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'benchmark':<14}{'rows':>10}{'rec/s':>14}{'p50 ms':>11}{'p99 ms':>11}{'peak MB':>10}")
+    for name in args.benchmarks:
+        options = {}
+        if name == 'evaluate':
+            options = {'latency': args.eval_latency, 'max_concurrent': args.eval_concurrency,
+                       'base_url': args.eval_base_url}
+        for rows in args.sizes:
+            # A fresh process per case keeps peak RSS measurements independent
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                result = pool.submit(run_case, name, rows, options).result()
+            results.append(result)
+            print(f"{name:<14}{rows:>10}{result['records_per_sec']:>14,.1f}{result['p50_ms']:>11.3f}"
+                  f"{result['p99_ms']:>11.3f}{result['peak_rss_mb']:>10.1f}")
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'eval_latency': args.eval_latency,
+            'eval_concurrency': args.eval_concurrency,
+            'eval_base_url': args.eval_base_url,
+        },
+        'results': results,
+    }
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or '.', exist_ok=True)
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
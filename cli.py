@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Unified command-line entry point.
+
+    python cli.py extract paper.pdf
+    python cli.py generate --dataset generator/vanilla_prompts.jsonl
+    python cli.py evaluate --input outputs/dataset.jsonl
+    python cli.py stream --dataset generator/vanilla_prompts.jsonl --output outputs/dataset.jsonl
+    python cli.py dedup --input outputs/dataset.jsonl
+
+Each subcommand imports its module only once it is chosen, and the modules
+import openai, pypdf, datasets and art only when they are about to be used,
+so ``--help`` and cached runs start quickly. benchmarks/check_startup.py
+keeps startup within a budget.
+"""
+
+import argparse
+import asyncio
+import importlib
+import os
+import sys
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Subcommand -> (module providing main(argv, prog), or None for one defined here; description)
+COMMANDS = {
+    "extract": (None, "Extract an attack strategy from a paper PDF or a directory of PDFs"),
+    "generate": ("run_generation", "Generate an adversarial dataset from a strategy"),
+    "evaluate": ("run_attack_prompts", "Query target models with the attack and vanilla prompts"),
+    "stream": ("run_streaming", "Generate and evaluate in one pass, writing each record once with its responses"),
+    "dedup": ("dedup_dataset", "Drop near-duplicate prompts, checked against every batch produced before"),
+}
+
+
+def extract_main(argv=None, prog=None):
+    """Strategy extraction only; the full pipeline stays available as main.py."""
+    from src.metrics import DEFAULT_EXPORT_INTERVAL
+
+    parser = argparse.ArgumentParser(prog=prog, description=COMMANDS["extract"][1])
+    parser.add_argument('pdf_path', type=str,
+                        help='Research paper PDF, or a directory of PDFs to extract in batch')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Ignore the cached strategy for this PDF and re-run the analysis')
+    parser.add_argument('--analysis-mode', type=str, choices=['auto', 'single', 'map_reduce'], default='auto',
+                        help='Send the whole paper in one call, or summarise chunks concurrently and reduce')
+    parser.add_argument('--base-url', type=str, default=None,
+                        help='OpenAI-compatible API base URL (default: $OPENROUTER_BASE_URL or OpenRouter)')
+    parser.add_argument('--metrics-dir', type=str, default=None,
+                        help='Write metrics.json and a Prometheus textfile metrics.prom to this directory')
+    parser.add_argument('--metrics-interval', type=float, default=DEFAULT_EXPORT_INTERVAL,
+                        help='Seconds between metrics dumps while running')
+
+    args = parser.parse_args(argv)
+
+    from main import run_pipeline
+
+    asyncio.run(run_pipeline(
+        pdf_path=args.pdf_path,
+        extract_only=True,
+        refresh=args.refresh,
+        analysis_mode=args.analysis_mode,
+        base_url=args.base_url,
+        metrics_dir=args.metrics_dir,
+        metrics_interval=args.metrics_interval
+    ))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Red-teaming pipeline: extract strategies, generate datasets, evaluate target models',
+        epilog='commands:\n' + ''.join(f'  {name:<10}{description}\n' for name, (_, description) in COMMANDS.items())
+               + '\nRun "%(prog)s COMMAND --help" for the options of a command.',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('command', choices=COMMANDS, metavar='COMMAND', help='Subcommand to run')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+
+    args = parser.parse_args(argv)
+
+    module_name, _ = COMMANDS[args.command]
+    command_main = extract_main if module_name is None else importlib.import_module(module_name).main
+    command_main(args.args, f'{parser.prog} {args.command}')
+
+
+if __name__ == '__main__':
+    main()
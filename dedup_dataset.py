@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Filter Script.
+Drops records whose prompt nearly duplicates an earlier one in the file or in
+the persistent dedup index of everything produced before.
+"""
+
+import argparse
+import contextlib
+import os
+import sys
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.dedup import DEFAULT_DEDUP_INDEX_PATH, DEFAULT_NUM_PERM, DEFAULT_THRESHOLD, DedupIndex
+from src.loaders import iter_records
+from src.writers import DURABILITY_POLICIES, OUTPUT_FORMATS, infer_output_format, open_writer
+
+
+def dedup_dataset(
+    input_file: str,
+    output: str | None = None,
+    field: str = 'original_prompt',
+    index_path: str | None = DEFAULT_DEDUP_INDEX_PATH,
+    threshold: float = DEFAULT_THRESHOLD,
+    num_perm: int = DEFAULT_NUM_PERM,
+    duplicates_path: str | None = None,
+    dry_run: bool = False,
+    output_format: str | None = None,
+    durability: str = 'flush'
+) -> int:
+    """Filter near-duplicate records out of a dataset file.
+
+    Records are kept in order; of near-duplicates the first one wins. Kept
+    prompts are added to the index at ``index_path`` (an in-memory one if
+    None), so the next batch is also checked against this one. Prompts the
+    index already holds verbatim are kept, so a file produced with
+    ``--dedup`` or filtered before passes through unchanged. With
+    ``duplicates_path``, dropped records are written there with the prompt
+    they duplicate and the estimated similarity, for review.
+
+    Returns:
+        Process exit code: 0 on success, 1 if the input or index is unusable.
+    """
+    if not os.path.exists(input_file):
+        print(f'Error: {input_file} not found.')
+        return 1
+    try:
+        index = DedupIndex(index_path or ':memory:', threshold=threshold, num_perm=num_perm)
+    except ValueError as e:
+        print(f'Error: {e}')
+        return 1
+    print(f'Checking {input_file} against {len(index)} indexed prompts (threshold {threshold})...')
+
+    output = output or input_file
+    # Written beside the target and moved over it at the end, so the input can be replaced in place
+    directory, name = os.path.split(output)
+    staging = os.path.join(directory, f'.{name}.dedup')
+    total = 0
+    missing = 0
+    try:
+        with _maybe_writer(None if dry_run else staging, output_format or infer_output_format(output),
+                           durability) as writer, \
+                _maybe_writer(duplicates_path, None, durability) as duplicates:
+            for record in iter_records(input_file):
+                total += 1
+                prompt = record.get(field)
+                if not prompt:
+                    missing += 1
+                    match = None
+                else:
+                    match = index.check(prompt)
+                if match is None:
+                    if writer is not None:
+                        writer.write(record)
+                elif duplicates is not None:
+                    duplicates.write({**record, 'duplicate_of': match[0], 'similarity': round(match[1], 3)})
+        if not dry_run:
+            os.replace(staging, output)
+            index.commit()
+    finally:
+        if os.path.exists(staging):
+            os.remove(staging)
+        index.close()
+
+    print(f'{total - index.duplicates} of {total} records kept ({index.indexed} already indexed), '
+          f'{index.duplicates} near-duplicates dropped' + ('' if dry_run else f' -> {output}') + '.')
+    if missing:
+        print(f'Warning: {missing} records have no {field!r} field; they were kept unchecked.')
+    return 0
+
+
+def _maybe_writer(path: str | None, output_format: str | None, durability: str):
+    return open_writer(path, output_format, durability=durability) if path else contextlib.nullcontext()
+
+
+def main(argv: list[str] | None = None, prog: str | None = None):
+    parser = argparse.ArgumentParser(prog=prog, description='Drop near-duplicate prompts from a dataset file')
+    parser.add_argument('--input', type=str, default='outputs/dataset.jsonl',
+                        help='Dataset file to filter')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Filtered output file (default: replace the input)')
+    parser.add_argument('--output-format', type=str, choices=OUTPUT_FORMATS, default=None,
+                        help='Output file format (default: inferred from --output)')
+    parser.add_argument('--durability', type=str, choices=DURABILITY_POLICIES, default='flush',
+                        help='Flush batches to the OS, fsync them, or neither')
+    parser.add_argument('--field', type=str, default='original_prompt',
+                        help='Field compared between records')
+    parser.add_argument('--index', type=str, default=DEFAULT_DEDUP_INDEX_PATH,
+                        help='Persistent dedup index shared by all batches')
+    parser.add_argument('--no-index', action='store_true',
+                        help='Only compare records within this file')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Estimated Jaccard similarity of character shingles from which prompts are duplicates')
+    parser.add_argument('--num-perm', type=int, default=DEFAULT_NUM_PERM,
+                        help='MinHash signature length; fixed once an index exists')
+    parser.add_argument('--duplicates', type=str, default=None,
+                        help='Write dropped records here with the prompt they duplicate')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Only report duplicates; leave the input and the index unchanged')
+
+    args = parser.parse_args(argv)
+
+    sys.exit(dedup_dataset(
+        input_file=args.input,
+        output=args.output,
+        field=args.field,
+        index_path=None if args.no_index else args.index,
+        threshold=args.threshold,
+        num_perm=args.num_perm,
+        duplicates_path=args.duplicates,
+        dry_run=args.dry_run,
+        output_format=args.output_format,
+        durability=args.durability
+    ))
+
+
+if __name__ == '__main__':
+    main()
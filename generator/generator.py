@@ -1,94 +1,310 @@
-
 import os
 import json
 import asyncio
 import random
 import re
-from typing import AsyncIterator, List, Dict, Any
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from typing import AsyncIterator, Callable, Iterable, Iterator, List, Dict, Any, Optional, Tuple
 from dotenv import load_dotenv
-from datasets import load_dataset
-from art import text2art
+
+from src.ascii_art import AsciiArtRenderer
+from src.cache import ColumnCache
+from src.loaders import is_local_source, iter_jsonl
+from src.metrics import MetricsRegistry, get_registry
+from src.prefetch import Prefetcher
+from src.sharding import shard_of, validate_shard
 
 load_dotenv()
 
+# Prompts per unit of work handed to the transform pool
+DEFAULT_CHUNK_SIZE = 16
+# Font the masked word is rendered in
+ART_FONT = "block"
+
+# Per-process generator used by ProcessPoolExecutor workers
+_worker_generator = None
+
+
+def _init_worker(strategy: dict, atlas_dir: Optional[str]) -> None:
+    global _worker_generator
+    _worker_generator = DatasetGenerator(strategy, max_concurrent=1, atlas_dir=atlas_dir)
+
+
+def _transform_in_worker(prompts: List[str], seed: Optional[str]) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    return _worker_generator._transform_chunk(prompts, seed)
+
+
 class DatasetGenerator:
-    def __init__(self, strategy: dict, max_concurrent: int = 10):
+    # Function words never chosen as the masked word; compiled once for all prompts
+    STOP_WORDS = frozenset({
+        'a', 'an', 'the', 'in', 'on', 'at', 'to', 'for', 'of', 'and', 'or', 'but', 'is', 'are', 'was', 'were',
+        'be', 'been', 'how', 'what', 'why', 'who', 'when', 'where', 'do', 'does', 'did', 'can', 'could',
+        'should', 'would', 'will', 'may', 'might', 'must', 'have', 'has', 'had', 'i', 'you', 'he', 'she', 'it',
+        'we', 'they', 'my', 'your', 'write', 'tutorial', 'make', 'create', 'generate', 'steps', 'step', 'list',
+        'please'
+    })
+    WORD_RE = re.compile(r'\b\w+\b')
+
+    def __init__(self, strategy: dict, max_concurrent: int = 10, executor: str = "process",
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, atlas_dir: Optional[str] = None,
+                 metrics: Optional[MetricsRegistry] = None, seed: Optional[int] = None,
+                 dataset_cache_dir: Optional[str] = None):
+        """Initialize the generator.
+
+        Args:
+            strategy: Extracted strategy JSON.
+            max_concurrent: Number of transform workers.
+            executor: "process" to spread transforms over CPU cores, "thread" for a thread pool.
+            chunk_size: Number of prompts transformed per worker task.
+            atlas_dir: Directory to persist ASCII-art glyph atlases in, so later runs start warm.
+            metrics: Registry for transform latency, queue depth and record counts. None uses the default one.
+            seed: Base seed for masking. Each chunk gets its own RNG seeded from it and the
+                chunk's position, so the same input and chunk size give the same dataset
+                regardless of executor or worker scheduling. None for unseeded runs.
+            dataset_cache_dir: Directory to cache the prompt column of HuggingFace datasets
+                in as Arrow files, so later runs skip the network. None disables it.
+        """
+        if executor not in ("process", "thread"):
+            raise ValueError(f"Unknown executor type: {executor}")
         self.strategy = strategy
-        self.max_concurrent = max_concurrent
+        self.max_concurrent = max(1, max_concurrent)
+        self.executor = executor
+        self.chunk_size = max(1, chunk_size)
+        self.atlas_dir = atlas_dir
+        self.renderer = AsciiArtRenderer(atlas_dir=atlas_dir)
         self.strategy_name = strategy.get("strategy_name", "Unknown Strategy")
-        
-    async def generate_adversarial_pairs(self, dataset_name: str, column: str, max_samples: int = None) -> AsyncIterator[dict]:
-        # Dataset Loading Logic
-        if os.path.exists(dataset_name):
-            # Load local JSONL
-            import json
-            data = []
+        self.metrics = metrics or get_registry()
+        self.seed = seed
+        self.dataset_cache_dir = dataset_cache_dir
+
+    def _make_executor(self):
+        if self.executor == "process":
+            workers = min(self.max_concurrent, os.cpu_count() or 1)
+            return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       initargs=(self.strategy, self.atlas_dir))
+        return ThreadPoolExecutor(max_workers=self.max_concurrent)
+
+    def transform_params(self) -> Dict[str, Any]:
+        """Parameters besides the prompt and strategy that shape a generated record."""
+        return {"transform": "artprompt", "font": ART_FONT}
+
+    def transform_batch(self, prompts: List[str], seed: Optional[Any] = None) -> List[str]:
+        """Transform a batch of prompts with one RNG, returning the attack prompts in order.
+
+        Args:
+            prompts: Vanilla prompts.
+            seed: Seed of the batch RNG; the same batch and seed always give the
+                same output. None seeds it from the OS.
+        """
+        attack_prompts = []
+        for _, attack_prompt, error in self._transform_each(prompts, seed):
+            if error is not None:
+                raise error
+            attack_prompts.append(attack_prompt)
+        return attack_prompts
+
+    def _transform_chunk(self, prompts: List[str], seed: Optional[Any] = None) -> List[Tuple[str, Optional[str], Optional[str]]]:
+        """Transform a chunk of prompts, returning (original, attack, error) per prompt."""
+        return [
+            (prompt, attack_prompt, None if error is None else str(error))
+            for prompt, attack_prompt, error in self._transform_each(prompts, seed)
+        ]
+
+    def _transform_each(self, prompts: Iterable[str],
+                        seed: Optional[Any]) -> Iterator[Tuple[str, Optional[str], Optional[Exception]]]:
+        """Transform prompts with one RNG seeded from ``seed``, yielding (original, attack, error)."""
+        rng = random.Random(seed)
+        for prompt in prompts:
             try:
-                with open(dataset_name, 'r') as f:
-                     for line in f:
-                         if line.strip():
-                             data.append(json.loads(line))
+                yield prompt, self._apply_artprompt(prompt, rng), None
             except Exception as e:
-                print(f"Error loading local dataset: {e}")
-                data = []
-            # Stream locally logic implies yielding
-            dataset_iterable = data
+                yield prompt, None, e
+
+    async def generate_adversarial_pairs(self, dataset_name: str, column: str, max_samples: int = None,
+                                         ordered: bool = True, num_shards: int = 1, shard_index: int = 0,
+                                         skip: Optional[Callable[[str], bool]] = None) -> AsyncIterator[dict]:
+        """Stream adversarial pairs, transforming prompts in parallel chunks.
+
+        Args:
+            dataset_name: Local JSONL path or glob (optionally .gz/.zst), or a HuggingFace dataset name.
+            column: Field holding the vanilla prompt.
+            max_samples: Maximum number of pairs to yield. None for all.
+            ordered: Yield pairs in input order. If False, chunks are yielded as
+                soon as they finish, which keeps every worker busy.
+            num_shards: Number of workers the input is partitioned across.
+            shard_index: Shard handled by this call; only prompts whose stable hash
+                falls into it are transformed. max_samples applies per shard.
+            skip: Predicate called with each vanilla prompt; prompts it returns True for
+                are dropped before transforming, e.g. ones already in an incremental
+                output. max_samples counts only the prompts that are kept.
+        """
+        validate_shard(shard_index, num_shards)
+        metrics = self.metrics
+        dataset_iterable = None
+        prefetcher = None
+        # Dataset Loading Logic
+        if is_local_source(dataset_name):
+            # Stream local JSONL (plain, gzip or zstd; path or glob) without loading it into memory
+            dataset_iterable = iter_jsonl(dataset_name)
+            prompts = self._filter_prompts(
+                (item.get(column, "") for item in dataset_iterable), num_shards, shard_index, skip
+            )
         else:
-             # Load from HuggingFace
-             # Ensure token is present if needed, though for wildjailbreak it might be open or gated.
-             token = os.getenv("HUGGINGFACE_TOKEN")
-             try:
-                 dataset = load_dataset(dataset_name, split="train", streaming=True, token=token)
-             except ValueError as e:
-                 if "Config name is missing" in str(e):
-                      # Fallback for datasets requiring config (like wildjailbreak)
-                      dataset = load_dataset(dataset_name, "train", split="train", streaming=True, token=token)
-                 else:
-                      raise e
-             dataset_iterable = dataset
+            # Fetching and parsing remote rows blocks, so it runs in a thread reading ahead of the pool
+            cache = ColumnCache(self.dataset_cache_dir) if self.dataset_cache_dir else None
+            prefetcher = Prefetcher(
+                lambda: self._filter_prompts(
+                    self._iter_hub_column(dataset_name, column, cache), num_shards, shard_index, skip
+                ),
+                name="dataset_prefetch",
+                metrics=metrics
+            )
 
+        limit = int(max_samples) if max_samples is not None else None
+        loop = asyncio.get_running_loop()
+        pool = self._make_executor()
+        transform = _transform_in_worker if self.executor == "process" else self._transform_chunk
+        max_pending = self.max_concurrent * 2
+        pending = deque()
+        in_flight = 0
         count = 0
-        for item in dataset_iterable:
-            if max_samples is not None and count >= int(max_samples):
-                break
-                
-            original_prompt = item.get(column, "")
-            if not original_prompt:
-                continue
-
-            # Apply Strategy: ArtPrompt
-            try:
-                attack_prompt = self._apply_artprompt(original_prompt)
-                
-                yield {
-                    "original_prompt": original_prompt,
-                    "attack_prompt": attack_prompt,
-                    "target_response": "", 
-                    "strategy_name": self.strategy_name
-                }
-                count += 1
-            except Exception as e:
-                print(f"Error processing prompt: {e}")
-                continue
+        chunks_submitted = 0
+        exhausted = False
+
+        async def submit_chunks():
+            nonlocal in_flight, exhausted, chunks_submitted
+            while not exhausted and len(pending) < max_pending:
+                # Never queue more prompts than are still needed to reach max_samples
+                budget = self.chunk_size
+                if limit is not None:
+                    budget = min(budget, limit - count - in_flight)
+                    if budget <= 0:
+                        return
+                if prefetcher is not None:
+                    chunk = await prefetcher.take(budget)
+                else:
+                    chunk = list(islice(prompts, budget))
+                if len(chunk) < budget:
+                    exhausted = True
+                if not chunk:
+                    return
+                seed = None if self.seed is None else f"{self.seed}:{chunks_submitted}"
+                chunks_submitted += 1
+                future = loop.run_in_executor(pool, transform, chunk, seed)
+                # Time from submission to completion, i.e. pool queueing plus the transform itself
+                submitted = time.perf_counter()
+                future.add_done_callback(
+                    lambda _, submitted=submitted: metrics.observe(
+                        "transform_chunk_seconds", time.perf_counter() - submitted
+                    )
+                )
+                pending.append(future)
+                in_flight += len(chunk)
+
+        try:
+            await submit_chunks()
+            while pending:
+                metrics.set_gauge("queue_depth", len(pending), queue="transform_chunks")
+                if ordered:
+                    done = [pending.popleft()]
+                else:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for future in done:
+                        pending.remove(future)
+
+                for future in done:
+                    results = await future
+                    in_flight -= len(results)
+                    for original_prompt, attack_prompt, error in results:
+                        if error is not None:
+                            metrics.inc("transform_errors_total")
+                            print(f"Error processing prompt: {error}")
+                            continue
+                        if limit is not None and count >= limit:
+                            break
+                        yield {
+                            "original_prompt": original_prompt,
+                            "attack_prompt": attack_prompt,
+                            "target_response": "",
+                            "strategy_name": self.strategy_name
+                        }
+                        count += 1
+                        metrics.inc("records_total", stage="generate")
+
+                await submit_chunks()
+        finally:
+            for future in pending:
+                future.cancel()
+            if hasattr(dataset_iterable, "close"):
+                dataset_iterable.close()
+            # Joining pool workers and the prefetch thread blocks; the thread finishes it even if this is cancelled
+            await asyncio.to_thread(self._shutdown, pool, prefetcher)
+
+    @staticmethod
+    def _shutdown(pool, prefetcher: Optional[Prefetcher]) -> None:
+        """Wait for the transform pool and the prefetch thread to stop."""
+        pool.shutdown(wait=True, cancel_futures=True)
+        if prefetcher is not None:
+            prefetcher.close()
+
+    @staticmethod
+    def _filter_prompts(prompts: Iterable[str], num_shards: int, shard_index: int,
+                        skip: Optional[Callable[[str], bool]]) -> Iterator[str]:
+        """Drop empty prompts, prompts of other shards and prompts rejected by ``skip``."""
+        prompts = (prompt for prompt in prompts if prompt)
+        if num_shards > 1:
+            prompts = (prompt for prompt in prompts if shard_of(prompt, num_shards) == shard_index)
+        if skip is not None:
+            prompts = (prompt for prompt in prompts if not skip(prompt))
+        return prompts
+
+    def _iter_hub_column(self, dataset_name: str, column: str, cache: Optional[ColumnCache]) -> Iterator[str]:
+        """Stream one column of a HuggingFace dataset, from the local column cache if it has it."""
+        key = ColumnCache.make_key(dataset_name, "train", column)
+        if cache is not None and cache.has(key):
+            print(f"Reading {dataset_name}[{column}] from the local dataset cache")
+            yield from cache.read(key)
+            return
+
+        # Load from HuggingFace; datasets is slow to import, so only remote runs pay for it
+        from datasets import load_dataset
+
+        # Ensure token is present if needed, though for wildjailbreak it might be open or gated.
+        token = os.getenv("HUGGINGFACE_TOKEN")
+        try:
+            dataset = load_dataset(dataset_name, split="train", streaming=True, token=token)
+        except ValueError as e:
+            if "Config name is missing" in str(e):
+                # Fallback for datasets requiring config (like wildjailbreak)
+                dataset = load_dataset(dataset_name, "train", split="train", streaming=True, token=token)
+            else:
+                raise e
+
+        values = (item.get(column, "") for item in dataset)
+        if cache is not None:
+            values = cache.tee(key, values)
+        yield from values
 
-    def _apply_artprompt(self, prompt: str) -> str:
+    def _apply_artprompt(self, prompt: str, rng: Optional[random.Random] = None) -> str:
         # STEP 1: WORD MASKING
         # Simple heuristic: find longest word that is not a function word
-        words = re.findall(r'\b\w+\b', prompt)
-        # Extend stop words list
-        stop_words = {'a', 'an', 'the', 'in', 'on', 'at', 'to', 'for', 'of', 'and', 'or', 'but', 'is', 'are', 'was', 'were', 'be', 'been', 'how', 'what', 'why', 'who', 'when', 'where', 'do', 'does', 'did', 'can', 'could', 'should', 'would', 'will', 'may', 'might', 'must', 'have', 'has', 'had', 'i', 'you', 'he', 'she', 'it', 'we', 'they', 'my', 'your', 'write', 'tutorial', 'make', 'create', 'generate', 'steps', 'step', 'list', 'please'}
+        words = self.WORD_RE.findall(prompt)
+        stop_words = self.STOP_WORDS
         
-        candidates = [w for w in words if w.lower() not in stop_words and len(w) > 3]
+        candidates = [w for w in words if len(w) > 3 and w.lower() not in stop_words]
         if not candidates:
              candidates = [w for w in words if len(w) > 2] # Fallback
         
-        target_word = random.choice(candidates) if candidates else "SECRET" 
+        target_word = (rng or random).choice(candidates) if candidates else "SECRET" 
         
         masked_prompt = prompt.replace(target_word, "[MASK]")
         
         # STEP 2: ASCII ART GENERATION
         # Using 'block' font as it is commonly clear and uses * often
-        ascii_art = text2art(target_word, font='block') 
+        ascii_art = self.renderer.render(target_word, font=ART_FONT)
 
         # STEP 3: CLOAKED PROMPT CONSTRUCTION
         lines = ascii_art.strip("\n").split("\n")
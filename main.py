@@ -5,12 +5,15 @@ Orchestrates the complete adversarial dataset generation pipeline.
 
 import argparse
 import asyncio
-import json
 import logging
+import time
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
-from src.paper_agent import PaperAgent
+from src.dedup import DEFAULT_DEDUP_INDEX_PATH, DEFAULT_THRESHOLD, DedupIndex, skip_any
+from src.metrics import DEFAULT_EXPORT_INTERVAL, MetricsExporter, get_registry
+from src.sharding import shard_path, validate_shard
+from src.writers import DURABILITY_POLICIES, OUTPUT_FORMATS, open_writer, validate_append, with_format_suffix
 
 # Configure logging
 logging.basicConfig(
@@ -27,26 +30,90 @@ async def run_pipeline(
     column: str = "vanilla",
     max_samples: Optional[int] = None,
     max_concurrent: int = 10,
-    extract_only: bool = False
+    extract_only: bool = False,
+    executor: str = "process",
+    ordered: bool = True,
+    refresh: bool = False,
+    analysis_mode: str = "auto",
+    output_format: Optional[str] = None,
+    durability: str = "flush",
+    base_url: Optional[str] = None,
+    metrics_dir: Optional[str] = None,
+    metrics_interval: float = DEFAULT_EXPORT_INTERVAL,
+    num_shards: int = 1,
+    shard_index: int = 0,
+    seed: Optional[int] = None,
+    incremental: bool = False,
+    dataset_cache_dir: Optional[str] = None,
+    dedup_index: Optional[str] = None,
+    dedup_threshold: float = DEFAULT_THRESHOLD
 ):
     """Run the complete adversarial dataset generation pipeline.
     
     Args:
-        pdf_path: Path to the research paper PDF.
-        output_path: Path to save the output JSONL file.
+        pdf_path: Path to the research paper PDF, or a directory of PDFs to
+            extract strategies from in one batch.
+        output_path: Path to save the output dataset file.
         dataset_name: HuggingFace dataset name.
         column: Column name in the dataset containing vanilla prompts.
         max_samples: Maximum number of samples to generate. None for all.
         max_concurrent: Maximum concurrent API calls.
+        extract_only: Only extract the strategy, skip dataset generation.
+        executor: Worker pool for prompt transforms ("process" or "thread").
+        ordered: Write pairs in input order.
+        refresh: Re-extract the strategy even if it is cached.
+        analysis_mode: Paper analysis mode ("auto", "single" or "map_reduce").
+        output_format: "jsonl", "jsonl.gz" or "parquet". None infers it from output_path.
+        durability: "none", "flush" or "fsync", applied after every written batch.
+        base_url: OpenAI-compatible API base URL. None uses $OPENROUTER_BASE_URL or OpenRouter.
+        metrics_dir: Directory for metrics.json and the Prometheus textfile metrics.prom,
+            refreshed every metrics_interval seconds. None disables the export.
+        metrics_interval: Seconds between metrics dumps while running.
+        num_shards: Number of workers the dataset is partitioned across.
+        shard_index: Shard generated by this run, written to a per-shard output file.
+        seed: Seed for word masking, making the dataset reproducible. None for unseeded runs.
+        incremental: Append only prompts missing from the output, tracked by a
+            content-hash index next to it, instead of regenerating everything.
+        dataset_cache_dir: Directory caching the prompt column of HuggingFace datasets
+            as Arrow files, so later runs skip the network. None disables it.
+        dedup_index: Persistent near-duplicate index; prompts nearly duplicating one
+            generated before, in this or an earlier run, are skipped. None disables it.
+        dedup_threshold: Estimated Jaccard similarity from which prompts are near-duplicates.
     """
+    validate_shard(shard_index, num_shards)
+    if incremental:
+        validate_append(output_path, output_format)
+    metrics = get_registry()
+    exporter = MetricsExporter(metrics_dir, metrics, interval=metrics_interval).start() if metrics_dir else None
     try:
         # Phase 1: Strategy Extraction
         logger.info("=" * 60)
         logger.info("PHASE 1: Strategy Extraction (The Brain)")
         logger.info("=" * 60)
         
-        paper_agent = PaperAgent()
-        strategy = paper_agent.extract_strategy_from_pdf(pdf_path)
+        # Lazy import - pulls in openai and pypdf, which --help does not need
+        from src.paper_agent import PaperAgent
+        
+        paper_agent = PaperAgent(base_url=base_url, metrics=metrics)
+        extract_started = time.perf_counter()
+        try:
+            if Path(pdf_path).is_dir():
+                # Batch mode: parsing of the next PDF overlaps with analysis of the current one
+                pdf_paths = sorted(str(p) for p in Path(pdf_path).glob("*.pdf"))
+                logger.info(f"Found {len(pdf_paths)} PDFs in {pdf_path}")
+                strategies = await paper_agent.extract_strategies_from_pdfs(
+                    pdf_paths, refresh=refresh, mode=analysis_mode
+                )
+                logger.info(f"Extracted {len(strategies)}/{len(pdf_paths)} strategies to generator/strategies/")
+                logger.info("Directory mode only extracts strategies. Skipping dataset generation.")
+                return
+            
+            strategy = await paper_agent.extract_strategy_from_pdf(
+                pdf_path, refresh=refresh, mode=analysis_mode
+            )
+        finally:
+            await paper_agent.close()
+            metrics.record_phase("extract", time.perf_counter() - extract_started)
         
         logger.info(f"Extracted strategy: {strategy['strategy_name']}")
         logger.info(f"Core principle: {strategy['core_principle']}")
@@ -65,12 +132,18 @@ async def run_pipeline(
         
         generator = DatasetGenerator(
             strategy=strategy,
-            max_concurrent=max_concurrent
+            max_concurrent=max_concurrent,
+            executor=executor,
+            metrics=metrics,
+            seed=seed,
+            dataset_cache_dir=dataset_cache_dir
         )
         
-        # Create output directory if it doesn't exist
-        output_file = Path(output_path)
-        output_file.parent.mkdir(parents=True, exist_ok=True)
+        if output_format:
+            output_path = with_format_suffix(output_path, output_format)
+        output_path = shard_path(output_path, shard_index, num_shards)
+        if num_shards > 1:
+            logger.info(f"Generating shard {shard_index + 1}/{num_shards}")
         
         # Generate and save adversarial pairs
         logger.info(f"Generating adversarial dataset...")
@@ -78,16 +151,51 @@ async def run_pipeline(
         if max_samples:
             logger.info(f"Processing up to {max_samples} samples")
         
-        count = 0
-        with open(output_file, 'w', encoding='utf-8') as f:
-            async for pair in generator.generate_adversarial_pairs(
-                dataset_name=dataset_name,
-                column=column,
-                max_samples=max_samples
-            ):
-                f.write(json.dumps(pair, ensure_ascii=False) + '\n')
-                f.flush()  # Ensure data is written immediately
-                count += 1
+        index = None
+        if incremental:
+            from src.incremental import GenerationIndex
+            index = GenerationIndex(output_path, strategy, generator.transform_params(), metrics=metrics)
+            logger.info(f"Incremental mode: {index.load()} records already generated")
+        dedup = None
+        if dedup_index:
+            dedup = DedupIndex(dedup_index, threshold=dedup_threshold, metrics=metrics)
+            logger.info(f"Dedup index {dedup_index}: {len(dedup)} prompts already generated")
+        
+        # The writer creates the output directory and batches writes
+        write_seconds = 0.0
+        try:
+            with metrics.phase("generate"), \
+                    open_writer(output_path, output_format, durability=durability, append=incremental) as writer:
+                async for pair in generator.generate_adversarial_pairs(
+                    dataset_name=dataset_name,
+                    column=column,
+                    max_samples=max_samples,
+                    ordered=ordered,
+                    num_shards=num_shards,
+                    shard_index=shard_index,
+                    skip=skip_any(index.seen if index is not None else None,
+                                  dedup.claim if dedup is not None else None)
+                ):
+                    started = time.perf_counter()
+                    writer.write(pair)
+                    if index is not None:
+                        index.add(pair["original_prompt"])
+                    if dedup is not None:
+                        dedup.confirm(pair["original_prompt"])
+                    write_seconds += time.perf_counter() - started
+            if index is not None:
+                index.commit()
+                logger.info(f"Skipped {index.skipped} prompts already generated")
+            if dedup is not None:
+                dedup.commit()
+                logger.info(f"Skipped {dedup.duplicates} near-duplicate prompts")
+        finally:
+            metrics.record_phase("write", write_seconds)
+            if index is not None:
+                index.close()
+            if dedup is not None:
+                dedup.close()
+        count = writer.count
         
         logger.info("=" * 60)
         logger.info("PHASE 3: Pipeline Complete")
@@ -104,9 +212,12 @@ async def run_pipeline(
     except Exception as e:
         logger.error(f"Unexpected error in pipeline: {e}", exc_info=True)
         raise
+    finally:
+        if exporter is not None:
+            exporter.stop()
 
 
-def main():
+def main(argv: Optional[List[str]] = None):
     """Main entry point for the pipeline."""
     parser = argparse.ArgumentParser(
         description="Generate adversarial datasets from research papers"
@@ -114,7 +225,7 @@ def main():
     parser.add_argument(
         "pdf_path",
         type=str,
-        help="Path to the research paper PDF file"
+        help="Path to the research paper PDF file, or a directory of PDFs (extraction only)"
     )
     parser.add_argument(
         "--output",
@@ -122,6 +233,20 @@ def main():
         default="outputs/dataset.jsonl",
         help="Output path for the generated dataset (default: outputs/dataset.jsonl)"
     )
+    parser.add_argument(
+        "--output-format",
+        type=str,
+        choices=OUTPUT_FORMATS,
+        default=None,
+        help="Output file format (default: inferred from --output)"
+    )
+    parser.add_argument(
+        "--durability",
+        type=str,
+        choices=DURABILITY_POLICIES,
+        default="flush",
+        help="Flush batches to the OS, fsync them, or neither (default: flush)"
+    )
     parser.add_argument(
         "--dataset",
         type=str,
@@ -151,8 +276,101 @@ def main():
         action="store_true",
         help="Only extract strategy from PDF, skip dataset generation"
     )
+    parser.add_argument(
+        "--executor",
+        type=str,
+        choices=["process", "thread"],
+        default="process",
+        help="Worker pool used for prompt transforms (default: process)"
+    )
+    parser.add_argument(
+        "--unordered",
+        action="store_true",
+        help="Write pairs as soon as they are ready instead of in input order"
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore the cached strategy for this PDF and re-run the analysis"
+    )
+    parser.add_argument(
+        "--analysis-mode",
+        type=str,
+        choices=["auto", "single", "map_reduce"],
+        default="auto",
+        help="Send the whole paper in one call, or summarise chunks concurrently and reduce (default: auto)"
+    )
+    parser.add_argument(
+        "--base-url",
+        type=str,
+        default=None,
+        help="OpenAI-compatible API base URL (default: $OPENROUTER_BASE_URL or OpenRouter)"
+    )
+    parser.add_argument(
+        "--num-shards",
+        type=int,
+        default=1,
+        help="Split the dataset across this many workers by a stable hash of the prompt (default: 1)"
+    )
+    parser.add_argument(
+        "--shard-index",
+        type=int,
+        default=0,
+        help="Shard generated by this worker (0-based); output goes to a per-shard file"
+    )
+    parser.add_argument(
+        "--metrics-dir",
+        type=str,
+        default=None,
+        help="Write metrics.json and a Prometheus textfile metrics.prom to this directory"
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=DEFAULT_EXPORT_INTERVAL,
+        help="Seconds between metrics dumps while running (default: 15)"
+    )
+    parser.add_argument(
+        "--dataset-cache-dir",
+        type=str,
+        default=None,
+        help="Cache the prompt column of HuggingFace datasets here as Arrow files for later runs"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Append only prompts missing from the output instead of regenerating it"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Seed for word masking, making the generated dataset reproducible"
+    )
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Skip prompts nearly duplicating one generated before, in this or any earlier run"
+    )
+    parser.add_argument(
+        "--dedup-index",
+        type=str,
+        default=DEFAULT_DEDUP_INDEX_PATH,
+        help=f"Persistent near-duplicate index used with --dedup (default: {DEFAULT_DEDUP_INDEX_PATH})"
+    )
+    parser.add_argument(
+        "--dedup-threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Estimated Jaccard similarity from which prompts are near-duplicates (default: {DEFAULT_THRESHOLD})"
+    )
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    if args.incremental:
+        try:
+            validate_append(args.output, args.output_format)
+        except ValueError as e:
+            parser.error(str(e))
     
     # Run the async pipeline
     asyncio.run(run_pipeline(
@@ -162,7 +380,23 @@ def main():
         column=args.column,
         max_samples=args.max_samples,
         max_concurrent=args.max_concurrent,
-        extract_only=args.extract_only
+        extract_only=args.extract_only,
+        executor=args.executor,
+        ordered=not args.unordered,
+        refresh=args.refresh,
+        analysis_mode=args.analysis_mode,
+        output_format=args.output_format,
+        durability=args.durability,
+        base_url=args.base_url,
+        metrics_dir=args.metrics_dir,
+        metrics_interval=args.metrics_interval,
+        num_shards=args.num_shards,
+        shard_index=args.shard_index,
+        seed=args.seed,
+        incremental=args.incremental,
+        dataset_cache_dir=args.dataset_cache_dir,
+        dedup_index=args.dedup_index if args.dedup else None,
+        dedup_threshold=args.dedup_threshold
     ))
 
 
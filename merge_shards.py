@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Shard Merge Script.
+Verifies and combines the per-shard files written with --num-shards/--shard-index.
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.journal import JOURNAL_SUFFIX
+from src.loaders import iter_records
+from src.sharding import SHARD_FIELD, find_shards, record_shard
+from src.writers import DURABILITY_POLICIES, OUTPUT_FORMATS, open_writer
+
+
+def _record_key(record: dict, key_fields: tuple) -> bytes:
+    text = '\x1f'.join(str(record.get(field, '')) for field in key_fields)
+    return hashlib.sha256(text.encode('utf-8')).digest()[:16]
+
+
+def _filled(record: dict) -> int:
+    """Number of non-empty response fields, used to prefer evaluated duplicates."""
+    return sum(1 for field, value in record.items() if 'response' in field and value)
+
+
+def merge_shards(
+    base_path: str,
+    output: str | None = None,
+    num_shards: int | None = None,
+    key_fields: tuple = (SHARD_FIELD,),
+    allow_missing: bool = False,
+    output_format: str | None = None,
+    durability: str = 'flush'
+) -> int:
+    """Verify shard files and merge them into one deduplicated dataset.
+
+    Shards are read in index order and records keep their order within a
+    shard, so the merged file is identical on every machine. Of records
+    sharing the same key fields only one is kept: the one with the most
+    responses filled in, the first one on a tie. Shards are read twice, so
+    memory stays bounded by one small digest per unique record. Shards may be
+    JSONL, compressed JSONL or Parquet, whatever format they were written in.
+
+    Returns:
+        Process exit code: 0 on success, 1 if shards are missing or inconsistent.
+    """
+    shards, found_count = find_shards(base_path)
+    if not shards:
+        print(f'Error: no shard files found for {base_path}.')
+        return 1
+    num_shards = num_shards or found_count
+    if found_count != num_shards:
+        print(f'Error: shard files were written for {found_count} shards, expected {num_shards}.')
+        return 1
+
+    missing = [index for index in range(num_shards) if index not in shards]
+    if missing:
+        print(f'Missing {len(missing)}/{num_shards} shards: {", ".join(str(i) for i in missing)}')
+        if not allow_missing:
+            print('Refusing to merge an incomplete dataset (use --allow-missing to merge anyway).')
+            return 1
+
+    # Pass 1: verify placement and pick one record per key
+    best = {}
+    total = 0
+    misplaced = 0
+    for index in sorted(shards):
+        path = shards[index]
+        if os.path.exists(str(path) + JOURNAL_SUFFIX):
+            print(f'Warning: {path} has an unmerged journal; run run_attack_prompts.py --compact-only on it first.')
+        count = 0
+        for position, record in enumerate(iter_records(str(path))):
+            count += 1
+            if record_shard(record, num_shards) != index:
+                misplaced += 1
+            key = _record_key(record, key_fields)
+            filled = _filled(record)
+            if key not in best or filled > best[key][0]:
+                best[key] = (filled, index, position)
+        total += count
+        print(f'Shard {index}: {count} records in {path}')
+
+    # Pass 2: write the chosen records in shard order
+    keep = {(index, position) for _, index, position in best.values()}
+    del best
+    output = output or base_path
+    with open_writer(output, output_format, durability=durability) as writer:
+        for index in sorted(shards):
+            for position, record in enumerate(iter_records(str(shards[index]))):
+                if (index, position) in keep:
+                    writer.write(record)
+
+    print(f'Merged {writer.count} unique records ({total - writer.count} duplicates dropped) '
+          f'from {len(shards)}/{num_shards} shards into {output}.')
+    if misplaced:
+        print(f'Warning: {misplaced} records hash to a different shard than the file they were in.')
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Verify and merge per-shard dataset files')
+    parser.add_argument('--input', type=str, default='outputs/dataset.jsonl',
+                        help='Base path the shards were written for, e.g. outputs/dataset.jsonl')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Merged output file (default: the base path)')
+    parser.add_argument('--output-format', type=str, choices=OUTPUT_FORMATS, default=None,
+                        help='Output file format (default: inferred from --output)')
+    parser.add_argument('--durability', type=str, choices=DURABILITY_POLICIES, default='flush',
+                        help='Flush batches to the OS, fsync them, or neither')
+    parser.add_argument('--num-shards', type=int, default=None,
+                        help='Expected number of shards (default: taken from the shard file names)')
+    parser.add_argument('--key', type=str, nargs='+', default=[SHARD_FIELD],
+                        help='Fields identifying duplicate records')
+    parser.add_argument('--allow-missing', action='store_true',
+                        help='Merge the shards that exist even if some are missing')
+
+    args = parser.parse_args()
+
+    sys.exit(merge_shards(
+        base_path=args.input,
+        output=args.output,
+        num_shards=args.num_shards,
+        key_fields=tuple(args.key),
+        allow_missing=args.allow_missing,
+        output_format=args.output_format,
+        durability=args.durability
+    ))
+
+
+if __name__ == '__main__':
+    main()
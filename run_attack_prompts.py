@@ -1,8 +1,26 @@
+#!/usr/bin/env python3
+"""
+Target Model Evaluation Script.
+Sends the attack and vanilla prompt of every dataset record to the target
+models and stores their responses on the records.
+"""
+
+import argparse
+import array
+import asyncio
 import json
 import os
+import signal
 import time
 from dotenv import load_dotenv
-from openai import OpenAI
+
+from src.journal import EvaluationJournal
+from src.metrics import DEFAULT_EXPORT_INTERVAL, MetricsExporter, get_registry
+from src.offset_index import OffsetIndex
+from src.rate_limit import RateLimiter, estimate_tokens
+from src.response_cache import DEFAULT_RESPONSE_CACHE_PATH, ResponseCache
+from src.retry import DEFAULT_MAX_RETRIES, call_with_retries
+from src.sharding import shard_path, validate_shard, write_shard
 
 # Load environment variables
 load_dotenv()
@@ -11,89 +29,605 @@ load_dotenv()
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 MODEL_NAME = "openai/gpt-3.5-turbo-0613"
 INPUT_FILE = "outputs/dataset.jsonl"
-BASE_URL = "https://openrouter.ai/api/v1"
+# OPENROUTER_BASE_URL points the client at any OpenAI-compatible server, e.g. a local mock
+BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+SYSTEM_PROMPT = "You are a helpful assistant."
+# Ceiling for the adaptive rate limiter, which settles below it when the provider throttles
+DEFAULT_MAX_CONCURRENT = 32
+# Sampling parameters sent with every request; part of the response cache key
+SAMPLING_PARAMS = {}
+
+# Order records are sent in: estimated cost, most expensive first, or file order
+SCHEDULES = ("longest", "file")
+# Records kept in flight per model worker; how far a fast model can run ahead of a slow one
+RECORDS_PER_WORKER = 4
+
+# (prompt field, response field) pairs evaluated for every record
+PROMPT_FIELDS = (
+    ("attack_prompt", "target_response"),
+    ("original_prompt", "vanilla_response"),
+)
+# Prompt field -> name used for it in progress messages
+PROMPT_LABELS = {"attack_prompt": "attack", "original_prompt": "vanilla"}
+# Response field -> prompt field it answers, as used by the results journal
+RESPONSE_FIELDS = {response_field: prompt_field for prompt_field, response_field in PROMPT_FIELDS}
+
+
+def model_response_field(response_field, model):
+    """Return the per-model column for a response field, e.g. ``target_response:openai/gpt-4o``."""
+    return f"{response_field}:{model}"
+
+
+def response_fields(models=None):
+    """Map every response column to the prompt field it answers.
+
+    Without ``models`` the single-model columns in RESPONSE_FIELDS are used;
+    with a list of models every response field gets one column per model.
+    """
+    if not models:
+        return dict(RESPONSE_FIELDS)
+    return {
+        model_response_field(response_field, model): prompt_field
+        for model in models
+        for prompt_field, response_field in PROMPT_FIELDS
+    }
+
+
+def request_tokens(prompt, sampling_params=None):
+    """Estimated token cost of one request: the prompt plus the completion cap, if any."""
+    sampling_params = SAMPLING_PARAMS if sampling_params is None else sampling_params
+    return estimate_tokens(SYSTEM_PROMPT + prompt) + sampling_params.get("max_tokens", 0)
+
+
+def pending_calls(record, models, per_model_columns=False):
+    """Yield (model, prompt field, response field, prompt) for every response the record still lacks."""
+    for model in models:
+        for prompt_field, response_field in PROMPT_FIELDS:
+            if per_model_columns:
+                response_field = model_response_field(response_field, model)
+            prompt = record.get(prompt_field)
+            if prompt and not record.get(response_field):
+                yield model, prompt_field, response_field, prompt
+
+
+async def query_model(client, limiter, prompt, model=MODEL_NAME, cache=None, metrics=None,
+                      max_retries=DEFAULT_MAX_RETRIES, sampling_params=None):
+    """Send a single prompt to the target model, holding a rate limiter slot per attempt.
+
+    Throttling, server errors and dropped connections are retried with
+    backoff, honouring Retry-After. Cached responses are returned without a
+    request or a slot. ``sampling_params`` defaults to SAMPLING_PARAMS.
+    """
+    metrics = metrics or get_registry()
+    sampling_params = SAMPLING_PARAMS if sampling_params is None else sampling_params
+    key = None
+    if cache is not None:
+        key = ResponseCache.make_key(model, SYSTEM_PROMPT, prompt, sampling_params)
+        cached = cache.get(key)
+        metrics.inc("cache_lookups_total", cache="response", result="miss" if cached is None else "hit")
+        if cached is not None:
+            return cached
+
+    labels = {"component": "evaluator", "model": model}
+
+    async def attempt():
+        metrics.add_gauge("api_in_flight", 1, component="evaluator")
+        started = time.perf_counter()
+        try:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                **sampling_params
+            )
+        except Exception as e:
+            metrics.inc("api_errors_total", status=getattr(e, "status_code", "connection"), **labels)
+            raise
+        finally:
+            metrics.add_gauge("api_in_flight", -1, component="evaluator")
+        metrics.observe("api_request_seconds", time.perf_counter() - started, **labels)
+        return response
+
+    response = await call_with_retries(
+        attempt,
+        description=f"{model} request",
+        max_retries=max_retries,
+        metrics=metrics,
+        limiter=limiter,
+        tokens=request_tokens(prompt, sampling_params)
+    )
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        metrics.inc("api_tokens_total", usage.prompt_tokens, direction="prompt", **labels)
+        metrics.inc("api_tokens_total", usage.completion_tokens, direction="completion", **labels)
+        # The estimate cannot know the completion length; charge the rest afterwards
+        limiter.charge_tokens(usage.total_tokens - request_tokens(prompt, sampling_params))
+    content = response.choices[0].message.content
+    if cache is not None and content is not None:
+        cache.put(key, model, content)
+    return content
 
-def process_dataset():
-    if not OPENROUTER_API_KEY:
-        print("Error: OPENROUTER_API_KEY not found in environment variables.")
-        return
 
-    print(f"Initializing OpenRouter client with model: {MODEL_NAME}")
-    client = OpenAI(
+async def evaluate_call(client, limiter, journal, record, index, total, call, cache=None, metrics=None,
+                        max_retries=DEFAULT_MAX_RETRIES, per_model_columns=False, sampling_params=None):
+    """Request one missing response of a record and store it in place.
+
+    The response is journaled as soon as it arrives. A response that still
+    fails after all retries is left empty, so the next run requests it again.
+
+    Args:
+        limiter: RateLimiter of the call's model.
+        call: (model, prompt field, response field, prompt), as yielded by ``pending_calls``.
+
+    Returns:
+        1 if a response was stored, else 0.
+    """
+    model, prompt_field, response_field, prompt = call
+    kind = PROMPT_LABELS[prompt_field]
+    label = f" [{model}]" if per_model_columns else ""
+    try:
+        response = await query_model(client, limiter, prompt, model, cache, metrics, max_retries, sampling_params)
+    except Exception as e:
+        print(f"Error processing {kind} record {index + 1}{label} (left for the next run): {e}")
+        return 0
+    record[response_field] = response
+    if journal is not None:
+        journal.append(index, response_field, prompt, response)
+    print(f"Processed {kind} prompt for record {index + 1}{f'/{total}' if total else ''}{label}")
+    return 1
+
+
+async def evaluate_record(client, limiters, journal, record, index, total, cache=None, metrics=None,
+                          max_retries=DEFAULT_MAX_RETRIES, per_model_columns=False, sampling_params=None):
+    """Fill the missing responses of one record in place.
+
+    Every prompt is sent to every target model concurrently, each call holding
+    a slot of its model's rate limiter, and this returns once all of them are
+    in. Evaluating many records this way ties every model to the slowest one;
+    ``evaluate_records`` schedules the calls per model instead.
+    Returns the number of new responses stored on the record.
+
+    Args:
+        limiters: Mapping of target model to its RateLimiter.
+        journal: EvaluationJournal receiving every response, or None when the
+            caller writes the finished record itself.
+        total: Number of records, shown in progress messages. None if unknown.
+        per_model_columns: Store responses in ``<field>:<model>`` columns
+            instead of the single-model ``target_response``/``vanilla_response``.
+        sampling_params: Sampling parameters of every request. None uses SAMPLING_PARAMS.
+    """
+    metrics = metrics or get_registry()
+    calls = [
+        evaluate_call(client, limiters[call[0]], journal, record, index, total, call, cache, metrics, max_retries,
+                      per_model_columns, sampling_params)
+        for call in pending_calls(record, limiters, per_model_columns)
+    ]
+    if not calls:
+        return 0
+    stored = sum(await asyncio.gather(*calls))
+    metrics.inc("records_total", stage="evaluate")
+    return stored
+
+
+async def evaluate_records(records, client, limiters, journal, total=None, cache=None, metrics=None,
+                           max_retries=DEFAULT_MAX_RETRIES, per_model_columns=False, sampling_params=None,
+                           max_concurrent=DEFAULT_MAX_CONCURRENT, max_records=None, on_record=None):
+    """Fill the missing responses of a stream of records, with a worker pool per target model.
+
+    Every missing response becomes one work item on its model's queue, served
+    by ``max_concurrent`` workers of that model only, so a slow model never
+    holds a fast one's workers: the fast model moves on to later records while
+    the slow one catches up. A record is kept until its last call finishes,
+    then handed to ``on_record(index, record, stored)``; records without
+    missing responses are handed over right away.
+
+    Args:
+        records: Async iterable of (index, record); indices must be unique.
+        limiters: Mapping of target model to its RateLimiter.
+        journal: EvaluationJournal receiving every response, or None.
+        max_concurrent: Workers per model.
+        max_records: Records in flight at once, which bounds memory and how far
+            the fastest model runs ahead of the slowest. None uses
+            ``RECORDS_PER_WORKER`` per model worker.
+        on_record: Called with every finished record. None to only count responses.
+
+    Returns:
+        Number of new responses stored.
+    """
+    metrics = metrics or get_registry()
+    max_concurrent = max(1, max_concurrent)
+    window = asyncio.Semaphore(max_records or max_concurrent * len(limiters) * RECORDS_PER_WORKER)
+    queues = {model: asyncio.Queue() for model in limiters}
+    # Record index -> [calls still outstanding, responses stored]
+    outstanding = {}
+    stored = 0
+
+    def finish(index, record, responses):
+        nonlocal stored
+        stored += responses
+        window.release()
+        if on_record is not None:
+            on_record(index, record, responses)
+
+    async def produce():
+        async for index, record in records:
+            await window.acquire()
+            calls = list(pending_calls(record, limiters, per_model_columns))
+            if not calls:
+                finish(index, record, 0)
+                continue
+            outstanding[index] = [len(calls), 0]
+            for call in calls:
+                queues[call[0]].put_nowait((index, record, call))
+        for queue in queues.values():
+            for _ in range(max_concurrent):
+                queue.put_nowait(None)
+
+    async def work(model):
+        queue = queues[model]
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            index, record, call = item
+            responses = await evaluate_call(client, limiters[model], journal, record, index, total, call, cache,
+                                            metrics, max_retries, per_model_columns, sampling_params)
+            state = outstanding[index]
+            state[0] -= 1
+            state[1] += responses
+            if not state[0]:
+                del outstanding[index]
+                metrics.inc("records_total", stage="evaluate")
+                finish(index, record, state[1])
+
+    tasks = [asyncio.create_task(produce())]
+    tasks += [asyncio.create_task(work(model)) for model in limiters for _ in range(max_concurrent)]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return stored
+
+
+def make_client(base_url=BASE_URL):
+    """Create the OpenAI-compatible client; retries are left to call_with_retries."""
+    # Imported here so --help and --compact-only don't pay for the openai package
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(
         api_key=OPENROUTER_API_KEY,
-        base_url=BASE_URL
+        base_url=base_url,
+        max_retries=0
     )
 
-    if not os.path.exists(INPUT_FILE):
-        print(f"Error: Input file '{INPUT_FILE}' not found.")
+
+def make_limiters(models, max_concurrent=DEFAULT_MAX_CONCURRENT, requests_per_minute=None,
+                  tokens_per_minute=None, per_model_columns=False, metrics=None):
+    """Create one adaptive rate limiter per target model.
+
+    Separate pools keep throttling or slowness of one model from affecting the others.
+    """
+    return {
+        target: RateLimiter(
+            max_concurrency=max_concurrent,
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+            name=f"evaluator:{target}" if per_model_columns else "evaluator",
+            metrics=metrics
+        )
+        for target in models
+    }
+
+
+def compact_journal(input_file=INPUT_FILE, models=None):
+    """Fold a leftover results journal back into the dataset file."""
+    journal = EvaluationJournal(input_file)
+    if not journal.path.exists():
+        print(f"No journal found for {input_file}.")
+        return
+    merged = journal.compact(response_fields(models))
+    print(f"Compacted {merged} journaled responses into {input_file}.")
+
+
+def schedule_longest_first(offsets, journal, models, per_model_columns=False, sampling_params=None):
+    """Order the records that still need responses by estimated token cost, most expensive first.
+
+    A fixed-order run ends with whichever records happen to be last; if those
+    are long ASCII-art prompts, a handful of slow requests holds up the end of
+    the run. Starting the most expensive records first (greedy longest-first
+    packing onto the shared workers) leaves only short requests for the tail.
+    Ties keep file order. Records are read once; only their costs are kept.
+
+    Returns:
+        (record indices as an array, total estimated tokens, largest record estimate).
+    """
+    costs = array.array("Q")
+    for index, record in enumerate(offsets):
+        journal.restore(index, record)
+        costs.append(sum(
+            request_tokens(prompt, sampling_params)
+            for _, _, _, prompt in pending_calls(record, models, per_model_columns)
+        ))
+    order = array.array("Q", sorted(
+        (index for index, cost in enumerate(costs) if cost), key=costs.__getitem__, reverse=True
+    ))
+    return order, sum(costs), max(costs, default=0)
+
+
+def show_records(input_file=INPUT_FILE, numbers=(), models=None):
+    """Print records by their 1-based number, with responses still in the journal applied.
+
+    Records are read by seeking through the offset index, so a spot check
+    costs the same on any dataset size once the index exists.
+    """
+    if not os.path.exists(input_file):
+        print(f"Error: Input file '{input_file}' not found.")
         return
+    offsets = OffsetIndex(input_file)
+    total = offsets.load()
+    journal = EvaluationJournal(input_file)
+    journal.load(response_fields(models), total)
+    try:
+        for number in numbers:
+            if not 1 <= number <= total:
+                print(f"Record {number} out of range (1-{total}).")
+                continue
+            record = offsets.read(number - 1)
+            journal.restore(number - 1, record)
+            print(f"--- record {number}/{total} ---")
+            print(json.dumps(record, ensure_ascii=False, indent=2))
+    finally:
+        offsets.close()
+        journal.close()
+
+
+async def process_dataset(
+    input_file=INPUT_FILE,
+    model=MODEL_NAME,
+    max_concurrent=DEFAULT_MAX_CONCURRENT,
+    base_url=BASE_URL,
+    compact=True,
+    durable=False,
+    cache_path=DEFAULT_RESPONSE_CACHE_PATH,
+    cache_ttl=None,
+    cache_max_entries=None,
+    metrics_dir=None,
+    metrics_interval=DEFAULT_EXPORT_INTERVAL,
+    requests_per_minute=None,
+    tokens_per_minute=None,
+    max_retries=DEFAULT_MAX_RETRIES,
+    models=None,
+    num_shards=1,
+    shard_index=0,
+    schedule="longest",
+    max_tokens=None
+):
+    """Evaluate a dataset in place against one or more target models.
+
+    Records are streamed from the file and every missing response is queued
+    for its model's ``max_concurrent`` workers; only records with calls still
+    outstanding are in memory, so it does not grow with the dataset. Responses go to the journal as they
+    arrive and are folded into the file in one streaming pass at the end.
+
+    With ``schedule="longest"`` records are sent in order of estimated token
+    cost, most expensive first, read by seeking through the offset index;
+    results still land in file order. ``max_tokens`` caps every completion.
+
+    With ``models`` the dataset is read once and every listed model gets its
+    own concurrency pool (``max_concurrent`` each) and ``<field>:<model>``
+    response columns; otherwise ``model`` fills the single-model columns.
+
+    With ``num_shards`` > 1 only the records of ``shard_index`` are evaluated:
+    they are first copied into a per-shard file next to the input, which is
+    then evaluated in place, so a rerun of the same shard resumes it.
+    """
+    validate_shard(shard_index, num_shards)
+    if not OPENROUTER_API_KEY:
+        print("Error: OPENROUTER_API_KEY not found in environment variables.")
+        return
+
+    if not os.path.exists(input_file):
+        print(f"Error: Input file '{input_file}' not found.")
+        return
+
+    if num_shards > 1:
+        shard_file = shard_path(input_file, shard_index, num_shards)
+        if os.path.exists(shard_file):
+            print(f"Resuming shard {shard_index + 1}/{num_shards} in {shard_file}.")
+        else:
+            count = write_shard(input_file, shard_file, shard_index, num_shards)
+            print(f"Wrote {count} records of shard {shard_index + 1}/{num_shards} to {shard_file}.")
+        input_file = shard_file
 
-    print(f"Reading dataset from {INPUT_FILE}...")
-    records = []
-    with open(INPUT_FILE, 'r', encoding='utf-8') as f:
-        for line in f:
-            if line.strip():
-                records.append(json.loads(line))
+    per_model_columns = bool(models)
+    models = list(dict.fromkeys(models)) if models else [model]
+    fields = response_fields(models if per_model_columns else None)
 
-    total_records = len(records)
+    print(f"Initializing OpenRouter client with model(s): {', '.join(models)}")
+    client = make_client(base_url)
+
+    print(f"Indexing dataset {input_file}...")
+    offsets = OffsetIndex(input_file)
+    total_records = offsets.load()
     print(f"Found {total_records} records.")
 
+    # Responses from a previous, unfinished run are read back as their records come up
+    journal = EvaluationJournal(input_file, durable=durable)
+    journaled = journal.load(fields, total_records)
+    if journaled:
+        print(f"Found {journaled} responses in journal {journal.path}; they are not requested again.")
+
+    cache = None
+    if cache_path:
+        cache = ResponseCache(cache_path, ttl=cache_ttl, max_entries=cache_max_entries)
+        print(f"Using response cache {cache_path} ({len(cache)} entries).")
+
+    metrics = get_registry()
+    exporter = MetricsExporter(metrics_dir, metrics, interval=metrics_interval).start() if metrics_dir else None
+
+    print(f"Evaluating with up to {max_concurrent} concurrent requests per model (adaptive).")
+    limiters = make_limiters(models, max_concurrent, requests_per_minute, tokens_per_minute,
+                             per_model_columns, metrics)
+    sampling_params = dict(SAMPLING_PARAMS)
+    if max_tokens:
+        sampling_params["max_tokens"] = max_tokens
+
+    order = None
+    if schedule == "longest":
+        order, estimated, longest = schedule_longest_first(offsets, journal, models, per_model_columns,
+                                                           sampling_params)
+        print(f"Scheduled {len(order)} records longest-first (~{estimated} tokens, "
+              f"largest record ~{longest}).")
+
+    # Records are streamed from the file; only those being evaluated are in memory
     processed_count = 0
-    updated = False
 
+    async def records():
+        indexed = enumerate(offsets) if order is None else ((index, offsets.read(index)) for index in order)
+        for index, record in indexed:
+            journal.restore(index, record)
+            yield index, record
+
+    def count(index, record, stored):
+        nonlocal processed_count
+        processed_count += stored
+
+    tasks = [asyncio.create_task(evaluate_records(
+        records(), client, limiters, journal, total_records, cache, metrics, max_retries, per_model_columns,
+        sampling_params, max_concurrent, on_record=count
+    ))]
+
+    # Treat SIGTERM like Ctrl+C so the journal is closed and compacted cleanly
+    loop = asyncio.get_running_loop()
+    current = asyncio.current_task()
     try:
-        for i, record in enumerate(records):
-            # Process attack prompt
-            if not record.get("target_response"):
-                attack_prompt = record.get("attack_prompt")
-                if attack_prompt:
-                    print(f"Processing attack prompt for record {i+1}/{total_records}...")
-                    try:
-                        response = client.chat.completions.create(
-                            model=MODEL_NAME,
-                            messages=[
-                                {"role": "system", "content": "You are a helpful assistant."},
-                                {"role": "user", "content": attack_prompt}
-                            ],
-                        )
-                        record["target_response"] = response.choices[0].message.content
-                        updated = True
-                        processed_count += 1
-                    except Exception as e:
-                        print(f"Error processing attack record {i+1}: {e}")
-            
-            # Process vanilla prompt
-            if not record.get("vanilla_response"):
-                original_prompt = record.get("original_prompt")
-                if original_prompt:
-                    print(f"Processing vanilla prompt for record {i+1}/{total_records}...")
-                    try:
-                        response = client.chat.completions.create(
-                            model=MODEL_NAME,
-                            messages=[
-                                {"role": "system", "content": "You are a helpful assistant."},
-                                {"role": "user", "content": original_prompt}
-                            ],
-                        )
-                        record["vanilla_response"] = response.choices[0].message.content
-                        updated = True
-                        processed_count += 1
-                    except Exception as e:
-                        print(f"Error processing vanilla record {i+1}: {e}")
+        loop.add_signal_handler(signal.SIGTERM, current.cancel)
+    except (NotImplementedError, RuntimeError):
+        pass
 
-    except KeyboardInterrupt:
-        print("\nProcess interrupted by user. Saving progress...")
-
-    if updated:
-        print(f"Saving updated dataset to {INPUT_FILE}...")
-        with open(INPUT_FILE, 'w', encoding='utf-8') as f:
-            for record in records:
-                f.write(json.dumps(record) + "\n")
-        print("Save complete.")
+    started = time.monotonic()
+    try:
+        await asyncio.gather(*tasks)
+    except asyncio.CancelledError:
+        print("\nProcess interrupted. Progress is kept in the journal.")
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        metrics.record_phase("evaluate", time.monotonic() - started)
+        offsets.close()
+        journal.close()
+        await client.close()
+        if cache is not None:
+            stats = cache.stats()
+            evicted = cache.close()
+            print(f"Response cache: {stats['hits']} hits, {stats['misses']} misses "
+                  f"({stats['hit_rate']:.0%} hit rate), {stats['entries'] - evicted} entries.")
+
+    if compact and journal.path.exists():
+        print(f"Compacting journal into {input_file}...")
+        merged = journal.compact(fields)
+        print(f"Save complete. {merged} responses written.")
+    elif journal.path.exists():
+        hint = " with the same --models" if per_model_columns else ""
+        print(f"Responses kept in {journal.path}. Run with --compact-only{hint} to fold them in.")
     else:
         print("No changes were made to the dataset.")
 
-    print(f"Job finished. Processed {processed_count} new prompts.")
+    elapsed = time.monotonic() - started
+    print(f"Job finished. Processed {processed_count} new prompts in {elapsed:.1f}s.")
+    if exporter is not None:
+        exporter.stop()
+        print(f"Metrics written to {metrics_dir}.")
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Query the target model with attack and vanilla prompts')
+    parser.add_argument('--input', type=str, default=INPUT_FILE,
+                        help='Dataset JSONL file to evaluate in place')
+    parser.add_argument('--model', type=str, default=MODEL_NAME,
+                        help='Target model name on OpenRouter')
+    parser.add_argument('--models', type=str, nargs='+', default=None,
+                        help='Evaluate several target models in one pass, each with its own concurrency '
+                             'pool, writing <field>:<model> columns (overrides --model)')
+    parser.add_argument('--max-concurrent', type=int, default=DEFAULT_MAX_CONCURRENT,
+                        help='Upper bound on concurrent API calls per model; the limiter backs off below it on 429s')
+    parser.add_argument('--rpm', type=float, default=None,
+                        help='Requests-per-minute budget (default: unlimited)')
+    parser.add_argument('--tpm', type=float, default=None,
+                        help='Tokens-per-minute budget, using a chars/4 estimate (default: unlimited)')
+    parser.add_argument('--max-retries', type=int, default=DEFAULT_MAX_RETRIES,
+                        help='Retries per request for throttling, server errors and timeouts')
+    parser.add_argument('--max-tokens', type=int, default=None,
+                        help='Cap on completion tokens per request, bounding the slowest call (default: no cap)')
+    parser.add_argument('--schedule', type=str, choices=SCHEDULES, default='longest',
+                        help='Send records with the largest estimated token count first, or in file order; '
+                             'results are written in file order either way')
+    parser.add_argument('--num-shards', type=int, default=1,
+                        help='Split the dataset across this many workers by a stable hash of the original prompt')
+    parser.add_argument('--shard-index', type=int, default=0,
+                        help='Shard evaluated by this worker (0-based), in a per-shard copy of the input')
+    parser.add_argument('--base-url', type=str, default=BASE_URL,
+                        help='OpenAI-compatible API base URL (default: $OPENROUTER_BASE_URL or OpenRouter)')
+    parser.add_argument('--no-compact', action='store_true',
+                        help='Leave responses in the journal instead of folding them into the dataset')
+    parser.add_argument('--compact-only', action='store_true',
+                        help='Fold an existing journal into the dataset without querying the model')
+    parser.add_argument('--show', type=int, nargs='+', default=None, metavar='N',
+                        help='Print records N (1-based, as in progress messages) with journaled responses and exit')
+    parser.add_argument('--fsync', action='store_true',
+                        help='fsync the journal after every response (survives power loss)')
+    parser.add_argument('--cache-path', type=str, default=DEFAULT_RESPONSE_CACHE_PATH,
+                        help='SQLite response cache shared across runs')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always query the model, bypassing the response cache')
+    parser.add_argument('--cache-ttl', type=float, default=None,
+                        help='Expire cached responses after this many seconds (default: never)')
+    parser.add_argument('--cache-max-entries', type=int, default=None,
+                        help='Keep at most this many cached responses, evicting least recently used')
+    parser.add_argument('--metrics-dir', type=str, default=None,
+                        help='Write metrics.json and a Prometheus textfile metrics.prom to this directory')
+    parser.add_argument('--metrics-interval', type=float, default=DEFAULT_EXPORT_INTERVAL,
+                        help='Seconds between metrics dumps while running')
+
+    args = parser.parse_args(argv)
+
+    if args.compact_only:
+        compact_journal(shard_path(args.input, args.shard_index, args.num_shards), args.models)
+        return
+    if args.show:
+        show_records(shard_path(args.input, args.shard_index, args.num_shards), args.show, args.models)
+        return
+
+    try:
+        asyncio.run(process_dataset(
+            input_file=args.input,
+            model=args.model,
+            max_concurrent=args.max_concurrent,
+            base_url=args.base_url,
+            compact=not args.no_compact,
+            durable=args.fsync,
+            cache_path=None if args.no_cache else args.cache_path,
+            cache_ttl=args.cache_ttl,
+            cache_max_entries=args.cache_max_entries,
+            metrics_dir=args.metrics_dir,
+            metrics_interval=args.metrics_interval,
+            requests_per_minute=args.rpm,
+            tokens_per_minute=args.tpm,
+            max_retries=args.max_retries,
+            models=args.models,
+            num_shards=args.num_shards,
+            shard_index=args.shard_index,
+            schedule=args.schedule,
+            max_tokens=args.max_tokens
+        ))
+    except KeyboardInterrupt:
+        pass
+
 
 if __name__ == "__main__":
-    process_dataset()
+    main()
@@ -9,11 +9,17 @@ import argparse
 import json
 import os
 import sys
+import time
 
 # Add current directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from generator.generator import DatasetGenerator
+from src.dedup import DEFAULT_DEDUP_INDEX_PATH, DEFAULT_THRESHOLD, DedupIndex, skip_any
+from src.incremental import GenerationIndex
+from src.metrics import DEFAULT_EXPORT_INTERVAL, MetricsExporter, get_registry
+from src.sharding import shard_path, validate_shard
+from src.writers import DURABILITY_POLICIES, OUTPUT_FORMATS, open_writer, validate_append, with_format_suffix
 
 
 async def run_generation(
@@ -21,9 +27,26 @@ async def run_generation(
     dataset: str,
     column: str,
     max_samples: int | None,
-    max_concurrent: int
+    max_concurrent: int,
+    executor: str = 'process',
+    ordered: bool = True,
+    atlas_dir: str | None = None,
+    output_format: str | None = None,
+    durability: str = 'flush',
+    metrics_dir: str | None = None,
+    metrics_interval: float = DEFAULT_EXPORT_INTERVAL,
+    num_shards: int = 1,
+    shard_index: int = 0,
+    seed: int | None = None,
+    incremental: bool = False,
+    dataset_cache_dir: str | None = None,
+    dedup_index: str | None = None,
+    dedup_threshold: float = DEFAULT_THRESHOLD
 ):
     """Run the dataset generation."""
+    validate_shard(shard_index, num_shards)
+    if incremental:
+        validate_append(output, output_format)
     
     # Load the strategy
     strategy_path = os.path.join(
@@ -37,31 +60,82 @@ async def run_generation(
     
     generator = DatasetGenerator(
         strategy=strategy,
-        max_concurrent=max_concurrent
+        max_concurrent=max_concurrent,
+        executor=executor,
+        atlas_dir=atlas_dir,
+        seed=seed,
+        dataset_cache_dir=dataset_cache_dir
     )
     
-    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    if output_format:
+        output = with_format_suffix(output, output_format)
+    # Each shard writes its own file; merge_shards.py reassembles them
+    output = shard_path(output, shard_index, num_shards)
+    
+    metrics = get_registry()
+    index = None
+    if incremental:
+        # Append only prompts not yet in the output, tracked by a content-hash index next to it
+        index = GenerationIndex(output, strategy, generator.transform_params(), metrics=metrics)
+        print(f'Incremental mode: {index.load()} records already in {output}')
+    dedup = None
+    if dedup_index:
+        # Near-duplicates of anything generated before are dropped before transforming
+        dedup = DedupIndex(dedup_index, threshold=dedup_threshold, metrics=metrics)
+        print(f'Dedup index {dedup_index}: {len(dedup)} prompts already generated')
     
-    count = 0
     print(f'Generating to {output}...')
     
-    with open(output, 'w', encoding='utf-8') as f:
-        async for pair in generator.generate_adversarial_pairs(
-            dataset_name=dataset,
-            column=column,
-            max_samples=max_samples
-        ):
-            f.write(json.dumps(pair, ensure_ascii=False) + '\n')
-            f.flush()
-            count += 1
+    exporter = MetricsExporter(metrics_dir, metrics, interval=metrics_interval).start() if metrics_dir else None
+    write_seconds = 0.0
+    try:
+        with metrics.phase('generate'), \
+                open_writer(output, output_format, durability=durability, append=incremental) as writer:
+            async for pair in generator.generate_adversarial_pairs(
+                dataset_name=dataset,
+                column=column,
+                max_samples=max_samples,
+                ordered=ordered,
+                num_shards=num_shards,
+                shard_index=shard_index,
+                skip=skip_any(index.seen if index is not None else None,
+                              dedup.claim if dedup is not None else None)
+            ):
+                started = time.perf_counter()
+                writer.write(pair)
+                if index is not None:
+                    index.add(pair['original_prompt'])
+                if dedup is not None:
+                    dedup.confirm(pair['original_prompt'])
+                write_seconds += time.perf_counter() - started
+        if index is not None:
+            index.commit()
+        if dedup is not None:
+            dedup.commit()
+    finally:
+        metrics.record_phase('write', write_seconds)
+        if index is not None:
+            index.close()
+        if dedup is not None:
+            dedup.close()
+        if exporter is not None:
+            exporter.stop()
     
-    print(f'Done. Generated {count} samples.')
+    if index is not None:
+        print(f'Skipped {index.skipped} prompts already generated.')
+    if dedup is not None:
+        print(f'Skipped {dedup.duplicates} near-duplicate prompts.')
+    print(f'Done. Generated {writer.count} samples.')
 
 
-def main():
-    parser = argparse.ArgumentParser(description='Generate adversarial dataset')
+def main(argv: list[str] | None = None, prog: str | None = None):
+    parser = argparse.ArgumentParser(prog=prog, description='Generate adversarial dataset')
     parser.add_argument('--output', type=str, default='outputs/dataset.jsonl',
                         help='Output file path')
+    parser.add_argument('--output-format', type=str, choices=OUTPUT_FORMATS, default=None,
+                        help='Output file format (default: inferred from --output)')
+    parser.add_argument('--durability', type=str, choices=DURABILITY_POLICIES, default='flush',
+                        help='Flush batches to the OS, fsync them, or neither')
     parser.add_argument('--dataset', type=str, default='local',
                         help='Dataset source (defaults to local generator/vanilla_prompts.jsonl)')
     parser.add_argument('--column', type=str, default='vanilla',
@@ -70,15 +144,60 @@ def main():
                         help='Maximum number of samples to generate')
     parser.add_argument('--max-concurrent', type=int, default=10,
                         help='Maximum concurrent operations')
+    parser.add_argument('--executor', type=str, choices=['process', 'thread'], default='process',
+                        help='Worker pool used for prompt transforms')
+    parser.add_argument('--unordered', action='store_true',
+                        help='Write pairs as soon as they are ready instead of in input order')
+    parser.add_argument('--atlas-dir', type=str, default=None,
+                        help='Directory to persist ASCII-art glyph atlases for warm starts')
+    parser.add_argument('--num-shards', type=int, default=1,
+                        help='Split the input across this many workers by a stable hash of the prompt')
+    parser.add_argument('--shard-index', type=int, default=0,
+                        help='Shard generated by this worker (0-based); output goes to a per-shard file')
+    parser.add_argument('--metrics-dir', type=str, default=None,
+                        help='Write metrics.json and a Prometheus textfile metrics.prom to this directory')
+    parser.add_argument('--metrics-interval', type=float, default=DEFAULT_EXPORT_INTERVAL,
+                        help='Seconds between metrics dumps while running')
+    parser.add_argument('--dataset-cache-dir', type=str, default=None,
+                        help='Cache the prompt column of HuggingFace datasets here as Arrow files for later runs')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Append only prompts missing from the output instead of regenerating it')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Seed for word masking, making the generated dataset reproducible')
+    parser.add_argument('--dedup', action='store_true',
+                        help='Skip prompts nearly duplicating one generated before, in this or any earlier run')
+    parser.add_argument('--dedup-index', type=str, default=DEFAULT_DEDUP_INDEX_PATH,
+                        help='Persistent near-duplicate index used with --dedup')
+    parser.add_argument('--dedup-threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Estimated Jaccard similarity from which prompts count as near-duplicates')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    if args.incremental:
+        try:
+            validate_append(args.output, args.output_format)
+        except ValueError as e:
+            parser.error(str(e))
     
     asyncio.run(run_generation(
         output=args.output,
         dataset=args.dataset,
         column=args.column,
         max_samples=args.max_samples,
-        max_concurrent=args.max_concurrent
+        max_concurrent=args.max_concurrent,
+        executor=args.executor,
+        ordered=not args.unordered,
+        atlas_dir=args.atlas_dir,
+        output_format=args.output_format,
+        durability=args.durability,
+        metrics_dir=args.metrics_dir,
+        metrics_interval=args.metrics_interval,
+        num_shards=args.num_shards,
+        shard_index=args.shard_index,
+        seed=args.seed,
+        incremental=args.incremental,
+        dataset_cache_dir=args.dataset_cache_dir,
+        dedup_index=args.dedup_index if args.dedup else None,
+        dedup_threshold=args.dedup_threshold
     ))
 
 
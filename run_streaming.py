@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Streaming Generate-and-Evaluate Script.
+Feeds generated pairs through a bounded queue straight into target-model
+workers and writes every record once, with its responses attached.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import run_attack_prompts
+from generator.generator import DatasetGenerator
+from run_attack_prompts import (
+    BASE_URL, DEFAULT_MAX_CONCURRENT, MODEL_NAME, RECORDS_PER_WORKER, SAMPLING_PARAMS, evaluate_records, make_client, make_limiters
+)
+from src.dedup import DEFAULT_DEDUP_INDEX_PATH, DEFAULT_THRESHOLD, DedupIndex, skip_any
+from src.incremental import GenerationIndex
+from src.metrics import DEFAULT_EXPORT_INTERVAL, MetricsExporter, get_registry
+from src.response_cache import DEFAULT_RESPONSE_CACHE_PATH, ResponseCache
+from src.retry import DEFAULT_MAX_RETRIES
+from src.sharding import shard_path, validate_shard
+from src.writers import DURABILITY_POLICIES, OUTPUT_FORMATS, open_writer, validate_append, with_format_suffix
+
+DEFAULT_STRATEGY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'generator', 'extracted_strategy.json')
+# Generated records waiting for a free evaluation worker
+DEFAULT_QUEUE_SIZE = 256
+
+
+async def run_streaming(
+    output: str,
+    dataset: str,
+    column: str = 'vanilla',
+    strategy_path: str = DEFAULT_STRATEGY_PATH,
+    max_samples: int | None = None,
+    transform_workers: int = 10,
+    executor: str = 'process',
+    seed: int | None = None,
+    model: str = MODEL_NAME,
+    models: list[str] | None = None,
+    max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+    base_url: str = BASE_URL,
+    requests_per_minute: float | None = None,
+    tokens_per_minute: float | None = None,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    max_tokens: int | None = None,
+    cache_path: str | None = DEFAULT_RESPONSE_CACHE_PATH,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    ordered: bool = True,
+    incremental: bool = False,
+    output_format: str | None = None,
+    durability: str = 'flush',
+    metrics_dir: str | None = None,
+    metrics_interval: float = DEFAULT_EXPORT_INTERVAL,
+    num_shards: int = 1,
+    shard_index: int = 0,
+    dedup_index: str | None = None,
+    dedup_threshold: float = DEFAULT_THRESHOLD
+):
+    """Generate adversarial pairs and evaluate them in one pass.
+
+    Pairs enter a queue of ``queue_size`` records as they leave the transform
+    pool, so the first request goes out within seconds. When the queue is
+    full, generation pauses. Every model has its own ``max_concurrent``
+    workers, so a fast model keeps working on later records while a slow one
+    catches up. Every record is written once all its responses are in, in
+    input order unless ``ordered`` is False. At most ``queue_size`` records
+    plus ``RECORDS_PER_WORKER`` per model worker are held in memory. A
+    response that fails after all retries is left empty; run
+    run_attack_prompts.py on the output to fill it in later. With ``incremental``, records already in
+    the output are skipped, so an interrupted run resumes where it stopped.
+    With ``dedup_index``, prompts nearly duplicating one produced before are
+    skipped too, and the written ones are added to that index.
+    ``max_tokens`` caps every completion.
+    """
+    validate_shard(shard_index, num_shards)
+    if incremental:
+        validate_append(output, output_format)
+    if not run_attack_prompts.OPENROUTER_API_KEY:
+        print('Error: OPENROUTER_API_KEY not found in environment variables.')
+        return
+
+    with open(strategy_path, 'r', encoding='utf-8') as f:
+        strategy = json.load(f)
+
+    metrics = get_registry()
+    generator = DatasetGenerator(
+        strategy=strategy,
+        max_concurrent=transform_workers,
+        executor=executor,
+        metrics=metrics,
+        seed=seed
+    )
+
+    if output_format:
+        output = with_format_suffix(output, output_format)
+    output = shard_path(output, shard_index, num_shards)
+
+    index = None
+    if incremental:
+        index = GenerationIndex(output, strategy, generator.transform_params(), metrics=metrics)
+        print(f'Incremental mode: {index.load()} records already in {output}')
+    dedup = None
+    if dedup_index:
+        dedup = DedupIndex(dedup_index, threshold=dedup_threshold, metrics=metrics)
+        print(f'Dedup index {dedup_index}: {len(dedup)} prompts already produced')
+
+    per_model_columns = bool(models)
+    models = list(dict.fromkeys(models)) if models else [model]
+    print(f"Streaming {dataset} through model(s) {', '.join(models)} into {output}...")
+    client = make_client(base_url)
+    limiters = make_limiters(models, max_concurrent, requests_per_minute, tokens_per_minute,
+                             per_model_columns, metrics)
+    sampling_params = dict(SAMPLING_PARAMS)
+    if max_tokens:
+        sampling_params['max_tokens'] = max_tokens
+    cache = None
+    if cache_path:
+        cache = ResponseCache(cache_path)
+        print(f'Using response cache {cache_path} ({len(cache)} entries).')
+
+    exporter = MetricsExporter(metrics_dir, metrics, interval=metrics_interval).start() if metrics_dir else None
+    queue = asyncio.Queue(maxsize=max(1, queue_size))
+    # Records whose calls are queued or running, across all models
+    in_flight = max(1, max_concurrent) * len(models) * RECORDS_PER_WORKER
+    # Caps records anywhere between the generator and the writer, including ones
+    # finished early and held back for ordering
+    window = asyncio.Semaphore(max(1, queue_size) + in_flight)
+    finished = {}
+    next_to_write = 0
+    stored = 0
+    pairs = generator.generate_adversarial_pairs(
+        dataset_name=dataset,
+        column=column,
+        max_samples=max_samples,
+        ordered=ordered,
+        num_shards=num_shards,
+        shard_index=shard_index,
+        skip=skip_any(index.seen if index is not None else None, dedup.claim if dedup is not None else None)
+    )
+
+    def write(record, responses):
+        nonlocal stored
+        writer.write(record)
+        stored += responses
+        if index is not None:
+            index.add(record['original_prompt'])
+        if dedup is not None:
+            dedup.confirm(record['original_prompt'])
+        window.release()
+
+    async def produce():
+        position = 0
+        async for pair in pairs:
+            await window.acquire()
+            await queue.put((position, pair))
+            metrics.set_gauge('queue_depth', queue.qsize(), queue='stream')
+            position += 1
+        await queue.put(None)
+
+    async def records():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            yield item
+
+    def on_record(position, record, responses):
+        nonlocal next_to_write
+        if not ordered:
+            write(record, responses)
+            return
+        finished[position] = (record, responses)
+        while next_to_write in finished:
+            write(*finished.pop(next_to_write))
+            next_to_write += 1
+
+    tasks = []
+    started = time.monotonic()
+    try:
+        with open_writer(output, output_format, durability=durability, append=incremental) as writer:
+            tasks = [asyncio.create_task(produce())]
+            tasks.append(asyncio.create_task(evaluate_records(
+                records(), client, limiters, None, None, cache, metrics, max_retries, per_model_columns,
+                sampling_params, max_concurrent, in_flight, on_record
+            )))
+            # Treat SIGTERM like Ctrl+C so finished records are flushed
+            loop = asyncio.get_running_loop()
+            try:
+                loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+            except (NotImplementedError, RuntimeError):
+                pass
+            try:
+                await asyncio.gather(*tasks)
+            except asyncio.CancelledError:
+                print('\nProcess interrupted. Finished records were written; rerun with --incremental to resume.')
+        if index is not None:
+            index.commit()
+        if dedup is not None:
+            dedup.commit()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await pairs.aclose()
+        metrics.record_phase('stream', time.monotonic() - started)
+        if index is not None:
+            index.close()
+        if dedup is not None:
+            dedup.close()
+        await client.close()
+        if cache is not None:
+            cache.close()
+        if exporter is not None:
+            exporter.stop()
+
+    if index is not None:
+        print(f'Skipped {index.skipped} prompts already in the output.')
+    if dedup is not None:
+        print(f'Skipped {dedup.duplicates} near-duplicate prompts.')
+    print(f'Done. Wrote {writer.count} records with {stored} new responses '
+          f'in {time.monotonic() - started:.1f}s.')
+
+
+def main(argv: list[str] | None = None, prog: str | None = None):
+    parser = argparse.ArgumentParser(prog=prog, description='Generate and evaluate an adversarial dataset in one pass')
+    parser.add_argument('--output', type=str, default='outputs/dataset.jsonl',
+                        help='Output file; records are written once, with responses')
+    parser.add_argument('--output-format', type=str, choices=OUTPUT_FORMATS, default=None,
+                        help='Output file format (default: inferred from --output)')
+    parser.add_argument('--durability', type=str, choices=DURABILITY_POLICIES, default='flush',
+                        help='Flush batches to the OS, fsync them, or neither')
+    parser.add_argument('--dataset', type=str, default='generator/vanilla_prompts.jsonl',
+                        help='Local JSONL path or glob, or a HuggingFace dataset name')
+    parser.add_argument('--column', type=str, default='vanilla',
+                        help='Column name with vanilla prompts')
+    parser.add_argument('--strategy', type=str, default=DEFAULT_STRATEGY_PATH,
+                        help='Extracted strategy JSON')
+    parser.add_argument('--max-samples', type=int, default=None,
+                        help='Maximum number of samples to generate')
+    parser.add_argument('--transform-workers', type=int, default=10,
+                        help='Workers transforming prompts')
+    parser.add_argument('--executor', type=str, choices=['process', 'thread'], default='process',
+                        help='Worker pool used for prompt transforms')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Seed for word masking, making the generated prompts reproducible')
+    parser.add_argument('--model', type=str, default=MODEL_NAME,
+                        help='Target model (ignored when --models is given)')
+    parser.add_argument('--models', type=str, nargs='+', default=None,
+                        help='Several target models, each with its own rate limiter and response columns')
+    parser.add_argument('--max-concurrent', type=int, default=DEFAULT_MAX_CONCURRENT,
+                        help='Upper bound on concurrent requests per model')
+    parser.add_argument('--base-url', type=str, default=BASE_URL,
+                        help='OpenAI-compatible API base URL (default: $OPENROUTER_BASE_URL or OpenRouter)')
+    parser.add_argument('--rpm', type=float, default=None, help='Requests-per-minute budget per model')
+    parser.add_argument('--tpm', type=float, default=None, help='Tokens-per-minute budget per model')
+    parser.add_argument('--max-retries', type=int, default=DEFAULT_MAX_RETRIES,
+                        help='Retries per request for throttling, server errors and timeouts')
+    parser.add_argument('--max-tokens', type=int, default=None,
+                        help='Cap on completion tokens per request (default: no cap)')
+    parser.add_argument('--cache-path', type=str, default=DEFAULT_RESPONSE_CACHE_PATH,
+                        help='SQLite response cache')
+    parser.add_argument('--no-cache', action='store_true', help='Disable the response cache')
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help='Generated records buffered ahead of the evaluation workers')
+    parser.add_argument('--unordered', action='store_true',
+                        help='Write records as soon as they are evaluated instead of in input order')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Skip prompts already in the output and append the rest')
+    parser.add_argument('--dedup', action='store_true',
+                        help='Skip prompts nearly duplicating one produced before, in this or any earlier run')
+    parser.add_argument('--dedup-index', type=str, default=DEFAULT_DEDUP_INDEX_PATH,
+                        help='Persistent near-duplicate index used with --dedup')
+    parser.add_argument('--dedup-threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Estimated Jaccard similarity from which prompts count as near-duplicates')
+    parser.add_argument('--num-shards', type=int, default=1,
+                        help='Split the input across this many workers by a stable hash of the prompt')
+    parser.add_argument('--shard-index', type=int, default=0,
+                        help='Shard handled by this worker (0-based); output goes to a per-shard file')
+    parser.add_argument('--metrics-dir', type=str, default=None,
+                        help='Write metrics.json and a Prometheus textfile metrics.prom to this directory')
+    parser.add_argument('--metrics-interval', type=float, default=DEFAULT_EXPORT_INTERVAL,
+                        help='Seconds between metrics dumps while running')
+
+    args = parser.parse_args(argv)
+    if args.incremental:
+        try:
+            validate_append(args.output, args.output_format)
+        except ValueError as e:
+            parser.error(str(e))
+
+    try:
+        asyncio.run(run_streaming(
+            output=args.output,
+            dataset=args.dataset,
+            column=args.column,
+            strategy_path=args.strategy,
+            max_samples=args.max_samples,
+            transform_workers=args.transform_workers,
+            executor=args.executor,
+            seed=args.seed,
+            model=args.model,
+            models=args.models,
+            max_concurrent=args.max_concurrent,
+            base_url=args.base_url,
+            requests_per_minute=args.rpm,
+            tokens_per_minute=args.tpm,
+            max_retries=args.max_retries,
+            max_tokens=args.max_tokens,
+            cache_path=None if args.no_cache else args.cache_path,
+            queue_size=args.queue_size,
+            ordered=not args.unordered,
+            incremental=args.incremental,
+            output_format=args.output_format,
+            durability=args.durability,
+            metrics_dir=args.metrics_dir,
+            metrics_interval=args.metrics_interval,
+            num_shards=args.num_shards,
+            shard_index=args.shard_index,
+            dedup_index=args.dedup_index if args.dedup else None,
+            dedup_threshold=args.dedup_threshold
+        ))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
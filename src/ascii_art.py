@@ -0,0 +1,224 @@
+"""ASCII-art rendering with per-font glyph atlases.
+
+Renders words exactly like ``art.text2art`` but splits every glyph into rows
+once per font and composes words from those cached rows. Rendered words are
+kept in an LRU cache keyed by (word, font), and atlases can be persisted to
+disk so later runs start warm without importing the ``art`` font tables. A
+persisted atlas built from another ``art`` version is rebuilt, not reused.
+"""
+
+import json
+import logging
+from functools import lru_cache
+from importlib import metadata
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RENDER_CACHE_SIZE = 4096
+
+# Fonts whose glyphs are stored in reverse order by art's word composer
+_MIRROR_FONTS = ("mirror", "mirror_flip")
+
+
+def installed_art_version() -> Optional[str]:
+    """Return the installed art version, read from package metadata so the font tables are not imported."""
+    try:
+        return metadata.version("art")
+    except metadata.PackageNotFoundError:
+        return None
+
+
+class GlyphAtlas:
+    """Glyph rows of one art font, ready for row-wise composition."""
+
+    def __init__(self, font: str, glyphs: Dict[str, List[str]], case: Optional[str], art_version: str):
+        """Initialize the atlas.
+
+        Args:
+            font: Canonical art font name.
+            glyphs: Mapping of character to its glyph split into rows. Characters
+                whose glyph is empty in art are left out, as art skips them.
+            case: "lower" or "upper" if the font folds input case, else None.
+            art_version: Version of the art library the glyphs were taken from.
+        """
+        self.font = font
+        self.glyphs = glyphs
+        self.case = case
+        self.art_version = art_version
+
+    @classmethod
+    def build(cls, font: str) -> "GlyphAtlas":
+        """Build the atlas for a font from the installed art library."""
+        from art.functions import ART_VERSION, FONT_MAP, UPPERCASE_FONTS
+
+        letters, lowercase = FONT_MAP[font]
+        case = "upper" if font in UPPERCASE_FONTS else "lower" if lowercase else None
+        glyphs = {char: glyph.split("\n") for char, glyph in letters.items() if glyph}
+        return cls(font, glyphs, case, ART_VERSION)
+
+    @classmethod
+    def load(cls, path: Path) -> "GlyphAtlas":
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data["font"], data["glyphs"], data["case"], data["art_version"])
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "font": self.font,
+                "case": self.case,
+                "art_version": self.art_version,
+                "glyphs": self.glyphs,
+            }, f, ensure_ascii=False)
+        tmp_path.replace(path)
+
+    def compose(self, word: str) -> str:
+        """Compose a single line of text from glyph rows, as text2art does."""
+        if self.case == "upper":
+            word = word.upper()
+        elif self.case == "lower":
+            word = word.lower()
+
+        rows = [self.glyphs[char] for char in word if char in self.glyphs]
+        if not rows:
+            return ""
+        if self.font in _MIRROR_FONTS:
+            rows.reverse()
+        return "\n".join("".join(glyph[i] for glyph in rows) for i in range(len(rows[0])))
+
+
+class AsciiArtRenderer:
+    """Byte-for-byte replacement for ``art.text2art`` with cached glyph atlases."""
+
+    def __init__(self, atlas_dir: Optional[str] = None, cache_size: int = DEFAULT_RENDER_CACHE_SIZE):
+        """Initialize the renderer.
+
+        Args:
+            atlas_dir: Directory to persist glyph atlases in. None keeps them in memory only.
+            cache_size: Maximum number of rendered (word, font) pairs kept in the LRU cache.
+        """
+        self.atlas_dir = Path(atlas_dir) if atlas_dir else None
+        self._atlases: Dict[str, GlyphAtlas] = {}
+        self._render_cached = lru_cache(maxsize=cache_size)(self._render)
+
+    def render(self, word: str, font: str = "block") -> str:
+        """Render a word as ASCII art.
+
+        Args:
+            word: Text to render.
+            font: art font name.
+
+        Returns:
+            The same string ``art.text2art(word, font=font)`` returns.
+        """
+        return self._render_cached(word, font.lower())
+
+    def cache_info(self):
+        """Return hit/miss statistics of the (word, font) LRU cache."""
+        return self._render_cached.cache_info()
+
+    def atlas(self, font: str) -> Optional[GlyphAtlas]:
+        """Return the atlas for a font, loading or building it on first use.
+
+        Returns None for fonts art resolves dynamically (random, wizard,
+        fuzzy-matched names), which are always rendered by art itself.
+        """
+        font = font.lower()
+        if font in self._atlases:
+            return self._atlases[font]
+
+        atlas = self._load_atlas(font)
+        if atlas is None:
+            from art.functions import FONT_NAMES
+
+            if font not in FONT_NAMES:
+                return None
+            atlas = GlyphAtlas.build(font)
+            if self.atlas_dir is not None:
+                try:
+                    atlas.save(self._atlas_path(font))
+                except OSError as e:
+                    logger.warning(f"Could not save glyph atlas for font '{font}': {e}")
+        self._atlases[font] = atlas
+        return atlas
+
+    def _atlas_path(self, font: str) -> Path:
+        return self.atlas_dir / f"{font}.json"
+
+    def _load_atlas(self, font: str) -> Optional[GlyphAtlas]:
+        if self.atlas_dir is None:
+            return None
+        path = self._atlas_path(font)
+        if not path.exists():
+            return None
+        try:
+            atlas = GlyphAtlas.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable glyph atlas {path}: {e}")
+            return None
+        installed = installed_art_version()
+        if installed is not None and atlas.art_version != installed:
+            # Glyphs may have changed between art releases; the rebuilt atlas replaces the file
+            logger.info(f"Rebuilding glyph atlas {path}: built with art {atlas.art_version}, installed {installed}")
+            return None
+        return atlas
+
+    def _render(self, word: str, font: str) -> str:
+        atlas = self.atlas(font) if "\n" not in word else None
+        if atlas is None:
+            from art import text2art
+
+            return text2art(word, font=font)
+        return atlas.compose(word.replace("\t", ""))
+
+
+def verify_renderer(words: Iterable[str], fonts: Iterable[str] = ("block",),
+                    renderer: Optional[AsciiArtRenderer] = None) -> List[Tuple[str, str]]:
+    """Compare the renderer against ``art.text2art``.
+
+    Args:
+        words: Words to render.
+        fonts: Fonts to render them in.
+        renderer: Renderer under test. Defaults to an in-memory renderer.
+
+    Returns:
+        (word, font) pairs whose output differs from text2art.
+    """
+    from art import text2art
+
+    renderer = renderer or AsciiArtRenderer()
+    mismatches = []
+    for font in fonts:
+        for word in words:
+            if renderer.render(word, font) != text2art(word, font=font):
+                mismatches.append((word, font))
+    return mismatches
+
+
+if __name__ == "__main__":
+    import argparse
+    import re
+
+    parser = argparse.ArgumentParser(description="Verify the glyph-atlas renderer against art.text2art")
+    parser.add_argument("--input", default="generator/vanilla_prompts.jsonl",
+                        help="JSONL file whose words are rendered")
+    parser.add_argument("--column", default="vanilla", help="Field holding the text")
+    parser.add_argument("--fonts", nargs="+", default=["block"], help="Fonts to check")
+    parser.add_argument("--atlas-dir", default=None, help="Check persisted atlases in this directory")
+    args = parser.parse_args()
+
+    words = set()
+    with open(args.input, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                words.update(re.findall(r'\b\w+\b', json.loads(line).get(args.column, "")))
+
+    mismatches = verify_renderer(sorted(words), args.fonts, AsciiArtRenderer(args.atlas_dir))
+    print(f"Checked {len(words)} words in {len(args.fonts)} font(s): {len(mismatches)} mismatches")
+    for word, font in mismatches[:20]:
+        print(f"  {font}: {word!r}")
+    raise SystemExit(1 if mismatches else 0)
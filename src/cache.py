@@ -0,0 +1,241 @@
+"""Local, content-addressed caches for pipeline artifacts.
+
+Cache entries are keyed by hashes of their inputs, so a changed PDF, model or
+prompt always misses, while repeated runs on the same inputs are served from
+disk.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = ".cache"
+DEFAULT_STRATEGY_CACHE_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_COLUMN_BATCH_SIZE = 8192
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def text_sha256(text: str) -> str:
+    """Return the SHA-256 hex digest of a UTF-8 string."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class StrategyCache:
+    """Extracted strategies keyed by PDF content, model and system prompt."""
+
+    def __init__(self, cache_dir: str = os.path.join(DEFAULT_CACHE_DIR, "strategies"),
+                 max_bytes: int = DEFAULT_STRATEGY_CACHE_MAX_BYTES):
+        """Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding one JSON file per cached strategy.
+            max_bytes: Total size above which least recently used entries are evicted.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(pdf_hash: str, model: str, system_prompt: str) -> str:
+        """Combine the inputs that determine a strategy into one cache key."""
+        return text_sha256(f"{pdf_hash}\0{model}\0{text_sha256(system_prompt)}")
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached strategy for a key, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable strategy cache entry {path}: {e}")
+            return None
+
+        # Bump mtime so eviction drops the least recently used entries first
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry.get("strategy")
+
+    def put(self, key: str, strategy: Dict[str, Any], **metadata: Any) -> None:
+        """Store a strategy, then evict old entries if the cache is over its size limit.
+
+        Args:
+            key: Cache key from ``make_key``.
+            strategy: Extracted strategy JSON.
+            **metadata: Extra fields stored alongside for inspection (pdf path, model...).
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"created_at": time.time(), **metadata, "strategy": strategy}, f,
+                      indent=2, ensure_ascii=False)
+        tmp_path.replace(path)
+        self.evict()
+
+    def evict(self) -> int:
+        """Delete least recently used entries until the cache fits in ``max_bytes``.
+
+        Returns:
+            Number of entries removed.
+        """
+        if not self.cache_dir.exists():
+            return 0
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        if removed:
+            logger.info(f"Evicted {removed} strategy cache entries from {self.cache_dir}")
+        return removed
+
+
+class PageTextCache:
+    """Per-page extracted PDF text keyed by the PDF's content hash.
+
+    Each page is stored in its own file, so a re-run after a partial failure
+    only has to extract the pages that are missing.
+    """
+
+    def __init__(self, cache_dir: str = os.path.join(DEFAULT_CACHE_DIR, "pdf_text")):
+        """Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding one subdirectory of page files per PDF.
+        """
+        self.cache_dir = Path(cache_dir)
+
+    def _page_path(self, file_hash: str, page_index: int) -> Path:
+        return self.cache_dir / file_hash / f"{page_index:05d}.txt"
+
+    def get_pages(self, file_hash: str, num_pages: int) -> Dict[int, str]:
+        """Return the cached text of every page that has been extracted before.
+
+        Args:
+            file_hash: SHA-256 of the PDF file.
+            num_pages: Number of pages in the PDF.
+
+        Returns:
+            Mapping of zero-based page index to page text.
+        """
+        pages = {}
+        for page_index in range(num_pages):
+            path = self._page_path(file_hash, page_index)
+            try:
+                pages[page_index] = path.read_text(encoding='utf-8')
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.warning(f"Ignoring unreadable page cache entry {path}: {e}")
+        return pages
+
+    def put_page(self, file_hash: str, page_index: int, text: str) -> None:
+        """Store the extracted text of one page."""
+        path = self._page_path(file_hash, page_index)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(text, encoding='utf-8')
+        tmp_path.replace(path)
+
+
+class ColumnCache:
+    """One column of a remote dataset stored locally as an Arrow IPC stream.
+
+    A cache file is only published once the whole column has been read, so a
+    run stopped early (e.g. by max_samples) never leaves a truncated entry.
+    Requires ``pyarrow``, which ``datasets`` already depends on. Delete the
+    cache directory to pick up changes to the remote dataset.
+    """
+
+    def __init__(self, cache_dir: str = os.path.join(DEFAULT_CACHE_DIR, "datasets"),
+                 batch_size: int = DEFAULT_COLUMN_BATCH_SIZE):
+        """Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding one ``.arrow`` file per cached column.
+            batch_size: Values per Arrow record batch.
+        """
+        try:
+            import pyarrow
+            import pyarrow.ipc
+        except ImportError:
+            raise ImportError("The dataset column cache requires the 'pyarrow' package: pip install pyarrow")
+        self._pa = pyarrow
+        self.cache_dir = Path(cache_dir)
+        self.batch_size = max(1, batch_size)
+
+    @staticmethod
+    def make_key(dataset_name: str, split: str, column: str) -> str:
+        """Combine the inputs that select a column into one cache key."""
+        return text_sha256(f"{dataset_name}\0{split}\0{column}")
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.arrow"
+
+    def has(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def read(self, key: str) -> Iterator[Optional[str]]:
+        """Yield the cached column values in dataset order."""
+        with self._pa.OSFile(str(self._path(key)), 'rb') as source:
+            for batch in self._pa.ipc.open_stream(source):
+                yield from batch.column(0).to_pylist()
+
+    def tee(self, key: str, values: Iterable[Any]) -> Iterator[Optional[str]]:
+        """Yield ``values`` while storing them, publishing the entry once they are exhausted."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        pa = self._pa
+        schema = pa.schema([("value", pa.string())])
+        complete = False
+        try:
+            with pa.OSFile(str(tmp_path), 'wb') as sink, pa.ipc.new_stream(sink, schema) as writer:
+                batch = []
+                for value in values:
+                    value = None if value is None else str(value)
+                    batch.append(value)
+                    if len(batch) >= self.batch_size:
+                        writer.write_batch(pa.record_batch([pa.array(batch, pa.string())], schema=schema))
+                        batch = []
+                    yield value
+                if batch:
+                    writer.write_batch(pa.record_batch([pa.array(batch, pa.string())], schema=schema))
+            complete = True
+        finally:
+            if complete:
+                tmp_path.replace(path)
+                logger.info(f"Cached dataset column in {path}")
+            else:
+                tmp_path.unlink(missing_ok=True)
@@ -0,0 +1,303 @@
+"""Near-duplicate detection with MinHash and locality-sensitive hashing.
+
+Every prompt is reduced to a MinHash signature of its character shingles, whose
+agreement estimates the Jaccard similarity of two prompts. Signatures are
+split into bands; prompts sharing any band bucket are candidates, and a
+candidate counts as a duplicate if its estimated similarity reaches the
+threshold. Signatures and buckets live in a SQLite index, so every new batch
+is checked against everything produced before, not only against itself.
+"""
+
+import array
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.cache import DEFAULT_CACHE_DIR, text_sha256
+from src.metrics import MetricsRegistry, get_registry
+
+DEFAULT_DEDUP_INDEX_PATH = os.path.join(DEFAULT_CACHE_DIR, "dedup.sqlite3")
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_NUM_PERM = 64
+# Character shingles; short enough that small edits change only a few of them
+DEFAULT_SHINGLE_SIZE = 5
+_SEED = 1
+_MASK64 = (1 << 64) - 1
+_NON_WORD_RE = re.compile(r"\W+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase and collapse punctuation and whitespace, so formatting alone never makes prompts differ."""
+    return _NON_WORD_RE.sub(" ", text.lower()).strip()
+
+
+def shingle_hashes(text: str, size: int = DEFAULT_SHINGLE_SIZE) -> List[int]:
+    """Return the distinct 32-bit hashes of the character shingles of a normalized text."""
+    data = normalize(text).encode("utf-8")
+    if len(data) <= size:
+        return [zlib.crc32(data)]
+    return list({zlib.crc32(data[i:i + size]) for i in range(len(data) - size + 1)})
+
+
+def lsh_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """Pick (bands, rows) with bands * rows == num_perm for a similarity threshold.
+
+    Two signatures become candidates with probability ``1 - (1 - s**rows)**bands``,
+    which rises steeply around ``(1 / bands) ** (1 / rows)``. The split whose
+    steep point is the highest one not above the threshold keeps recall at the
+    threshold high while producing the fewest candidates.
+    """
+    options = [(num_perm // rows, rows) for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+    below = [(b, r) for b, r in options if (1 / b) ** (1 / r) <= threshold]
+    if not below:
+        return options[-1]
+    return max(below, key=lambda option: (1 / option[0]) ** (1 / option[1]))
+
+
+class MinHasher:
+    """Computes MinHash signatures with a fixed, seeded set of hash permutations.
+
+    Each permutation is a multiply-shift hash ``(a * x + b) mod 2**64``, whose
+    top 32 bits are kept; taking the minimum before the shift gives the same
+    result and saves one operation per shingle and permutation.
+    """
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, shingle_size: int = DEFAULT_SHINGLE_SIZE,
+                 seed: int = _SEED):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.permutations = [(rng.getrandbits(64) | 1, rng.getrandbits(64)) for _ in range(num_perm)]
+
+    def signature(self, text: str) -> List[int]:
+        hashes = shingle_hashes(text, self.shingle_size)
+        return [min([(a * x + b) & _MASK64 for x in hashes]) >> 32 for a, b in self.permutations]
+
+
+def similarity(first: List[int], second: List[int]) -> float:
+    """Estimate the Jaccard similarity of two texts from their signatures."""
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+class DedupIndex:
+    """Persistent MinHash/LSH index of produced prompts.
+
+    ``check`` indexes a text right away; a text already in the index, such as
+    a row of a file produced with this index, is kept rather than reported as
+    a duplicate of itself. A generation run instead ``claim``s
+    prompts before transforming them and ``confirm``s each one once it is
+    written; ``commit`` drops claims that were never confirmed, such as prompts
+    read ahead past max_samples. Closing without ``commit`` rolls back
+    everything since the last one, so an interrupted run does not mark prompts
+    as produced that never were.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_DEDUP_INDEX_PATH,
+        threshold: float = DEFAULT_THRESHOLD,
+        num_perm: int = DEFAULT_NUM_PERM,
+        shingle_size: int = DEFAULT_SHINGLE_SIZE,
+        metrics: Optional[MetricsRegistry] = None
+    ):
+        """Open or create the index.
+
+        Args:
+            path: SQLite database file, or ":memory:" for a throwaway index.
+            threshold: Estimated Jaccard similarity from which prompts count as duplicates.
+            num_perm: Signature length; more permutations give a tighter estimate.
+            shingle_size: Characters per shingle.
+            metrics: Registry for duplicate counts. None uses the default one.
+
+        Raises:
+            ValueError: If an existing index was built with a different num_perm
+                or shingle_size, whose signatures would not be comparable.
+        """
+        self.path = path
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self.bands, self.rows = lsh_bands(threshold, num_perm)
+        self.metrics = metrics or get_registry()
+        self.duplicates = 0
+        self.unique = 0
+        self.indexed = 0
+        # Exact-text keys passed to ``check`` by this instance; a repeat is a duplicate row
+        self._checked = set()
+        # Claimed, unconfirmed prompt -> item id
+        self._pending: Dict[str, int] = {}
+        # Claims come from the dataset prefetch thread, confirmations from the event loop
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS items (
+                id INTEGER PRIMARY KEY,
+                text_key TEXT,
+                text TEXT NOT NULL,
+                signature BLOB NOT NULL
+            )"""
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(items)")}
+        if "text_key" not in columns:
+            # Indexes written before exact-text keys were stored
+            self._conn.execute("ALTER TABLE items ADD COLUMN text_key TEXT")
+            self._conn.executemany("UPDATE items SET text_key = ? WHERE id = ?", [
+                (text_sha256(text), item_id) for item_id, text in self._conn.execute("SELECT id, text FROM items")
+            ])
+        self._conn.execute("CREATE INDEX IF NOT EXISTS items_text_key ON items (text_key)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (band INTEGER NOT NULL, bucket INTEGER NOT NULL, id INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS buckets_lookup ON buckets (band, bucket)")
+        self._check_meta({"num_perm": str(num_perm), "shingle_size": str(shingle_size), "seed": str(_SEED)})
+        self._conn.commit()
+
+    def _check_meta(self, expected: Dict[str, str]) -> None:
+        stored = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+        if not stored:
+            self._conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", expected.items())
+            return
+        mismatched = [f"{key}={stored.get(key)}" for key, value in expected.items() if stored.get(key) != value]
+        if mismatched:
+            raise ValueError(f"Dedup index {self.path} was built with {', '.join(mismatched)}; "
+                             f"use the same settings or another index path")
+
+    def _buckets(self, signature: List[int]) -> List[Tuple[int, int]]:
+        rows = self.rows
+        return [
+            (band, int.from_bytes(hashlib.blake2b(
+                struct.pack(f"<{rows}I", *signature[band * rows:(band + 1) * rows]), digest_size=8
+            ).digest(), "little", signed=True))
+            for band in range(self.bands)
+        ]
+
+    def _find(self, signature: List[int], buckets: List[Tuple[int, int]]) -> Optional[Tuple[str, float]]:
+        candidates = set()
+        for band, bucket in buckets:
+            candidates.update(row[0] for row in self._conn.execute(
+                "SELECT id FROM buckets WHERE band = ? AND bucket = ?", (band, bucket)
+            ))
+        best = None
+        for item_id in candidates:
+            text, blob = self._conn.execute("SELECT text, signature FROM items WHERE id = ?", (item_id,)).fetchone()
+            score = similarity(signature, array.array("I", blob))
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (text, score)
+        return best
+
+    def _check(self, text: str, keep_indexed: bool) -> Tuple[Optional[Tuple[str, float]], Optional[int]]:
+        """Look a text up and index it if it is new.
+
+        Returns:
+            (the (text, similarity) it duplicates or None, id of the new item or None).
+        """
+        key = text_sha256(text)
+        signature = self.hasher.signature(text)
+        buckets = self._buckets(signature)
+        item_id = None
+        with self._lock:
+            if keep_indexed:
+                if key in self._checked:
+                    match = (text, 1.0)
+                else:
+                    self._checked.add(key)
+                    if self._conn.execute("SELECT 1 FROM items WHERE text_key = ?", (key,)).fetchone():
+                        self.indexed += 1
+                        self.metrics.inc("dedup_total", result="indexed")
+                        return None, None
+                    match = self._find(signature, buckets)
+            else:
+                match = self._find(signature, buckets)
+            if match is None:
+                item_id = self._conn.execute(
+                    "INSERT INTO items (text_key, text, signature) VALUES (?, ?, ?)",
+                    (key, text, array.array("I", signature).tobytes())
+                ).lastrowid
+                self._conn.executemany(
+                    "INSERT INTO buckets (band, bucket, id) VALUES (?, ?, ?)",
+                    [(band, bucket, item_id) for band, bucket in buckets]
+                )
+        if match is None:
+            self.unique += 1
+            self.metrics.inc("dedup_total", result="unique")
+        else:
+            self.duplicates += 1
+            self.metrics.inc("dedup_total", result="duplicate")
+        return match, item_id
+
+    def find(self, text: str) -> Optional[Tuple[str, float]]:
+        """Return (most similar indexed text, estimated similarity) if it reaches the threshold."""
+        signature = self.hasher.signature(text)
+        with self._lock:
+            return self._find(signature, self._buckets(signature))
+
+    def check(self, text: str) -> Optional[Tuple[str, float]]:
+        """Index a text unless it duplicates an indexed one.
+
+        A text whose exact copy was indexed before this instance saw it is not
+        a duplicate: re-checking a file against the index it was produced with
+        keeps every row. A repeat of a text already checked through this
+        instance is one.
+
+        Returns:
+            None if the text is new (it is now indexed) or already indexed,
+            otherwise the (indexed text, estimated similarity) it duplicates.
+        """
+        return self._check(text, keep_indexed=True)[0]
+
+    def claim(self, text: str) -> bool:
+        """Index a text pending confirmation unless it is a duplicate.
+
+        Unlike ``check``, a text already in the index counts as a duplicate,
+        since generating it again would repeat a record produced before.
+        Returns True for duplicates, so it can serve as the generator's skip hook.
+        """
+        match, item_id = self._check(text, keep_indexed=False)
+        if item_id is not None:
+            with self._lock:
+                self._pending[text] = item_id
+        return match is not None
+
+    def confirm(self, text: str) -> None:
+        """Keep a claimed text in the index once its record has been written."""
+        with self._lock:
+            self._pending.pop(text, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def commit(self) -> None:
+        """Persist every indexed text, dropping claims that were never confirmed."""
+        with self._lock:
+            dropped = [(item_id,) for item_id in self._pending.values()]
+            self._conn.executemany("DELETE FROM buckets WHERE id = ?", dropped)
+            self._conn.executemany("DELETE FROM items WHERE id = ?", dropped)
+            self._pending.clear()
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the index, discarding everything since the last commit."""
+        with self._lock:
+            self._conn.rollback()
+            self._conn.close()
+
+
+def skip_any(*predicates: Optional[Callable[[str], bool]]) -> Optional[Callable[[str], bool]]:
+    """Combine skip hooks, ignoring None; each prompt is checked in order until one returns True."""
+    predicates = [predicate for predicate in predicates if predicate is not None]
+    if len(predicates) <= 1:
+        return predicates[0] if predicates else None
+    return lambda prompt: any(predicate(prompt) for predicate in predicates)
@@ -0,0 +1,175 @@
+"""Content-hash index for incremental dataset generation.
+
+The index lives next to the output (``<output>.index``) and lists one key per
+generated record, a hash of the record's original prompt, the strategy and
+the transform parameters. An incremental run loads it, skips every prompt it
+already contains and appends only the missing records, so refreshing a
+growing prompt pool costs time proportional to the new prompts.
+
+Keys are appended as records are written; a commit line recording the output
+size is appended once the output is closed. Keys after the last commit and
+an index whose committed size does not match the output (an interrupted or
+non-incremental run) are discarded and the index is rebuilt from the output.
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+
+from src.cache import text_sha256
+from src.loaders import iter_jsonl
+from src.metrics import MetricsRegistry, get_registry
+
+logger = logging.getLogger(__name__)
+
+INDEX_SUFFIX = ".index"
+_COMMIT_PREFIX = "@commit "
+
+
+def generation_key(original_prompt: str, strategy_digest: str, params_digest: str) -> str:
+    """Return the key of a record generated from a prompt with a given strategy and parameters."""
+    return text_sha256(f"{original_prompt}\0{strategy_digest}\0{params_digest}")[:32]
+
+
+def _digest(value: Any) -> str:
+    return text_sha256(json.dumps(value, sort_keys=True, ensure_ascii=False))
+
+
+class GenerationIndex:
+    """Set of (original_prompt, strategy, params) hashes already present in an output file."""
+
+    def __init__(
+        self,
+        output_path: str,
+        strategy: Dict[str, Any],
+        params: Dict[str, Any],
+        index_path: Optional[str] = None,
+        metrics: Optional[MetricsRegistry] = None
+    ):
+        """Initialize the index.
+
+        Args:
+            output_path: Dataset file the index describes.
+            strategy: Strategy the records are generated with.
+            params: Transform parameters that change the generated record.
+            index_path: Index file. Defaults to the output path with ``.index`` appended.
+            metrics: Registry for hit/miss counts. None uses the default one.
+        """
+        self.output_path = Path(output_path)
+        self.path = Path(index_path) if index_path else Path(str(output_path) + INDEX_SUFFIX)
+        self.strategy_name = strategy.get("strategy_name", "Unknown Strategy")
+        self._strategy_digest = _digest(strategy)
+        self._params_digest = _digest(params)
+        self.metrics = metrics or get_registry()
+        self.skipped = 0
+        self._keys: Set[str] = set()
+        self._file = None
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def key(self, original_prompt: str) -> str:
+        return generation_key(original_prompt, self._strategy_digest, self._params_digest)
+
+    def _output_size(self) -> int:
+        return self.output_path.stat().st_size if self.output_path.exists() else 0
+
+    def load(self) -> int:
+        """Read the committed keys, rebuilding the index from the output if it is stale.
+
+        Returns:
+            Number of records already generated.
+
+        Raises:
+            ValueError: If the output is stale and cannot be read back, e.g. a
+                gzip file truncated by a killed run.
+        """
+        keys: Set[str] = set()
+        uncommitted: Set[str] = set()
+        committed_size = None
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line.startswith(_COMMIT_PREFIX):
+                        keys |= uncommitted
+                        uncommitted = set()
+                        committed_size = int(line[len(_COMMIT_PREFIX):])
+                    elif line:
+                        uncommitted.add(line)
+
+        output_size = self._output_size()
+        if committed_size == output_size or (committed_size is None and output_size == 0):
+            self._keys = keys
+            if uncommitted:
+                # Drop keys (possibly torn) left behind by an interrupted run
+                self._rewrite()
+        else:
+            self._rebuild()
+        return len(self._keys)
+
+    def _rebuild(self) -> None:
+        """Recompute the keys of the records in the output and rewrite the index."""
+        self._keys = set()
+        other_strategies = 0
+        if self._output_size():
+            logger.info(f"Rebuilding generation index {self.path} from {self.output_path}")
+            try:
+                for record in iter_jsonl(str(self.output_path)):
+                    # The full strategy is not stored with the record, only its name
+                    if record.get("strategy_name", self.strategy_name) != self.strategy_name:
+                        other_strategies += 1
+                        continue
+                    if record.get("original_prompt"):
+                        self._keys.add(self.key(record["original_prompt"]))
+            except (EOFError, OSError) as e:
+                raise ValueError(
+                    f"Cannot read {self.output_path} back to index it ({e}); "
+                    f"regenerate it without incremental mode"
+                ) from e
+        if other_strategies:
+            logger.warning(f"{other_strategies} records in {self.output_path} were generated with another strategy")
+        self._rewrite()
+
+    def _rewrite(self) -> None:
+        """Atomically replace the index file with the current keys and a commit line."""
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(key + "\n" for key in self._keys)
+            f.write(f"{_COMMIT_PREFIX}{self._output_size()}\n")
+        os.replace(tmp_path, self.path)
+
+    def seen(self, original_prompt: str) -> bool:
+        """Return True if a record for this prompt is already in the output."""
+        hit = self.key(original_prompt) in self._keys
+        self.metrics.inc("cache_lookups_total", cache="generation_index", result="hit" if hit else "miss")
+        if hit:
+            self.skipped += 1
+        return hit
+
+    def add(self, original_prompt: str) -> None:
+        """Record that a record for this prompt was written to the output."""
+        key = self.key(original_prompt)
+        if key in self._keys:
+            return
+        self._keys.add(key)
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(key + "\n")
+
+    def commit(self) -> None:
+        """Mark every added key as durable; call it after the output writer is closed."""
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(f"{_COMMIT_PREFIX}{self._output_size()}\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.close()
+
+    def close(self) -> None:
+        """Close the index file without committing."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,239 @@
+"""Append-only results journal for target-model evaluation.
+
+Responses are appended to a sidecar file as soon as they arrive, so a crashed
+or killed run loses at most the requests that were in flight. On restart the
+journal is indexed by byte offset and its responses are read back record by
+record, and an explicit compaction step folds it back into the dataset file.
+"""
+
+import array
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.offset_index import OffsetIndex
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_SUFFIX = ".journal"
+
+
+def prompt_key(prompt: str) -> str:
+    """Return a short content hash identifying the prompt a response belongs to.
+
+    Args:
+        prompt: Prompt text sent to the target model.
+
+    Returns:
+        Hex digest prefix of the SHA-256 of the prompt.
+    """
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+class EvaluationJournal:
+    """Append-only log of responses keyed by record index and prompt hash."""
+
+    def __init__(self, dataset_path: str, journal_path: Optional[str] = None, durable: bool = False):
+        """Initialize the journal.
+
+        Args:
+            dataset_path: Path to the JSONL dataset being evaluated.
+            journal_path: Path to the journal file. Defaults to the dataset path
+                with a ``.journal`` suffix appended.
+            durable: If True, fsync after every entry so responses survive a
+                power loss, not only a process crash.
+        """
+        self.dataset_path = Path(dataset_path)
+        self.path = Path(journal_path) if journal_path else Path(str(dataset_path) + JOURNAL_SUFFIX)
+        self.durable = durable
+        self._file = None
+        self._reader = None
+        self._prompt_fields: Dict[str, str] = {}
+        self._slots = array.array("q")
+
+    def load(self, prompt_fields: Dict[str, str], count: int) -> int:
+        """Index the latest journal entry per (record, response field) by its byte offset.
+
+        Only offsets are kept, 8 bytes per record and field; response texts stay
+        in the journal until ``restore`` reads them. A torn final line left by a
+        killed process is skipped.
+
+        Args:
+            prompt_fields: Mapping of response field to the prompt field it answers.
+            count: Number of records in the dataset; entries beyond it are ignored.
+
+        Returns:
+            Number of (record, field) pairs with a journaled response.
+        """
+        self._prompt_fields = dict(prompt_fields)
+        fields = {field: slot for slot, field in enumerate(self._prompt_fields)}
+        self._slots = array.array("q", [-1]) * (count * len(fields))
+        self._close_reader()
+        if not self.path.exists():
+            return 0
+
+        found = 0
+        skipped = 0
+        position = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                offset = position
+                position += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                    index, field = entry["index"], entry["field"]
+                except (json.JSONDecodeError, UnicodeDecodeError, KeyError, TypeError):
+                    skipped += 1
+                    continue
+                if field not in fields or not 0 <= index < count:
+                    continue
+                slot = index * len(fields) + fields[field]
+                if self._slots[slot] < 0:
+                    found += 1
+                self._slots[slot] = offset
+        if skipped:
+            logger.warning(f"Skipped {skipped} unreadable journal entries in {self.path}")
+        return found
+
+    def restore(self, index: int, record: Dict[str, Any]) -> int:
+        """Apply the journaled responses of one record, as indexed by ``load``.
+
+        An entry is only applied if the record still carries the prompt it was
+        recorded for, so a regenerated dataset is never mixed with stale responses.
+
+        Args:
+            index: Zero-based record index in the dataset file.
+            record: The record, updated in place.
+
+        Returns:
+            Number of response fields whose value changed.
+        """
+        restored = 0
+        width = len(self._prompt_fields)
+        for slot, (field, prompt_field) in enumerate(self._prompt_fields.items()):
+            offset = self._slots[index * width + slot] if (index + 1) * width <= len(self._slots) else -1
+            prompt = record.get(prompt_field)
+            if offset < 0 or not prompt:
+                continue
+            entry = self._read_entry(offset)
+            if prompt_key(prompt) == entry.get("key") and record.get(field) != entry["value"]:
+                record[field] = entry["value"]
+                restored += 1
+        return restored
+
+    def apply(self, records: List[Dict[str, Any]], prompt_fields: Dict[str, str]) -> int:
+        """Replay journaled responses onto in-memory records.
+
+        Args:
+            records: Dataset records, in file order.
+            prompt_fields: Mapping of response field to the prompt field it answers.
+
+        Returns:
+            Number of responses restored.
+        """
+        self.load(prompt_fields, len(records))
+        return sum(self.restore(index, record) for index, record in enumerate(records))
+
+    def _read_entry(self, offset: int) -> Dict[str, Any]:
+        if self._reader is None:
+            if self._file is not None:
+                self._file.flush()
+            self._reader = open(self.path, 'rb')
+        self._reader.seek(offset)
+        return json.loads(self._reader.readline())
+
+    def _close_reader(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def append(self, index: int, field: str, prompt: str, value: str) -> None:
+        """Append one response to the journal and flush it to the OS.
+
+        Args:
+            index: Zero-based record index in the dataset file.
+            field: Response field the value belongs to.
+            prompt: Prompt the response answers, used for the content hash.
+            value: Response text.
+        """
+        if self._file is None:
+            self._open()
+        entry = {"index": index, "field": field, "key": prompt_key(prompt), "value": value}
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        if self.durable:
+            os.fsync(self._file.fileno())
+
+    def _open(self) -> None:
+        needs_newline = False
+        if self.path.exists() and self.path.stat().st_size > 0:
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if needs_newline:
+            # Terminate a torn line from a killed run so it can't corrupt the next entry
+            self._file.write("\n")
+
+    def close(self) -> None:
+        """Close the journal file if it is open."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._close_reader()
+
+    def compact(self, prompt_fields: Dict[str, str]) -> int:
+        """Fold the journal into the dataset file and remove the journal.
+
+        The dataset is streamed into a temporary file and atomically swapped
+        in, so an interrupted compaction leaves both files intact. Responses
+        are read from the journal one record at a time, so memory does not
+        grow with the dataset. The dataset's offset index is rewritten along
+        the way.
+
+        Args:
+            prompt_fields: Mapping of response field to the prompt field it answers.
+
+        Returns:
+            Number of responses written into the dataset.
+        """
+        self.close()
+        offsets = OffsetIndex(str(self.dataset_path))
+        if not self.path.exists() or not self.load(prompt_fields, offsets.load()):
+            self.path.unlink(missing_ok=True)
+            return 0
+
+        merged = 0
+        new_offsets = array.array("Q")
+        position = 0
+        tmp_path = self.dataset_path.with_name(self.dataset_path.name + ".tmp")
+        with open(self.dataset_path, 'r', encoding='utf-8') as src, \
+                open(tmp_path, 'w', encoding='utf-8') as dst:
+            index = 0
+            for line in src:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                merged += self.restore(index, record)
+                # json.dumps escapes non-ASCII, so characters and bytes line up
+                data = json.dumps(record) + "\n"
+                dst.write(data)
+                new_offsets.append(position)
+                position += len(data)
+                index += 1
+            dst.flush()
+            os.fsync(dst.fileno())
+
+        os.replace(tmp_path, self.dataset_path)
+        self.close()
+        offsets.offsets = new_offsets
+        offsets.end = position
+        offsets.save()
+        self.path.unlink()
+        logger.info(f"Compacted {merged} journaled responses into {self.dataset_path}")
+        return merged
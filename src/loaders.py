@@ -0,0 +1,140 @@
+"""Streaming readers for local prompt datasets.
+
+Records are parsed lazily one line at a time, so memory stays flat and the
+first record is available immediately regardless of file size. Plain,
+gzip- and zstd-compressed JSONL files are supported, as are glob patterns
+spanning several files. ``iter_records`` also reads Parquet files written by
+the Parquet output writer, one batch of rows at a time.
+"""
+
+import glob
+import gzip
+import io
+import json
+import logging
+import os
+from typing import Any, Dict, Iterator, List, TextIO
+
+logger = logging.getLogger(__name__)
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_PARQUET_MAGIC = b"PAR1"
+# File names that can only be local datasets
+_JSONL_SUFFIXES = (".jsonl", ".jsonl.gz", ".jsonl.zst", ".json", ".json.gz")
+# Rows converted to Python dicts at a time when reading Parquet
+_PARQUET_BATCH_SIZE = 1024
+
+
+def resolve_paths(source: str) -> List[str]:
+    """Expand a path or glob pattern into a sorted list of files.
+
+    Args:
+        source: File path or glob pattern (``**`` is supported).
+
+    Returns:
+        Matching file paths, sorted for a deterministic read order.
+    """
+    if glob.has_magic(source):
+        return sorted(path for path in glob.glob(source, recursive=True) if os.path.isfile(path))
+    return [source] if os.path.isfile(source) else []
+
+
+def is_local_source(source: str) -> bool:
+    """Return True if the dataset name refers to local file(s) rather than a hub dataset.
+
+    Besides names matching files, anything shaped like a path counts as local
+    even if nothing matches it, so a mistyped path or an empty glob fails with
+    FileNotFoundError when read instead of being looked up on the hub: glob
+    patterns, JSONL file names, explicitly relative or absolute paths, and
+    paths of more than the ``owner/name`` two parts hub names have.
+    """
+    if resolve_paths(source) or glob.has_magic(source):
+        return True
+    name = source.lower()
+    if name.endswith(_JSONL_SUFFIXES) or source.startswith(("/", "./", "../", "~")):
+        return True
+    return (os.sep != "/" and os.sep in source) or source.count("/") > 1
+
+
+def open_text(path: str) -> TextIO:
+    """Open a text file, transparently decompressing gzip or zstd content.
+
+    Compression is detected from the file's magic bytes, not its extension.
+
+    Raises:
+        ImportError: If the file is zstd-compressed and ``zstandard`` is not installed.
+    """
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+
+    if magic.startswith(_GZIP_MAGIC):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if magic == _ZSTD_MAGIC:
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError(f"Reading {path} requires the 'zstandard' package: pip install zstandard")
+        raw = open(path, 'rb')
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(reader, encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def iter_jsonl(source: str) -> Iterator[Dict[str, Any]]:
+    """Lazily yield records from one or more JSONL files.
+
+    Malformed lines are logged and skipped instead of aborting the whole load.
+
+    Args:
+        source: File path or glob pattern; files may be gzip- or zstd-compressed.
+
+    Yields:
+        Parsed JSON objects, file by file, in line order.
+    """
+    paths = resolve_paths(source)
+    if not paths:
+        raise FileNotFoundError(f"No dataset files match: {source}")
+
+    for path in paths:
+        with open_text(path) as f:
+            for line_num, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.warning(f"Skipping malformed line {line_num} in {path}: {e}")
+
+
+def iter_records(source: str) -> Iterator[Dict[str, Any]]:
+    """Lazily yield records from dataset files in any output format.
+
+    Parquet files are detected from their magic bytes, like compressed JSONL,
+    and read one batch of rows at a time; everything else is read as JSONL.
+
+    Args:
+        source: File path or glob pattern.
+
+    Yields:
+        Records, file by file, in row order.
+
+    Raises:
+        ImportError: If a file is Parquet and ``pyarrow`` is not installed.
+    """
+    paths = resolve_paths(source)
+    if not paths:
+        raise FileNotFoundError(f"No dataset files match: {source}")
+
+    for path in paths:
+        with open(path, 'rb') as f:
+            magic = f.read(4)
+        if magic != _PARQUET_MAGIC:
+            yield from iter_jsonl(path)
+            continue
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError(f"Reading {path} requires the 'pyarrow' package: pip install pyarrow")
+        for batch in pyarrow.parquet.ParquetFile(path).iter_batches(batch_size=_PARQUET_BATCH_SIZE):
+            yield from batch.to_pylist()
@@ -0,0 +1,311 @@
+"""In-process metrics: phase timers, latency histograms, counters and gauges.
+
+Components record into a shared MetricsRegistry (the module-level default
+unless one is passed in). The registry can be dumped as a JSON summary and as
+a Prometheus textfile, once at the end of a run or periodically by a
+MetricsExporter thread so long runs can be watched while they progress.
+"""
+
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "rt_"
+DEFAULT_EXPORT_INTERVAL = 15.0
+# Seconds; spans fast cache hits up to slow long-context completions
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _series_name(name: str, labels: Labels) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+def _prometheus_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in pairs
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+class Histogram:
+    """Fixed-bucket histogram with exact count, sum, min and max."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, fraction: float) -> float:
+        """Estimate a quantile by linear interpolation within its bucket."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                estimate = lower + (upper - lower) * (rank - seen) / bucket_count
+                return min(max(estimate, self.min), self.max)
+            seen += bucket_count
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "min": round(self.min, 6) if self.count else 0.0,
+            "p50": round(self.quantile(0.50), 6),
+            "p90": round(self.quantile(0.90), 6),
+            "p99": round(self.quantile(0.99), 6),
+            "max": round(self.max, 6),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe store of labelled counters, gauges and histograms.
+
+    Conventions used across the pipeline:
+        phase_seconds_total{phase}: wall time spent in a phase (see ``phase``).
+        records_total{stage}: records produced by a stage; reported as a rate
+            over the phase of the same name, or over the registry uptime.
+        api_request_seconds{component, model}: per-API-call latency.
+        api_tokens_total{component, model, direction}: prompt/completion tokens.
+        api_retries_total{operation}: retried API attempts.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._gauges: Dict[Tuple[str, Labels], float] = {}
+        self._gauge_max: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self.started = time.time()
+        self._started_monotonic = time.monotonic()
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        """Add ``value`` to a counter."""
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        """Set a gauge, remembering its peak value."""
+        key = (name, _labels(labels))
+        with self._lock:
+            self._gauges[key] = value
+            self._gauge_max[key] = max(self._gauge_max.get(key, value), value)
+
+    def add_gauge(self, name: str, delta: float, **labels: Any) -> None:
+        """Move a gauge by ``delta``, e.g. +1/-1 around an in-flight request."""
+        key = (name, _labels(labels))
+        with self._lock:
+            value = self._gauges.get(key, 0) + delta
+            self._gauges[key] = value
+            self._gauge_max[key] = max(self._gauge_max.get(key, value), value)
+
+    def observe(self, name: str, value: float, buckets: Optional[Tuple[float, ...]] = None, **labels: Any) -> None:
+        """Record one observation in a histogram."""
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets or DEFAULT_LATENCY_BUCKETS)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        """Observe the duration of the ``with`` block in a histogram."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Add the wall time of the ``with`` block to ``phase_seconds_total{phase=name}``.
+
+        Overlapping occurrences of the same phase (e.g. concurrent writes) are summed.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_phase(name, time.perf_counter() - started)
+
+    def record_phase(self, name: str, seconds: float) -> None:
+        """Add ``seconds`` to a phase timer, for code that cannot use ``phase``."""
+        self.inc("phase_seconds_total", seconds, phase=name)
+
+    def uptime(self) -> float:
+        return time.monotonic() - self._started_monotonic
+
+    def summary(self) -> Dict[str, Any]:
+        """Return a JSON-serialisable snapshot of every metric."""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            gauge_max = dict(self._gauge_max)
+            histograms = {key: histogram.summary() for key, histogram in self._histograms.items()}
+
+        uptime = self.uptime()
+        phases = {dict(labels)["phase"]: round(value, 6)
+                  for (name, labels), value in counters.items() if name == "phase_seconds_total"}
+        rates = {}
+        for (name, labels), value in counters.items():
+            if name == "records_total":
+                stage = dict(labels).get("stage", "")
+                duration = phases.get(stage) or uptime
+                rates[stage or "records"] = round(value / duration, 3) if duration else 0.0
+
+        return {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "uptime_seconds": round(uptime, 3),
+            "phases": phases,
+            "records_per_second": rates,
+            "counters": {_series_name(n, l): v for (n, l), v in sorted(counters.items())
+                         if n != "phase_seconds_total"},
+            "gauges": {_series_name(n, l): {"value": v, "max": gauge_max[(n, l)]}
+                       for (n, l), v in sorted(gauges.items())},
+            "histograms": {_series_name(n, l): s for (n, l), s in sorted(histograms.items())},
+        }
+
+    def to_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            gauge_max = dict(self._gauge_max)
+            histograms = sorted(
+                (key, (h.buckets, list(h.counts), h.count, h.sum)) for key, h in self._histograms.items()
+            )
+
+        lines = []
+        declared = set()
+
+        def declare(metric: str, kind: str) -> None:
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f"# TYPE {metric} {kind}")
+
+        for (name, labels), value in counters:
+            metric = METRIC_PREFIX + name
+            declare(metric, "counter")
+            lines.append(f"{metric}{_prometheus_labels(labels)} {value}")
+        for (name, labels), value in gauges:
+            metric = METRIC_PREFIX + name
+            declare(metric, "gauge")
+            lines.append(f"{metric}{_prometheus_labels(labels)} {value}")
+            declare(metric + "_max", "gauge")
+            lines.append(f"{metric}_max{_prometheus_labels(labels)} {gauge_max[(name, labels)]}")
+        for (name, labels), (buckets, counts, count, total) in histograms:
+            metric = METRIC_PREFIX + name
+            declare(metric, "histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{metric}_bucket{_prometheus_labels(labels, (('le', le),))} {cumulative}")
+            lines.append(f"{metric}_sum{_prometheus_labels(labels)} {total}")
+            lines.append(f"{metric}_count{_prometheus_labels(labels)} {count}")
+        declare(METRIC_PREFIX + "uptime_seconds", "gauge")
+        lines.append(f"{METRIC_PREFIX}uptime_seconds {self.uptime():.3f}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, directory: str, name: str = "metrics") -> None:
+        """Atomically write ``<name>.json`` and ``<name>.prom`` into ``directory``."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for path, content in (
+            (directory / f"{name}.json", json.dumps(self.summary(), indent=2)),
+            (directory / f"{name}.prom", self.to_prometheus()),
+        ):
+            # Textfile collectors may read at any moment, so never expose a partial file
+            tmp_path = path.with_name(path.name + ".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+
+class MetricsExporter:
+    """Background thread dumping a registry every ``interval`` seconds, and once more on stop."""
+
+    def __init__(
+        self,
+        directory: str,
+        registry: Optional[MetricsRegistry] = None,
+        name: str = "metrics",
+        interval: float = DEFAULT_EXPORT_INTERVAL
+    ):
+        self.directory = directory
+        self.registry = registry or get_registry()
+        self.name = name
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+
+    def _dump(self) -> None:
+        try:
+            self.registry.dump(self.directory, self.name)
+        except OSError as e:
+            logger.warning(f"Could not write metrics to {self.directory}: {e}")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._dump()
+
+    def start(self) -> "MetricsExporter":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self._dump()
+        logger.info(f"Metrics written to {Path(self.directory) / self.name}.json and .prom")
+
+    def __enter__(self) -> "MetricsExporter":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+
+_default_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    """Return the process-wide default registry."""
+    return _default_registry
@@ -0,0 +1,124 @@
+"""Sidecar byte-offset index for JSONL datasets.
+
+The index stores the starting byte offset of every record of a JSONL file in
+a compact array next to it, so a record can be read by position with one seek
+instead of parsing the file up to it, and the record count is known without
+reading the dataset. It is stamped with the dataset's size and modification
+time and rebuilt whenever the dataset has changed since.
+"""
+
+import array
+import json
+import logging
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+OFFSETS_SUFFIX = ".offsets"
+# Magic, dataset size, dataset mtime in ns
+_HEADER = struct.Struct("<8sQQ")
+_MAGIC = b"RTOFFS01"
+
+
+class OffsetIndex:
+    """Byte offsets of the non-blank lines of a JSONL file, one 8-byte entry per record."""
+
+    def __init__(self, dataset_path: str, index_path: Optional[str] = None):
+        """Initialize the index; call ``load`` before use.
+
+        Args:
+            dataset_path: Path to the plain (uncompressed) JSONL dataset.
+            index_path: Path to the sidecar file. Defaults to the dataset path
+                with an ``.offsets`` suffix appended.
+        """
+        self.dataset_path = Path(dataset_path)
+        self.path = Path(index_path) if index_path else Path(str(dataset_path) + OFFSETS_SUFFIX)
+        self.offsets = array.array("Q")
+        # End of the last record, so the byte length of every record is known
+        self.end = 0
+        self._file = None
+
+    def load(self) -> int:
+        """Load the sidecar, rebuilding it if it is missing or stale.
+
+        Returns:
+            Number of records in the dataset.
+        """
+        stat = self.dataset_path.stat()
+        try:
+            with open(self.path, "rb") as f:
+                magic, size, mtime_ns = _HEADER.unpack(f.read(_HEADER.size))
+                if magic == _MAGIC and size == stat.st_size and mtime_ns == stat.st_mtime_ns:
+                    offsets = array.array("Q")
+                    offsets.frombytes(f.read())
+                    self.offsets = offsets
+                    self.end = size
+                    return len(self)
+        except (OSError, struct.error, ValueError):
+            pass
+        return self.rebuild()
+
+    def rebuild(self) -> int:
+        """Scan the dataset for record offsets and save the sidecar.
+
+        Returns:
+            Number of records in the dataset.
+        """
+        offsets = array.array("Q")
+        position = 0
+        end = 0
+        with open(self.dataset_path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    offsets.append(position)
+                    end = position + len(line)
+                position += len(line)
+        self.offsets = offsets
+        self.end = end
+        self.save()
+        logger.info(f"Indexed {len(offsets)} records of {self.dataset_path}")
+        return len(offsets)
+
+    def save(self) -> None:
+        """Write the sidecar for the dataset as it is now, atomically."""
+        stat = self.dataset_path.stat()
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, stat.st_size, stat.st_mtime_ns))
+            self.offsets.tofile(f)
+        os.replace(tmp_path, self.path)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def size(self, position: int) -> int:
+        """Byte length of a record, including its line terminator."""
+        following = self.offsets[position + 1] if position + 1 < len(self.offsets) else self.end
+        return following - self.offsets[position]
+
+    def read(self, position: int) -> Dict[str, Any]:
+        """Read one record by its zero-based position without scanning the file.
+
+        Raises:
+            IndexError: If the dataset has fewer records.
+        """
+        if self._file is None:
+            self._file = open(self.dataset_path, "rb")
+        self._file.seek(self.offsets[position])
+        return json.loads(self._file.readline())
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Yield the records in file order, reading one line at a time."""
+        with open(self.dataset_path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def close(self) -> None:
+        """Close the file handle used by ``read``."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
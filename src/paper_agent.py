@@ -3,22 +3,83 @@
 Extracts attack strategies from research papers and outputs structured JSON.
 """
 
+import asyncio
 import json
 import logging
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
-import pypdf
-from openai import OpenAI
-from openai import APIStatusError
 from dotenv import load_dotenv
 import os
 
+from src.cache import PageTextCache, StrategyCache, file_sha256
+from src.metrics import MetricsRegistry, get_registry
+from src.rate_limit import RateLimiter, estimate_tokens
+from src.retry import call_with_retries
+
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_BASE_URL = "https://openrouter.ai/api/v1"
+
+STRATEGY_SYSTEM_PROMPT = """You are an expert AI security researcher analyzing research papers on adversarial attacks and jailbreaks.
+
+Your task is to extract the core attack strategy from the paper and format it as a JSON object with the following structure:
+
+{
+  "strategy_name": "Name of the attack (e.g., Emoji Attack, Unicode Attack, etc.)",
+  "core_principle": "A concise 2-3 sentence description of the core principle behind this attack",
+  "transformation_rules": "Detailed, strictly algorithmic instructions on how to generate the attack from a vanilla prompt. This must be written as a clear, step-by-step algorithm or pseudo-code that an IDE or code generator could logically follow. It must strictly mimic the generation method described in the paper.",
+  "one_shot_example": {
+    "input": "A benign example prompt that would normally be rejected",
+    "output": "The transformed adversarial prompt following the attack strategy"
+  }
+}
+
+IMPORTANT:
+- The transformation_rules MUST be algorithmic, precise, and strictly follow the paper's methodology.
+- Write the 'transformation_rules' as if you are writing a specification for a code function or an IDE plugin.
+- Do not use vague language; use imperative steps (e.g., '1. Encode X using Y...', '2. Append Z...').
+- For EACH step, explicitly indicate the tool/method used by the authors (e.g., '[LLM]', '[Python Script]', '[Manual]', '[Heuristic]'). 
+- Focus on the actual attack technique, not just the paper's methodology.
+- Return ONLY valid JSON, no markdown formatting or code blocks.
+- If the paper describes multiple attacks, focus on the primary/most effective one.
+"""
+
+CHUNK_SUMMARY_SYSTEM_PROMPT = """You are an expert AI security researcher reading one excerpt of a research paper on adversarial attacks and jailbreaks.
+
+Write dense notes on everything in the excerpt that describes the attack technique: its name, core idea, the exact generation procedure and its steps, the tools or models used for each step, parameters, prompt templates and worked examples.
+
+IMPORTANT:
+- Copy prompt templates, algorithm steps and examples verbatim.
+- Skip related work, evaluation numbers and discussion unless they change how the attack is generated.
+- If the excerpt contains nothing about the attack technique, reply with exactly: NONE
+"""
+
+# Analysis modes accepted by PaperAgent.analyze_paper
+ANALYSIS_MODES = ("auto", "single", "map_reduce")
+
+# Papers estimated above this many tokens are analyzed with map-reduce in "auto" mode
+SINGLE_SHOT_TOKEN_LIMIT = 100_000
+# Token budget of one map-step chunk
+MAP_CHUNK_TOKENS = 12_000
+# Output token caps for single-shot/reduce calls and for per-chunk notes
+STRATEGY_MAX_TOKENS = 4096
+CHUNK_SUMMARY_MAX_TOKENS = 1500
+
+# Numbered section headings ("3 Method", "4.2 Results") and common unnumbered ones
+_HEADING_RE = re.compile(
+    r"^(?:\d+(?:\.\d+)*\.?[ \t]+[A-Z][^\n]{0,80}"
+    r"|(?:Abstract|Introduction|Related Work|Conclusions?|References|Appendix|Acknowledg(?:e)?ments)\b[^\n]{0,40})$",
+    re.MULTILINE
+)
+
 
 def extract_first_json_object(text: str) -> str:
     """Extract the first valid JSON object from text, handling extra data.
@@ -73,31 +134,149 @@ def extract_first_json_object(text: str) -> str:
     raise ValueError("Incomplete JSON object in text")
 
 
+def split_paper(paper_text: str, max_chunk_tokens: int = MAP_CHUNK_TOKENS) -> List[str]:
+    """Split paper text into chunks of at most max_chunk_tokens estimated tokens.
+    
+    The text is cut at section headings first; consecutive sections are packed
+    into the same chunk while they fit, and oversized sections are split at
+    paragraph boundaries, then at hard character limits.
+    
+    Args:
+        paper_text: Full text content of the research paper.
+        max_chunk_tokens: Token budget per chunk.
+        
+    Returns:
+        Ordered list of non-empty text chunks.
+    """
+    max_chars = max_chunk_tokens * 4
+    boundaries = [0] + [m.start() for m in _HEADING_RE.finditer(paper_text)] + [len(paper_text)]
+    sections = [paper_text[a:b] for a, b in zip(boundaries, boundaries[1:]) if paper_text[a:b].strip()]
+    
+    pieces = []
+    for section in sections:
+        if len(section) <= max_chars:
+            pieces.append(section)
+            continue
+        for paragraph in re.split(r"\n\s*\n", section):
+            for start in range(0, len(paragraph), max_chars):
+                pieces.append(paragraph[start:start + max_chars] + "\n\n")
+    
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) > max_chars:
+            chunks.append(current)
+            current = ""
+        current += piece
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[Tuple[int, Optional[str], Optional[str]]]:
+    """Extract text from pages [start, end) of a PDF.
+    
+    Runs in a worker process, so it opens its own reader.
+    
+    Returns:
+        (page index, text, error) per page; text is None if extraction failed.
+    """
+    import pypdf
+
+    results = []
+    with open(pdf_path, 'rb') as file:
+        pdf_reader = pypdf.PdfReader(file)
+        for page_index in range(start, end):
+            try:
+                results.append((page_index, pdf_reader.pages[page_index].extract_text(), None))
+            except Exception as e:
+                results.append((page_index, None, str(e)))
+    return results
+
+
+def _page_batches(page_indices: List[int], batch_size: int) -> List[Tuple[int, int]]:
+    """Group page indices into contiguous [start, end) ranges of at most batch_size pages."""
+    batches = []
+    for page_index in page_indices:
+        if batches and batches[-1][1] == page_index and batches[-1][1] - batches[-1][0] < batch_size:
+            batches[-1] = (batches[-1][0], page_index + 1)
+        else:
+            batches.append((page_index, page_index + 1))
+    return batches
+
+
 class PaperAgent:
     """Extracts attack strategies from research papers."""
     
-    def __init__(self, api_key: Optional[str] = None, base_url: str = "https://openrouter.ai/api/v1"):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        cache: Optional[StrategyCache] = None,
+        page_cache: Optional[PageTextCache] = None,
+        pdf_workers: Optional[int] = None,
+        pdf_batch_size: int = 4,
+        analysis_concurrency: int = 4,
+        metrics: Optional[MetricsRegistry] = None,
+        rate_limiter: Optional[RateLimiter] = None
+    ):
         """Initialize the Paper Agent.
         
         Args:
             api_key: OpenRouter API key. If None, reads from OPENROUTER_API_KEY env var.
-            base_url: OpenRouter API base URL.
+            base_url: OpenAI-compatible API base URL. If None, reads from OPENROUTER_BASE_URL
+                env var, falling back to OpenRouter.
+            cache: Cache for extracted strategies. If None, a default on-disk cache is used.
+            page_cache: Cache for per-page PDF text. If None, a default on-disk cache is used.
+            pdf_workers: Processes used for PDF text extraction. None uses all CPU cores.
+                The pool is shared by all PDFs the agent extracts, including ones
+                prepared concurrently, and lives until ``close``.
+            pdf_batch_size: Number of consecutive pages extracted per worker task.
+            analysis_concurrency: Upper bound on concurrent API calls, e.g. per-chunk calls
+                in map-reduce analysis. The rate limiter adapts below it on 429s.
+            metrics: Registry for phase timers and API metrics. None uses the default one.
+            rate_limiter: Limiter shared by all API calls. If None, an adaptive limiter
+                bounded by analysis_concurrency is created.
         """
         self.api_key = api_key or os.getenv("OPENROUTER_API_KEY")
         if not self.api_key:
             raise ValueError("OpenRouter API key not found. Set OPENROUTER_API_KEY environment variable.")
         
-        self.client = OpenAI(
+        # openai and pypdf are imported on first use; they dominate CLI startup time
+        from openai import AsyncOpenAI
+
+        # Retries are handled by call_with_retries, not the client
+        self.client = AsyncOpenAI(
             api_key=self.api_key,
-            base_url=base_url
+            base_url=base_url or os.getenv("OPENROUTER_BASE_URL", DEFAULT_BASE_URL),
+            max_retries=0
         )
         self.model = "anthropic/claude-sonnet-4.5"
+        self.cache = cache if cache is not None else StrategyCache()
+        self.page_cache = page_cache if page_cache is not None else PageTextCache()
+        self.pdf_workers = pdf_workers or os.cpu_count() or 1
+        self.pdf_batch_size = max(1, pdf_batch_size)
+        # Created on the first multi-batch extraction, from whichever thread runs it
+        self._pdf_pool: Optional[ProcessPoolExecutor] = None
+        self._pdf_pool_lock = threading.Lock()
+        self.analysis_concurrency = max(1, analysis_concurrency)
+        self.metrics = metrics or get_registry()
+        self.rate_limiter = rate_limiter or RateLimiter(
+            max_concurrency=self.analysis_concurrency,
+            initial_concurrency=self.analysis_concurrency,
+            name="paper_agent",
+            metrics=self.metrics
+        )
     
-    def extract_text_from_pdf(self, pdf_path: str) -> str:
+    def extract_text_from_pdf(self, pdf_path: str, file_hash: Optional[str] = None) -> str:
         """Extract text content from a PDF file.
         
+        Pages are extracted in batches spread over a process pool and cached
+        per page, so a re-run only extracts pages that are not cached yet.
+        
         Args:
             pdf_path: Path to the PDF file.
+            file_hash: SHA-256 of the file, if already known.
             
         Returns:
             Extracted text content.
@@ -110,21 +289,27 @@ class PaperAgent:
         if not pdf_path.exists():
             raise FileNotFoundError(f"PDF file not found: {pdf_path}")
         
+        import pypdf
+
+        parse_started = time.perf_counter()
         try:
-            text_parts = []
+            file_hash = file_hash or file_sha256(pdf_path)
             with open(pdf_path, 'rb') as file:
-                pdf_reader = pypdf.PdfReader(file)
-                logger.info(f"Processing PDF with {len(pdf_reader.pages)} pages")
-                
-                for page_num, page in enumerate(pdf_reader.pages, 1):
-                    try:
-                        text = page.extract_text()
-                        if text.strip():
-                            text_parts.append(text)
-                    except Exception as e:
-                        logger.warning(f"Error extracting text from page {page_num}: {e}")
-                        continue
+                num_pages = len(pypdf.PdfReader(file).pages)
             
+            pages = self.page_cache.get_pages(file_hash, num_pages)
+            missing = [i for i in range(num_pages) if i not in pages]
+            self.metrics.inc("pdf_pages_total", len(pages), source="cache")
+            self.metrics.inc("pdf_pages_total", len(missing), source="extracted")
+            logger.info(
+                f"Processing PDF with {num_pages} pages "
+                f"({len(pages)} cached, {len(missing)} to extract)"
+            )
+            if missing:
+                pages.update(self._extract_pages(str(pdf_path), file_hash, missing))
+            
+            # Join in page order; failed pages are simply absent
+            text_parts = [pages[i] for i in range(num_pages) if pages.get(i, "").strip()]
             full_text = "\n\n".join(text_parts)
             if not full_text.strip():
                 raise ValueError("No text could be extracted from the PDF")
@@ -136,76 +321,182 @@ class PaperAgent:
             if isinstance(e, (FileNotFoundError, ValueError)):
                 raise
             raise ValueError(f"Error reading PDF file: {e}")
+        finally:
+            self.metrics.record_phase("pdf_parse", time.perf_counter() - parse_started)
+    
+    def _extract_pages(self, pdf_path: str, file_hash: str, page_indices: List[int]) -> Dict[int, str]:
+        """Extract the given pages in batches, caching every page that succeeds."""
+        batches = _page_batches(page_indices, self.pdf_batch_size)
+        pages = {}
+        started = time.monotonic()
+        
+        def collect(results, batch_started):
+            for page_index, text, error in results:
+                if error is not None:
+                    logger.warning(f"Error extracting text from page {page_index + 1}: {error}")
+                    continue
+                pages[page_index] = text
+                try:
+                    self.page_cache.put_page(file_hash, page_index, text)
+                except (OSError, UnicodeError) as e:
+                    logger.warning(f"Could not cache text of page {page_index + 1}: {e}")
+            first, last = results[0][0] + 1, results[-1][0] + 1
+            logger.info(
+                f"Extracted pages {first}-{last} in {time.monotonic() - batch_started:.2f}s "
+                f"[{len(pages)}/{len(page_indices)} pages, {time.monotonic() - started:.2f}s total]"
+            )
+        
+        workers = min(self.pdf_workers, len(batches))
+        if workers <= 1:
+            for start, end in batches:
+                batch_started = time.monotonic()
+                collect(_extract_page_range(pdf_path, start, end), batch_started)
+            return pages
+        
+        pool = self._get_pdf_pool()
+        futures = {pool.submit(_extract_page_range, pdf_path, start, end): time.monotonic()
+                   for start, end in batches}
+        try:
+            for future in as_completed(futures):
+                collect(future.result(), futures[future])
+        finally:
+            for future in futures:
+                future.cancel()
+        return pages
+    
+    def _get_pdf_pool(self) -> ProcessPoolExecutor:
+        """Return the extraction pool, starting it on first use."""
+        with self._pdf_pool_lock:
+            if self._pdf_pool is None:
+                self._pdf_pool = ProcessPoolExecutor(max_workers=self.pdf_workers)
+            return self._pdf_pool
+    
+    async def close(self) -> None:
+        """Close the underlying HTTP client and stop the PDF extraction pool."""
+        with self._pdf_pool_lock:
+            pool, self._pdf_pool = self._pdf_pool, None
+        if pool is not None:
+            await asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True)
+        await self.client.close()
+    
+    async def _complete(self, system_prompt: str, user_prompt: str, max_tokens: int) -> str:
+        """Run one streamed chat completion and return the stripped response text.
+        
+        Every attempt holds a slot of the shared rate limiter. Rate limits,
+        server errors and dropped connections are retried with jittered
+        exponential backoff; a retry restarts the stream.
+        """
+        labels = {"component": "paper_agent", "model": self.model}
+        
+        async def attempt() -> str:
+            started = time.perf_counter()
+            first_token = None
+            usage = None
+            parts = []
+            self.metrics.add_gauge("api_in_flight", 1, component="paper_agent")
+            try:
+                stream = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=0.3,  # Lower temperature for more consistent extraction
+                    max_tokens=max_tokens,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        if first_token is None:
+                            first_token = time.perf_counter() - started
+                        parts.append(chunk.choices[0].delta.content)
+                    if getattr(chunk, "usage", None):
+                        usage = chunk.usage
+            except Exception as e:
+                self.metrics.inc("api_errors_total", status=getattr(e, "status_code", "connection"), **labels)
+                raise
+            finally:
+                self.metrics.add_gauge("api_in_flight", -1, component="paper_agent")
+            
+            self.metrics.observe("api_request_seconds", time.perf_counter() - started, **labels)
+            if first_token is not None:
+                self.metrics.observe("api_first_token_seconds", first_token, **labels)
+            text = "".join(parts)
+            # Fall back to the chars/4 estimate for providers that do not report usage
+            prompt_tokens = usage.prompt_tokens if usage else estimate_tokens(system_prompt + user_prompt)
+            completion_tokens = usage.completion_tokens if usage else estimate_tokens(text)
+            self.metrics.inc("api_tokens_total", prompt_tokens, direction="prompt", **labels)
+            self.metrics.inc("api_tokens_total", completion_tokens, direction="completion", **labels)
+            return text.strip()
+        
+        return await call_with_retries(
+            attempt,
+            description=f"{self.model} completion",
+            metrics=self.metrics,
+            limiter=self.rate_limiter,
+            tokens=estimate_tokens(system_prompt + user_prompt) + max_tokens
+        )
+    
+    @staticmethod
+    def _parse_strategy(response_text: str) -> Dict[str, Any]:
+        """Parse and validate the strategy JSON from a model response."""
+        # Extract the first valid JSON object from response
+        json_text = extract_first_json_object(response_text)
+        strategy = json.loads(json_text)
+        
+        # Validate required fields (prompt_template is now optional)
+        required_fields = ["strategy_name", "core_principle", "transformation_rules", "one_shot_example"]
+        for field in required_fields:
+            if field not in strategy:
+                raise ValueError(f"Missing required field in strategy: {field}")
+        
+        if "input" not in strategy["one_shot_example"] or "output" not in strategy["one_shot_example"]:
+            raise ValueError("one_shot_example must contain 'input' and 'output' fields")
+        
+        return strategy
     
-    def analyze_paper(self, paper_text: str) -> Dict[str, Any]:
+    async def analyze_paper(self, paper_text: str, mode: str = "auto") -> Dict[str, Any]:
         """Analyze paper text and extract attack strategy.
         
         Args:
             paper_text: Full text content of the research paper.
+            mode: "single" sends the whole paper in one call; "map_reduce" takes
+                notes on chunks concurrently and derives the strategy from the
+                notes; "auto" picks map-reduce for papers estimated above
+                SINGLE_SHOT_TOKEN_LIMIT tokens.
             
         Returns:
             Dictionary containing the extracted strategy in the required JSON schema.
         """
-        system_prompt = """You are an expert AI security researcher analyzing research papers on adversarial attacks and jailbreaks.
-
-Your task is to extract the core attack strategy from the paper and format it as a JSON object with the following structure:
-
-{
-  "strategy_name": "Name of the attack (e.g., Emoji Attack, Unicode Attack, etc.)",
-  "core_principle": "A concise 2-3 sentence description of the core principle behind this attack",
-  "transformation_rules": "Detailed, strictly algorithmic instructions on how to generate the attack from a vanilla prompt. This must be written as a clear, step-by-step algorithm or pseudo-code that an IDE or code generator could logically follow. It must strictly mimic the generation method described in the paper.",
-  "one_shot_example": {
-    "input": "A benign example prompt that would normally be rejected",
-    "output": "The transformed adversarial prompt following the attack strategy"
-  }
-}
-
-IMPORTANT:
-- The transformation_rules MUST be algorithmic, precise, and strictly follow the paper's methodology.
-- Write the 'transformation_rules' as if you are writing a specification for a code function or an IDE plugin.
-- Do not use vague language; use imperative steps (e.g., '1. Encode X using Y...', '2. Append Z...').
-- For EACH step, explicitly indicate the tool/method used by the authors (e.g., '[LLM]', '[Python Script]', '[Manual]', '[Heuristic]'). 
-- Focus on the actual attack technique, not just the paper's methodology.
-- Return ONLY valid JSON, no markdown formatting or code blocks.
-- If the paper describes multiple attacks, focus on the primary/most effective one.
-"""
-
-        # Use full paper text without truncation (assuming unlimited tokens)
-        logger.info(f"Using full paper text: {len(paper_text)} characters")
+        if mode not in ANALYSIS_MODES:
+            raise ValueError(f"Unknown analysis mode: {mode}. Expected one of {ANALYSIS_MODES}")
+        
+        estimated_tokens = estimate_tokens(paper_text)
+        if mode == "auto":
+            mode = "map_reduce" if estimated_tokens > SINGLE_SHOT_TOKEN_LIMIT else "single"
+        logger.info(f"Paper text: {len(paper_text)} characters (~{estimated_tokens} tokens), mode: {mode}")
         
-        user_prompt = f"""Analyze the following research paper and extract the attack strategy:
+        analysis_started = time.perf_counter()
+        try:
+            if mode == "single":
+                user_prompt = f"""Analyze the following research paper and extract the attack strategy:
 
 {paper_text}
 
 Extract the attack strategy and return the JSON object as specified."""
+                logger.info("Sending paper to Claude for analysis...")
+            else:
+                notes = await self._map_chunks(split_paper(paper_text))
+                user_prompt = f"""The following are notes taken on consecutive sections of a research paper:
 
-        # No token limits - use maximum available
-        try:
-            logger.info("Sending paper to Claude for analysis (no token limits)...")
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.3,  # Lower temperature for more consistent extraction
-                # No max_tokens limit - let model use what it needs
-            )
-            
-            response_text = response.choices[0].message.content.strip()
-            
-            # Extract the first valid JSON object from response
-            json_text = extract_first_json_object(response_text)
-            strategy = json.loads(json_text)
-            
-            # Validate required fields (prompt_template is now optional)
-            required_fields = ["strategy_name", "core_principle", "transformation_rules", "one_shot_example"]
-            for field in required_fields:
-                if field not in strategy:
-                    raise ValueError(f"Missing required field in strategy: {field}")
+{notes}
+
+Based on these notes, extract the attack strategy and return the JSON object as specified."""
+                logger.info("Sending section notes to Claude for the reduce step...")
             
-            if "input" not in strategy["one_shot_example"] or "output" not in strategy["one_shot_example"]:
-                raise ValueError("one_shot_example must contain 'input' and 'output' fields")
+            response_text = await self._complete(STRATEGY_SYSTEM_PROMPT, user_prompt, STRATEGY_MAX_TOKENS)
+            strategy = self._parse_strategy(response_text)
             
             logger.info(f"Successfully extracted strategy: {strategy['strategy_name']}")
             return strategy
@@ -216,30 +507,136 @@ Extract the attack strategy and return the JSON object as specified."""
         except Exception as e:
             logger.error(f"Error during paper analysis: {e}")
             raise
+        finally:
+            self.metrics.record_phase("llm_analysis", time.perf_counter() - analysis_started)
+    
+    async def _map_chunks(self, chunks: List[str]) -> str:
+        """Take notes on every chunk concurrently and join them in paper order."""
+        logger.info(f"Map step: summarising {len(chunks)} chunks (up to {self.analysis_concurrency} concurrent)")
+        started = time.monotonic()
+        
+        # Concurrency is bounded by the shared rate limiter in _complete
+        async def summarise(index: int, chunk: str) -> str:
+            user_prompt = f"Excerpt {index + 1} of {len(chunks)}:\n\n{chunk}"
+            return await self._complete(CHUNK_SUMMARY_SYSTEM_PROMPT, user_prompt, CHUNK_SUMMARY_MAX_TOKENS)
+        
+        summaries = await asyncio.gather(*(summarise(i, chunk) for i, chunk in enumerate(chunks)))
+        
+        notes = [
+            f"## Part {index + 1}\n{summary}"
+            for index, summary in enumerate(summaries)
+            if summary and summary.strip().upper() != "NONE"
+        ]
+        logger.info(f"Map step finished in {time.monotonic() - started:.1f}s; {len(notes)} chunks had relevant notes")
+        if not notes:
+            raise ValueError("No attack-related content found in any part of the paper")
+        return "\n\n".join(notes)
     
-    def extract_strategy_from_pdf(self, pdf_path: str) -> Dict[str, Any]:
+    async def _prepare(self, pdf_path: str, refresh: bool) -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
+        """Look up the strategy cache and, on a miss, extract the PDF text off the event loop.
+        
+        Returns:
+            (cache key, cached strategy or None, paper text or None).
+        """
+        if not Path(pdf_path).exists():
+            raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+        
+        pdf_hash = await asyncio.to_thread(file_sha256, pdf_path)
+        cache_key = StrategyCache.make_key(pdf_hash, self.model, STRATEGY_SYSTEM_PROMPT)
+        strategy = None if refresh else self.cache.get(cache_key)
+        self.metrics.inc("cache_lookups_total", cache="strategy", result="miss" if strategy is None else "hit")
+        if strategy is not None:
+            logger.info(f"Using cached strategy for {pdf_path} (use --refresh to re-extract)")
+            return cache_key, strategy, None
+        
+        paper_text = await asyncio.to_thread(self.extract_text_from_pdf, pdf_path, pdf_hash)
+        return cache_key, None, paper_text
+    
+    async def _analyze_prepared(
+        self,
+        pdf_path: str,
+        prepared: Tuple[str, Optional[Dict[str, Any]], Optional[str]],
+        mode: str
+    ) -> Dict[str, Any]:
+        cache_key, strategy, paper_text = prepared
+        if strategy is not None:
+            return strategy
+        
+        strategy = await self.analyze_paper(paper_text, mode=mode)
+        try:
+            self.cache.put(cache_key, strategy, pdf_path=str(pdf_path), model=self.model)
+        except OSError as e:
+            logger.warning(f"Could not cache extracted strategy: {e}")
+        return strategy
+    
+    async def extract_strategy_from_pdf(self, pdf_path: str, refresh: bool = False, mode: str = "auto") -> Dict[str, Any]:
         """Complete pipeline: Extract text from PDF and analyze it.
         
+        Results are cached by PDF content hash, model and system prompt, so
+        repeated runs on the same paper skip the LLM call.
+        
         Args:
             pdf_path: Path to the PDF file.
+            refresh: Ignore a cached strategy and re-run the analysis.
+            mode: Analysis mode passed to analyze_paper.
             
         Returns:
             Dictionary containing the extracted strategy.
         """
         logger.info(f"Starting strategy extraction from PDF: {pdf_path}")
-        paper_text = self.extract_text_from_pdf(pdf_path)
-        strategy = self.analyze_paper(paper_text)
+        prepared = await self._prepare(pdf_path, refresh)
+        strategy = await self._analyze_prepared(pdf_path, prepared, mode)
+        self._save_strategy(strategy, Path("generator") / "extracted_strategy.json")
+        return strategy
+    
+    async def extract_strategies_from_pdfs(
+        self,
+        pdf_paths: List[str],
+        output_dir: str = "generator/strategies",
+        refresh: bool = False,
+        mode: str = "auto"
+    ) -> Dict[str, Dict[str, Any]]:
+        """Extract strategies from several PDFs, parsing the next PDF while the current one is analyzed.
+        
+        A failure on one paper is logged and does not stop the batch.
         
-        # Save extracted strategy to file for inspection
+        Args:
+            pdf_paths: Paths to the PDF files, processed in order.
+            output_dir: Directory where each strategy is saved as <pdf stem>.json.
+            refresh: Ignore cached strategies and re-run the analysis.
+            mode: Analysis mode passed to analyze_paper.
+            
+        Returns:
+            Mapping of PDF path to extracted strategy, for the papers that succeeded.
+        """
+        strategies = {}
+        if not pdf_paths:
+            return strategies
+        
+        next_prepared = asyncio.create_task(self._prepare(pdf_paths[0], refresh))
+        try:
+            for index, pdf_path in enumerate(pdf_paths):
+                logger.info(f"[{index + 1}/{len(pdf_paths)}] Extracting strategy from {pdf_path}")
+                prepared_task = next_prepared
+                if index + 1 < len(pdf_paths):
+                    next_prepared = asyncio.create_task(self._prepare(pdf_paths[index + 1], refresh))
+                try:
+                    strategy = await self._analyze_prepared(pdf_path, await prepared_task, mode)
+                except Exception as e:
+                    logger.error(f"Failed to extract strategy from {pdf_path}: {e}")
+                    continue
+                self._save_strategy(strategy, Path(output_dir) / f"{Path(pdf_path).stem}.json")
+                strategies[pdf_path] = strategy
+        finally:
+            next_prepared.cancel()
+        return strategies
+    
+    def _save_strategy(self, strategy: Dict[str, Any], strategy_file: Path) -> None:
+        """Save the extracted strategy to a JSON file for inspection."""
         try:
-            output_dir = Path("generator")
-            output_dir.mkdir(exist_ok=True)
-            strategy_file = output_dir / "extracted_strategy.json"
+            strategy_file.parent.mkdir(parents=True, exist_ok=True)
             with open(strategy_file, 'w', encoding='utf-8') as f:
                 json.dump(strategy, f, indent=2, ensure_ascii=False)
             logger.info(f"Extracted strategy saved to: {strategy_file}")
         except Exception as e:
             logger.warning(f"Could not save strategy to file: {e}")
-        
-        return strategy
-
@@ -0,0 +1,139 @@
+"""Background prefetching of blocking iterables into an asyncio consumer.
+
+Network-backed sources such as HuggingFace streaming datasets stall on every
+fetch and parse. A Prefetcher drains such a source in a worker thread into a
+bounded asyncio queue, so the event loop never blocks on the source and
+reading overlaps with downstream work, while the bound keeps memory flat if
+the consumer is slower than the source.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from typing import Any, Callable, Iterable, List, Optional
+
+from src.metrics import MetricsRegistry, get_registry
+
+logger = logging.getLogger(__name__)
+
+# Items are handed over in batches to keep cross-thread overhead per item low
+DEFAULT_PREFETCH_BATCH_SIZE = 256
+DEFAULT_PREFETCH_BATCHES = 16
+# How long close() waits for a thread stuck in a blocking read before leaving it behind
+_JOIN_TIMEOUT = 5.0
+
+_DONE = object()
+
+
+class _SourceError:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class Prefetcher:
+    """Reads a blocking iterable ahead of the consumer in a background thread."""
+
+    def __init__(
+        self,
+        source: Callable[[], Iterable[Any]],
+        max_batches: int = DEFAULT_PREFETCH_BATCHES,
+        batch_size: int = DEFAULT_PREFETCH_BATCH_SIZE,
+        name: str = "prefetch",
+        metrics: Optional[MetricsRegistry] = None
+    ):
+        """Initialize the prefetcher; the thread starts on the first ``take``.
+
+        Args:
+            source: Callable returning the iterable to read. It is called in the
+                worker thread, so slow setup such as opening a remote dataset
+                does not block the event loop either.
+            max_batches: Queue bound, in batches of ``batch_size`` items.
+            batch_size: Items handed to the event loop at a time.
+            name: Label of the queue_depth gauge and the thread.
+            metrics: Registry for the queue depth gauge. None uses the default one.
+        """
+        self.source = source
+        self.batch_size = max(1, batch_size)
+        self.name = name
+        self.metrics = metrics or get_registry()
+        self._queue: Optional[asyncio.Queue] = None
+        self._max_batches = max(1, max_batches)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._buffer: List[Any] = []
+        self._exhausted = False
+
+    def _start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self._max_batches)
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def _put(self, item: Any) -> bool:
+        """Block until the queue accepts ``item``; False if the prefetcher was closed meanwhile."""
+        future = asyncio.run_coroutine_threadsafe(self._queue.put(item), self._loop)
+        while True:
+            try:
+                future.result(timeout=0.1)
+                return True
+            except concurrent.futures.TimeoutError:
+                if self._stop.is_set():
+                    future.cancel()
+                    return False
+
+    def _run(self) -> None:
+        iterator = None
+        try:
+            iterator = iter(self.source())
+            batch = []
+            for item in iterator:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    if not self._put(batch):
+                        return
+                    batch = []
+                if self._stop.is_set():
+                    return
+            if batch and not self._put(batch):
+                return
+            self._put(_DONE)
+        except Exception as e:
+            if not self._stop.is_set():
+                self._put(_SourceError(e))
+        finally:
+            # Let generator sources run their cleanup (e.g. discard a partial cache file)
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    async def take(self, count: int) -> List[Any]:
+        """Return the next ``count`` items, fewer only once the source is exhausted.
+
+        Raises:
+            Exception: Whatever the source raised in the worker thread.
+        """
+        if self._thread is None:
+            self._start()
+        while len(self._buffer) < count and not self._exhausted:
+            item = await self._queue.get()
+            self.metrics.set_gauge("queue_depth", self._queue.qsize(), queue=self.name)
+            if item is _DONE:
+                self._exhausted = True
+            elif isinstance(item, _SourceError):
+                self._exhausted = True
+                raise item.error
+            else:
+                self._buffer.extend(item)
+        items, self._buffer = self._buffer[:count], self._buffer[count:]
+        return items
+
+    def close(self) -> None:
+        """Stop the worker thread; the source is abandoned mid-stream if not exhausted."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=_JOIN_TIMEOUT)
+            if self._thread.is_alive():
+                logger.warning(f"Prefetch thread {self.name} is still blocked reading; leaving it behind")
+            self._thread = None
@@ -0,0 +1,232 @@
+"""Adaptive client-side rate limiting for OpenAI-compatible API calls.
+
+A RateLimiter combines three limits that every request must pass:
+
+* a concurrency limit adjusted by AIMD: it grows while requests succeed and
+  is cut multiplicatively whenever the provider answers 429, so a run settles
+  near the provider's real capacity instead of a hand-tuned constant;
+* optional requests-per-minute and tokens-per-minute token buckets;
+* a global pause honouring the provider's ``Retry-After`` header.
+"""
+
+import asyncio
+import email.utils
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Optional
+
+from src.metrics import MetricsRegistry, get_registry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INITIAL_CONCURRENCY = 4
+DEFAULT_DECREASE_FACTOR = 0.5
+# Throttles within this many seconds of a cut are treated as the same congestion event
+DEFAULT_DECREASE_COOLDOWN = 2.0
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the token count of a text (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def parse_retry_after(error: BaseException) -> Optional[float]:
+    """Return the delay requested by an API error's Retry-After headers, in seconds."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Continuously refilling bucket of ``per_minute`` units with burst size ``per_minute``."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until ``amount`` units are available (0 if they are now)."""
+        self._refill()
+        # Requests larger than the bucket would never fit; let them through once it is full
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        """Remove ``amount`` units; the level may go negative to repay underestimates."""
+        self._refill()
+        self.level -= amount
+
+
+class RateLimiter:
+    """Shared AIMD concurrency limiter with RPM/TPM buckets and Retry-After pauses.
+
+    Use ``slot`` around every request attempt and report the outcome with
+    ``on_success`` or ``on_throttle``; ``call_with_retries`` does both when
+    given a limiter.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        initial_concurrency: Optional[int] = None,
+        min_concurrency: int = 1,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        decrease_factor: float = DEFAULT_DECREASE_FACTOR,
+        decrease_cooldown: float = DEFAULT_DECREASE_COOLDOWN,
+        name: str = "default",
+        metrics: Optional[MetricsRegistry] = None
+    ):
+        """Initialize the limiter.
+
+        Args:
+            max_concurrency: Upper bound on concurrent requests.
+            initial_concurrency: Starting limit. None uses DEFAULT_INITIAL_CONCURRENCY.
+                Until the first throttle the limit grows by one per success
+                (doubling every round trip); afterwards by one per round trip.
+            min_concurrency: Lower bound the limit is never cut below.
+            requests_per_minute: Request budget. None for no limit.
+            tokens_per_minute: Token budget, charged with the caller's estimate. None for no limit.
+            decrease_factor: Multiplier applied to the limit on a throttle.
+            decrease_cooldown: Seconds after a cut during which further throttles
+                do not cut again, since they usually belong to the same burst.
+            name: Label used in metrics and log messages.
+            metrics: Registry for limit, wait and throttle metrics. None uses the default one.
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        if initial_concurrency is None:
+            initial_concurrency = DEFAULT_INITIAL_CONCURRENCY
+        self.limit = float(min(self.max_concurrency, max(self.min_concurrency, initial_concurrency)))
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.name = name
+        self.metrics = metrics or get_registry()
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.in_flight = 0
+        self.throttled = False
+        self._paused_until = 0.0
+        self._last_decrease = float("-inf")
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.metrics.set_gauge("rate_limit_concurrency", int(self.limit), limiter=self.name)
+
+    @property
+    def concurrency(self) -> int:
+        """Current whole-number concurrency limit."""
+        return int(self.limit)
+
+    def _admission_delay(self, tokens: int) -> Optional[float]:
+        """Return 0 if a request may start now, seconds to wait for a pause or bucket,
+        or None if it has to wait for a free slot."""
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            return delay
+        if self.in_flight >= self.concurrency:
+            return None
+        delay = 0.0
+        if self.request_bucket is not None:
+            delay = self.request_bucket.delay(1)
+        if self.token_bucket is not None and tokens:
+            delay = max(delay, self.token_bucket.delay(tokens))
+        return delay
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """Wait until a request estimated at ``tokens`` tokens may start."""
+        started = time.perf_counter()
+        while True:
+            delay = self._admission_delay(tokens)
+            if delay == 0:
+                break
+            # Woken early by a released slot, otherwise when the pause or bucket allows
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            self.metrics.set_gauge("queue_depth", len(self._waiters), queue=f"rate_limit_{self.name}")
+            try:
+                await asyncio.wait({waiter}, timeout=delay)
+            finally:
+                if not waiter.done():
+                    waiter.cancel()
+                    self._waiters.remove(waiter)
+        self.in_flight += 1
+        if self.request_bucket is not None:
+            self.request_bucket.take(1)
+        if self.token_bucket is not None and tokens:
+            self.token_bucket.take(tokens)
+        self.metrics.observe("rate_limit_wait_seconds", time.perf_counter() - started, limiter=self.name)
+
+    def release(self) -> None:
+        """Free a slot taken by ``acquire`` and wake as many waiters as there are free slots."""
+        self.in_flight -= 1
+        for _ in range(max(0, self.concurrency - self.in_flight)):
+            if not self._waiters:
+                break
+            self._waiters.popleft().set_result(None)
+        self.metrics.set_gauge("queue_depth", len(self._waiters), queue=f"rate_limit_{self.name}")
+
+    @asynccontextmanager
+    async def slot(self, tokens: int = 0) -> AsyncIterator[None]:
+        """Hold a request slot for the duration of the ``async with`` block."""
+        await self.acquire(tokens)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def charge_tokens(self, tokens: int) -> None:
+        """Charge the TPM bucket for tokens not covered by the estimate passed to ``acquire``."""
+        if self.token_bucket is not None and tokens > 0:
+            self.token_bucket.take(tokens)
+
+    def on_success(self) -> None:
+        """Additive increase after a successful request; call it before releasing the slot."""
+        if self.limit >= self.max_concurrency:
+            return
+        # Slow start doubles the limit per round trip; afterwards it grows by one per round trip
+        self.limit = min(self.max_concurrency, self.limit + (1.0 if not self.throttled else 1.0 / self.limit))
+        self.metrics.set_gauge("rate_limit_concurrency", self.concurrency, limiter=self.name)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        """Multiplicative decrease after a 429, pausing new requests for ``retry_after`` seconds."""
+        now = time.monotonic()
+        self.throttled = True
+        self.metrics.inc("rate_limit_throttled_total", limiter=self.name)
+        if retry_after:
+            self._paused_until = max(self._paused_until, now + retry_after)
+        if now - self._last_decrease < self.decrease_cooldown:
+            return
+        self._last_decrease = now
+        previous = self.concurrency
+        self.limit = max(float(self.min_concurrency), self.limit * self.decrease_factor)
+        self.metrics.set_gauge("rate_limit_concurrency", self.concurrency, limiter=self.name)
+        logger.warning(
+            f"Rate limited ({self.name}): concurrency {previous} -> {self.concurrency}"
+            + (f", pausing {retry_after:.1f}s" if retry_after else "")
+        )
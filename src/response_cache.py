@@ -0,0 +1,150 @@
+"""Persistent SQLite cache of target-model responses.
+
+Responses are keyed by (model, system prompt, user prompt, sampling params),
+so a vanilla baseline is requested once and reused by every later dataset or
+strategy run over the same prompts.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from src.cache import DEFAULT_CACHE_DIR, text_sha256
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESPONSE_CACHE_PATH = os.path.join(DEFAULT_CACHE_DIR, "responses.sqlite3")
+# Hits whose access times are buffered before they are written in one transaction
+ACCESS_FLUSH_SIZE = 256
+
+
+class ResponseCache:
+    """SQLite-backed response cache with TTL/size eviction and hit/miss counters."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_RESPONSE_CACHE_PATH,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None
+    ):
+        """Initialize the cache, creating the database if needed.
+
+        Args:
+            path: SQLite database file.
+            ttl: Seconds after which an entry expires. None keeps entries forever.
+            max_entries: Maximum number of entries; least recently used ones are
+                evicted by ``prune``. None for no limit.
+        """
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # Key -> access time of hits not yet written; only LRU eviction reads them
+        self._accessed: Dict[str, float] = {}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, user_prompt: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Hash everything that determines a response into one cache key."""
+        return text_sha256(json.dumps([model, system_prompt, user_prompt, params or {}], sort_keys=True))
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for a key, or None on a miss or expired entry."""
+        row = self._conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+            self.misses += 1
+            return None
+        self._accessed[key] = now
+        if len(self._accessed) >= ACCESS_FLUSH_SIZE:
+            self._flush_accessed()
+            self._conn.commit()
+        self.hits += 1
+        return row[0]
+
+    def _flush_accessed(self) -> None:
+        """Write buffered access times; the caller commits."""
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._accessed.items()]
+            )
+            self._accessed.clear()
+
+    def put(self, key: str, model: str, response: str) -> None:
+        """Store a response, replacing any previous entry for the key."""
+        now = time.time()
+        self._accessed.pop(key, None)
+        self._flush_accessed()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO responses (key, model, response, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, model, response, now, now)
+        )
+        self._conn.commit()
+
+    def prune(self) -> int:
+        """Delete expired entries, then least recently used ones above ``max_entries``.
+
+        Returns:
+            Number of entries removed.
+        """
+        self._flush_accessed()
+        removed = 0
+        if self.ttl is not None:
+            removed += self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+        if self.max_entries is not None:
+            removed += self._conn.execute(
+                """DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,)
+            ).rowcount
+        self._conn.commit()
+        if removed:
+            logger.info(f"Evicted {removed} entries from response cache {self.path}")
+        return removed
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for this session and the current entry count."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self),
+        }
+
+    def close(self) -> int:
+        """Apply eviction limits and close the database.
+
+        Returns:
+            Number of entries removed by the final ``prune``.
+        """
+        removed = self.prune()
+        self._conn.close()
+        return removed
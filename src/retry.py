@@ -0,0 +1,100 @@
+"""Retry with jittered exponential backoff for OpenAI-compatible API calls.
+
+Rate limits (429), server errors (5xx), timeouts and dropped connections are
+retried; client errors such as 400/401 fail immediately. A provider's
+Retry-After header is honoured as the minimum delay, and an optional
+RateLimiter is told about every success and throttle.
+"""
+
+import asyncio
+import logging
+import random
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from src.metrics import MetricsRegistry, get_registry
+from src.rate_limit import RateLimiter, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 429, 500, 502, 503, 504})
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 60.0
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Return True if an API error is transient and worth retrying."""
+    from openai import APIConnectionError, APIStatusError
+
+    if isinstance(error, APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    # Also covers APITimeoutError, which subclasses APIConnectionError
+    return isinstance(error, APIConnectionError)
+
+
+def backoff_delay(attempt: int, base_delay: float = DEFAULT_BASE_DELAY, max_delay: float = DEFAULT_MAX_DELAY) -> float:
+    """Return a "full jitter" delay for the given zero-based retry attempt."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+async def call_with_retries(
+    call: Callable[[], Awaitable[T]],
+    description: str = "API call",
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    base_delay: float = DEFAULT_BASE_DELAY,
+    max_delay: float = DEFAULT_MAX_DELAY,
+    metrics: Optional[MetricsRegistry] = None,
+    limiter: Optional[RateLimiter] = None,
+    tokens: int = 0
+) -> T:
+    """Await ``call()``, retrying transient API errors with jittered exponential backoff.
+
+    Args:
+        call: Zero-argument coroutine factory; it is called again for every attempt.
+        description: Label used in retry log messages.
+        max_retries: Maximum number of retries after the first attempt.
+        base_delay: Backoff ceiling of the first retry, in seconds.
+        max_delay: Upper bound of any single backoff, in seconds.
+        metrics: Registry counting retries as ``api_retries_total``. None uses the default one.
+        limiter: Shared rate limiter; every attempt holds one of its slots.
+        tokens: Estimated tokens of one attempt, charged to the limiter's TPM bucket.
+
+    Returns:
+        The result of the first successful attempt.
+
+    Raises:
+        The last error, if it is not retryable or retries are exhausted.
+    """
+    # Imported here so modules using retries don't pay for openai at import time
+    from openai import APIStatusError
+
+    attempt = 0
+    while True:
+        try:
+            if limiter is None:
+                return await call()
+            async with limiter.slot(tokens):
+                try:
+                    result = await call()
+                except APIStatusError as e:
+                    if e.status_code == 429:
+                        limiter.on_throttle(parse_retry_after(e))
+                    raise
+                # Grow the limit before the slot is released so waiters see it
+                limiter.on_success()
+                return result
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            retry_after = parse_retry_after(e)
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, max_delay))
+            attempt += 1
+            (metrics or get_registry()).inc(
+                "api_retries_total", operation=description, status=getattr(e, "status_code", "connection")
+            )
+            logger.warning(f"{description} failed ({e}); retry {attempt}/{max_retries} in {delay:.1f}s")
+            await asyncio.sleep(delay)
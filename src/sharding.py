@@ -0,0 +1,109 @@
+"""Deterministic sharding of prompts across worker processes or machines.
+
+A record belongs to shard ``shard_of(original_prompt, num_shards)``, a stable
+hash that does not depend on input order, Python's hash seed or the machine,
+so independent workers reading the same source agree on the partition and a
+merge can verify that every record ended up in the right shard.
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from src.cache import text_sha256
+from src.loaders import iter_jsonl
+
+SHARD_FIELD = "original_prompt"
+# Longest first, so "x.jsonl.gz" keeps its compound suffix
+_DATASET_SUFFIXES = (".jsonl.gz", ".jsonl.zst", ".json.gz", ".jsonl", ".json", ".parquet", ".gz", ".zst")
+_SHARD_RE = re.compile(r"\.shard-(\d+)-of-(\d+)$")
+
+
+def validate_shard(shard_index: int, num_shards: int) -> None:
+    """Raise ValueError unless ``0 <= shard_index < num_shards``."""
+    if num_shards < 1:
+        raise ValueError(f"num_shards must be at least 1, got {num_shards}")
+    if not 0 <= shard_index < num_shards:
+        raise ValueError(f"shard_index must be in [0, {num_shards}), got {shard_index}")
+
+
+def shard_of(text: str, num_shards: int) -> int:
+    """Return the shard a prompt belongs to."""
+    if num_shards <= 1:
+        return 0
+    return int(text_sha256(text)[:16], 16) % num_shards
+
+
+def record_shard(record: Dict[str, Any], num_shards: int) -> int:
+    """Return the shard of a dataset record, keyed by its original prompt."""
+    return shard_of(record.get(SHARD_FIELD) or record.get("attack_prompt") or "", num_shards)
+
+
+def _split_suffix(path: str) -> Tuple[str, str]:
+    lower = str(path).lower()
+    for suffix in _DATASET_SUFFIXES:
+        if lower.endswith(suffix):
+            return str(path)[:-len(suffix)], str(path)[-len(suffix):]
+    return str(path), ""
+
+
+def shard_path(path: str, shard_index: int, num_shards: int) -> str:
+    """Return the per-shard file name, e.g. ``dataset.jsonl`` -> ``dataset.shard-00002-of-00008.jsonl``.
+
+    With a single shard the path is returned unchanged.
+    """
+    if num_shards <= 1:
+        return str(path)
+    stem, suffix = _split_suffix(path)
+    return f"{stem}.shard-{shard_index:05d}-of-{num_shards:05d}{suffix}"
+
+
+def find_shards(path: str) -> Tuple[Dict[int, Path], Optional[int]]:
+    """Find the shard files written for a base output path.
+
+    Returns:
+        (mapping of shard index to file, number of shards in the file names or
+        None if no shards were found).
+
+    Raises:
+        ValueError: If the shard files disagree on the number of shards.
+    """
+    stem, suffix = _split_suffix(path)
+    base = Path(stem)
+    shards: Dict[int, Path] = {}
+    counts = set()
+    for candidate in base.parent.glob(f"{base.name}.shard-*-of-*{suffix}"):
+        name = candidate.name[:len(candidate.name) - len(suffix)] if suffix else candidate.name
+        match = _SHARD_RE.search(name)
+        if match is None or name[:match.start()] != base.name:
+            continue
+        shards[int(match.group(1))] = candidate
+        counts.add(int(match.group(2)))
+    if len(counts) > 1:
+        raise ValueError(f"Shard files for {path} disagree on the number of shards: {sorted(counts)}")
+    return shards, counts.pop() if counts else None
+
+
+def write_shard(source: str, output_path: str, shard_index: int, num_shards: int) -> int:
+    """Stream the records of one shard from a JSONL dataset into their own file.
+
+    The file is written under a temporary name and renamed when complete, so
+    an existing shard file is always a finished one.
+
+    Returns:
+        Number of records written.
+    """
+    validate_shard(shard_index, num_shards)
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    count = 0
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for record in iter_jsonl(source):
+            if record_shard(record, num_shards) == shard_index:
+                f.write(json.dumps(record) + "\n")
+                count += 1
+    os.replace(tmp_path, output_path)
+    return count
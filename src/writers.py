@@ -0,0 +1,242 @@
+"""Buffered dataset writers with pluggable output formats.
+
+Records are buffered and written in batches, either when the batch is full or
+when the flush interval has elapsed since the last write. After each batch the
+durability policy decides whether data is only handed to Python ("none"),
+flushed to the OS ("flush") or fsynced to disk ("fsync").
+"""
+
+import gzip
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_FORMATS = ("jsonl", "jsonl.gz", "parquet")
+# Formats whose files records can be appended to, as incremental runs do
+APPENDABLE_FORMATS = ("jsonl", "jsonl.gz")
+DURABILITY_POLICIES = ("none", "flush", "fsync")
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+_FORMAT_SUFFIXES = {"jsonl": ".jsonl", "jsonl.gz": ".jsonl.gz", "parquet": ".parquet"}
+
+
+def infer_output_format(path: str) -> str:
+    """Return the output format implied by a file name, defaulting to JSONL."""
+    name = str(path).lower()
+    if name.endswith((".jsonl.gz", ".json.gz", ".gz")):
+        return "jsonl.gz"
+    if name.endswith(".parquet"):
+        return "parquet"
+    return "jsonl"
+
+
+def with_format_suffix(path: str, output_format: str) -> str:
+    """Replace a known dataset suffix of ``path`` with the one matching ``output_format``."""
+    for suffix in sorted(_FORMAT_SUFFIXES.values(), key=len, reverse=True):
+        if str(path).lower().endswith(suffix):
+            return str(path)[:-len(suffix)] + _FORMAT_SUFFIXES[output_format]
+    return str(path) + _FORMAT_SUFFIXES[output_format]
+
+
+def validate_append(path: str, output_format: Optional[str] = None) -> None:
+    """Check that records can be appended to an output, as incremental runs do.
+
+    Raises:
+        ValueError: If the format, given or inferred from ``path``, cannot be appended to.
+    """
+    output_format = output_format or infer_output_format(path)
+    if output_format not in APPENDABLE_FORMATS:
+        raise ValueError(f"{output_format} output cannot be appended to, so it cannot be used with "
+                         f"--incremental; use one of {', '.join(APPENDABLE_FORMATS)}")
+
+
+class DatasetWriter:
+    """Base class buffering records and writing them in batches."""
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: Optional[float] = DEFAULT_FLUSH_INTERVAL,
+        durability: str = "flush",
+        append: bool = False
+    ):
+        """Initialize the writer.
+
+        Args:
+            path: Output file path.
+            batch_size: Number of buffered records that triggers a write.
+            flush_interval: Seconds after which buffered records are written on
+                the next ``write`` call, even if the batch is not full. None disables it.
+            durability: "none", "flush" or "fsync", applied after every batch.
+            append: Add records to an existing file instead of truncating it.
+        """
+        if durability not in DURABILITY_POLICIES:
+            raise ValueError(f"Unknown durability policy: {durability}. Expected one of {DURABILITY_POLICIES}")
+        self.path = Path(path)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.durability = durability
+        self.append = append
+        self.count = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._last_flush = time.monotonic()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """Buffer one record, writing the batch if it is full or overdue."""
+        self._buffer.append(record)
+        self.count += 1
+        overdue = self.flush_interval is not None and time.monotonic() - self._last_flush >= self.flush_interval
+        if len(self._buffer) >= self.batch_size or overdue:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered records and apply the durability policy."""
+        if self._buffer:
+            self._write_batch(self._buffer)
+            self._buffer = []
+            if self.durability != "none":
+                self._sync(self.durability == "fsync")
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        """Write remaining records and close the file."""
+        self.flush()
+        self._close()
+
+    def __enter__(self) -> "DatasetWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _write_batch(self, records: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def _sync(self, fsync: bool) -> None:
+        raise NotImplementedError
+
+    def _close(self) -> None:
+        raise NotImplementedError
+
+
+class JsonlWriter(DatasetWriter):
+    """Plain JSON Lines output."""
+
+    def __init__(self, path: str, **kwargs: Any):
+        super().__init__(path, **kwargs)
+        needs_newline = False
+        if self.append and self.path.exists() and self.path.stat().st_size > 0:
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+        self._file = open(self.path, 'a' if self.append else 'w', encoding='utf-8')
+        if needs_newline:
+            # Terminate a torn line from a killed run so it can't corrupt the next record
+            self._file.write('\n')
+
+    def _write_batch(self, records: List[Dict[str, Any]]) -> None:
+        self._file.write("".join(json.dumps(record, ensure_ascii=False) + '\n' for record in records))
+
+    def _sync(self, fsync: bool) -> None:
+        self._file.flush()
+        if fsync:
+            os.fsync(self._file.fileno())
+
+    def _close(self) -> None:
+        self._file.close()
+
+
+class GzipJsonlWriter(JsonlWriter):
+    """Gzip-compressed JSON Lines output.
+
+    Every flush ends a deflate block, so large batches compress noticeably
+    better than small ones. Appending adds a new gzip member, which gzip
+    readers decompress as one continuous stream.
+    """
+
+    def __init__(self, path: str, **kwargs: Any):
+        DatasetWriter.__init__(self, path, **kwargs)
+        self._raw = open(self.path, 'ab' if self.append else 'wb')
+        self._file = gzip.open(self._raw, 'wt', encoding='utf-8')
+
+    def _sync(self, fsync: bool) -> None:
+        self._file.flush()
+        self._raw.flush()
+        if fsync:
+            os.fsync(self._raw.fileno())
+
+    def _close(self) -> None:
+        self._file.close()
+        self._raw.close()
+
+
+class ParquetWriter(DatasetWriter):
+    """Columnar Parquet output; each batch becomes one row group.
+
+    Requires ``pyarrow``. The schema is taken from the first batch, so use a
+    batch size large enough for row groups to compress well.
+    """
+
+    def __init__(self, path: str, **kwargs: Any):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Parquet output requires the 'pyarrow' package: pip install pyarrow")
+        super().__init__(path, **kwargs)
+        if self.append:
+            validate_append(path, "parquet")
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self._raw = open(self.path, 'wb')
+        self._writer = None
+
+    def _write_batch(self, records: List[Dict[str, Any]]) -> None:
+        if self._writer is None:
+            table = self._pa.Table.from_pylist(records)
+            self._writer = self._pq.ParquetWriter(self._raw, table.schema, compression="zstd")
+        else:
+            table = self._pa.Table.from_pylist(records, schema=self._writer.schema)
+        self._writer.write_table(table)
+
+    def _sync(self, fsync: bool) -> None:
+        self._raw.flush()
+        if fsync:
+            os.fsync(self._raw.fileno())
+
+    def _close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._raw.close()
+
+
+_WRITERS = {
+    "jsonl": JsonlWriter,
+    "jsonl.gz": GzipJsonlWriter,
+    "parquet": ParquetWriter,
+}
+
+
+def open_writer(path: str, output_format: Optional[str] = None, **kwargs: Any) -> DatasetWriter:
+    """Create a writer for the given format.
+
+    Args:
+        path: Output file path.
+        output_format: One of OUTPUT_FORMATS. None infers it from the file name.
+        **kwargs: batch_size, flush_interval, durability and append, see DatasetWriter.
+
+    Returns:
+        An open DatasetWriter; use it as a context manager or call ``close``.
+    """
+    output_format = output_format or infer_output_format(path)
+    if output_format not in _WRITERS:
+        raise ValueError(f"Unknown output format: {output_format}. Expected one of {OUTPUT_FORMATS}")
+    return _WRITERS[output_format](path, **kwargs)
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The scripts and packages are imported from the repository root, as when run from it
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
@@ -0,0 +1,64 @@
+import json
+import os
+import re
+
+import pytest
+from art import text2art
+
+from src.ascii_art import AsciiArtRenderer, GlyphAtlas, installed_art_version
+from tests.conftest import ROOT
+
+VANILLA_PROMPTS = os.path.join(ROOT, 'generator', 'vanilla_prompts.jsonl')
+# Plain, case-folding, uppercase-only, mirrored and multi-row unicode fonts
+FONTS = ['block', 'standard', 'small', '3-d', 'mirror', 'mirror_flip', 'fancy1', 'tarty1', 'bubble', 'univers']
+
+
+def vanilla_words():
+    words = set()
+    with open(VANILLA_PROMPTS, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                words.update(re.findall(r'\b\w+\b', json.loads(line)['vanilla']))
+    return sorted(words)
+
+
+WORDS = vanilla_words()
+
+
+@pytest.mark.parametrize('font', FONTS)
+def test_render_matches_text2art(font):
+    renderer = AsciiArtRenderer()
+    mismatches = [word for word in WORDS if renderer.render(word, font) != text2art(word, font=font)]
+    assert mismatches == []
+
+
+@pytest.mark.parametrize('word', ['', 'a b', 'tab\there', 'two\nlines', 'Ünïcode', '42!?'])
+@pytest.mark.parametrize('font', ['block', 'mirror', 'fancy1'])
+def test_render_matches_text2art_on_edge_cases(word, font):
+    assert AsciiArtRenderer().render(word, font) == text2art(word, font=font)
+
+
+def test_persisted_atlas_matches_text2art(tmp_path):
+    AsciiArtRenderer(str(tmp_path)).render('warm', 'block')
+    assert (tmp_path / 'block.json').exists()
+
+    renderer = AsciiArtRenderer(str(tmp_path))
+    assert [word for word in WORDS if renderer.render(word, 'block') != text2art(word, font='block')] == []
+
+
+def test_stale_atlas_is_rebuilt(tmp_path):
+    path = tmp_path / 'block.json'
+    fresh = GlyphAtlas.build('block')
+    GlyphAtlas('block', {char: ['?'] * len(glyph) for char, glyph in fresh.glyphs.items()},
+               fresh.case, '0.0').save(path)
+
+    assert AsciiArtRenderer(str(tmp_path)).render('stale', 'block') == text2art('stale', font='block')
+    assert GlyphAtlas.load(path).art_version == installed_art_version()
+
+
+def test_current_atlas_is_loaded_from_disk(tmp_path):
+    fresh = GlyphAtlas.build('block')
+    marked = {**fresh.glyphs, 'x': ['X'] * len(fresh.glyphs['x'])}
+    GlyphAtlas('block', marked, fresh.case, fresh.art_version).save(tmp_path / 'block.json')
+
+    assert AsciiArtRenderer(str(tmp_path)).atlas('block').glyphs['x'] == marked['x']
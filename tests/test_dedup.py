@@ -0,0 +1,118 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from dedup_dataset import dedup_dataset
+from run_generation import run_generation
+from src.dedup import DedupIndex
+from src.loaders import iter_records
+from src.writers import open_writer
+from tests.conftest import ROOT
+
+VANILLA_PROMPTS = os.path.join(ROOT, 'generator', 'vanilla_prompts.jsonl')
+
+
+def read_prompts(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line)['original_prompt'] for line in f if line.strip()]
+
+
+def write_prompts(path, prompts):
+    with open(path, 'w', encoding='utf-8') as f:
+        for prompt in prompts:
+            f.write(json.dumps({'original_prompt': prompt}) + '\n')
+
+
+def distinct_prompts(count):
+    prompts = []
+    with open(VANILLA_PROMPTS, encoding='utf-8') as f:
+        for line in f:
+            prompts.append(json.loads(line)['vanilla'])
+    index = DedupIndex(':memory:')
+    unique = [prompt for prompt in prompts if index.check(prompt) is None]
+    index.close()
+    return unique[:count]
+
+
+def test_generate_then_dedup_keeps_every_row(tmp_path):
+    output = str(tmp_path / 'gen.jsonl')
+    index_path = str(tmp_path / 'dedup.sqlite3')
+    asyncio.run(run_generation(
+        output=output,
+        dataset=VANILLA_PROMPTS,
+        column='vanilla',
+        max_samples=30,
+        max_concurrent=2,
+        executor='thread',
+        seed=1,
+        dedup_index=index_path
+    ))
+    generated = read_prompts(output)
+    assert len(generated) == 30
+
+    assert dedup_dataset(output, index_path=index_path) == 0
+    assert read_prompts(output) == generated
+
+
+def test_dedup_twice_keeps_filtered_rows(tmp_path):
+    prompts = distinct_prompts(100)
+    near_duplicates = [prompt.upper() + ' please' for prompt in prompts[:5]]
+    path = str(tmp_path / 'dataset.jsonl')
+    index_path = str(tmp_path / 'dedup.sqlite3')
+    write_prompts(path, prompts + near_duplicates)
+
+    assert dedup_dataset(path, index_path=index_path) == 0
+    assert read_prompts(path) == prompts
+    assert dedup_dataset(path, index_path=index_path) == 0
+    assert read_prompts(path) == prompts
+
+
+def test_repeated_rows_are_dropped_even_if_indexed(tmp_path):
+    prompts = distinct_prompts(10)
+    path = str(tmp_path / 'dataset.jsonl')
+    index_path = str(tmp_path / 'dedup.sqlite3')
+    write_prompts(path, prompts)
+    assert dedup_dataset(path, index_path=index_path) == 0
+
+    write_prompts(path, prompts + prompts[:3])
+    assert dedup_dataset(path, index_path=index_path) == 0
+    assert read_prompts(path) == prompts
+
+
+def test_new_batch_is_checked_against_earlier_batches(tmp_path):
+    prompts = distinct_prompts(40)
+    first, second = str(tmp_path / 'first.jsonl'), str(tmp_path / 'second.jsonl')
+    index_path = str(tmp_path / 'dedup.sqlite3')
+    write_prompts(first, prompts[:30])
+    write_prompts(second, [prompt + '!' for prompt in prompts[20:30]] + prompts[30:])
+
+    assert dedup_dataset(first, index_path=index_path) == 0
+    assert dedup_dataset(second, index_path=index_path) == 0
+    assert read_prompts(second) == prompts[30:]
+
+
+def test_claim_skips_already_indexed_prompts(tmp_path):
+    index = DedupIndex(str(tmp_path / 'dedup.sqlite3'))
+    assert not index.claim('write a poem about the sea at night')
+    index.confirm('write a poem about the sea at night')
+    assert not index.claim('never written, so dropped on commit')
+    index.commit()
+    assert len(index) == 1
+    assert index.claim('Write a poem about the sea at night!')
+    index.close()
+
+
+@pytest.mark.parametrize('suffix', ['.jsonl', '.jsonl.gz', '.parquet'])
+def test_dedup_reads_and_writes_every_output_format(tmp_path, suffix):
+    if suffix == '.parquet':
+        pytest.importorskip('pyarrow')
+    prompts = distinct_prompts(20)
+    path = str(tmp_path / f'dataset{suffix}')
+    with open_writer(path) as writer:
+        for prompt in prompts + [prompt.upper() for prompt in prompts[:4]]:
+            writer.write({'original_prompt': prompt})
+
+    assert dedup_dataset(path, index_path=None) == 0
+    assert [record['original_prompt'] for record in iter_records(path)] == prompts
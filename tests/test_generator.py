@@ -0,0 +1,88 @@
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+from generator.generator import DatasetGenerator
+from tests.conftest import ROOT
+
+VANILLA_PROMPTS = os.path.join(ROOT, 'generator', 'vanilla_prompts.jsonl')
+STRATEGY_PATH = os.path.join(ROOT, 'generator', 'extracted_strategy.json')
+
+
+def load_strategy():
+    with open(STRATEGY_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+async def collect(generator, max_samples):
+    return [pair async for pair in generator.generate_adversarial_pairs(VANILLA_PROMPTS, 'vanilla', max_samples)]
+
+
+def failing_generator():
+    generator = DatasetGenerator(load_strategy(), max_concurrent=1)
+    apply_artprompt = generator._apply_artprompt
+
+    def apply_or_fail(prompt, rng=None):
+        if prompt == 'fail':
+            raise ValueError('cannot transform')
+        return apply_artprompt(prompt, rng)
+
+    generator._apply_artprompt = apply_or_fail
+    return generator
+
+
+def test_chunk_matches_batch():
+    generator = failing_generator()
+    prompts = ['Explain how vaccines work', 'Describe the history of Rome']
+    attack_prompts = generator.transform_batch(prompts, seed='1:0')
+
+    chunk = generator._transform_chunk(prompts + ['fail'], seed='1:0')
+    assert chunk == [*((prompt, attack, None) for prompt, attack in zip(prompts, attack_prompts)),
+                     ('fail', None, 'cannot transform')]
+
+
+def test_batch_raises_transform_errors():
+    with pytest.raises(ValueError, match='cannot transform'):
+        failing_generator().transform_batch(['Explain how vaccines work', 'fail'], seed=1)
+
+
+def test_seeded_output_is_the_same_for_every_executor():
+    outputs = [
+        asyncio.run(collect(DatasetGenerator(load_strategy(), max_concurrent=2, executor=executor, seed=7), 40))
+        for executor in ('thread', 'process')
+    ]
+    assert len(outputs[0]) == 40
+    assert outputs[0] == outputs[1]
+
+
+def test_closing_early_does_not_block_the_event_loop():
+    generator = DatasetGenerator(load_strategy(), max_concurrent=2, executor='thread', chunk_size=1)
+    transform_chunk = generator._transform_chunk
+
+    def slow_transform_chunk(prompts, seed=None):
+        time.sleep(0.3)
+        return transform_chunk(prompts, seed)
+
+    generator._transform_chunk = slow_transform_chunk
+
+    async def run():
+        pairs = generator.generate_adversarial_pairs(VANILLA_PROMPTS, 'vanilla')
+        await anext(pairs)
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        # The remaining in-flight chunks take about 0.3 s to finish
+        await pairs.aclose()
+        ticker.cancel()
+        return ticks
+
+    assert asyncio.run(run()) >= 5
@@ -0,0 +1,43 @@
+import asyncio
+import os
+
+import pytest
+
+import run_generation
+from src.loaders import iter_jsonl
+from tests.conftest import ROOT
+
+VANILLA_PROMPTS = os.path.join(ROOT, 'generator', 'vanilla_prompts.jsonl')
+
+
+def generate(output, max_samples, **kwargs):
+    asyncio.run(run_generation.run_generation(
+        output=output, dataset=VANILLA_PROMPTS, column='vanilla', max_samples=max_samples,
+        max_concurrent=2, executor='thread', seed=1, incremental=True, **kwargs
+    ))
+
+
+@pytest.mark.parametrize('output', ['dataset.jsonl', 'dataset.jsonl.gz'])
+def test_incremental_run_appends_missing_records(tmp_path, output):
+    output = str(tmp_path / output)
+    generate(output, 5)
+    generate(output, 5)
+
+    prompts = [record['original_prompt'] for record in iter_jsonl(output)]
+    assert len(prompts) == len(set(prompts)) == 10
+
+
+@pytest.mark.parametrize('options', [{'output_format': 'parquet'}, {}])
+def test_incremental_parquet_is_rejected_up_front(tmp_path, options):
+    output = str(tmp_path / 'dataset.parquet')
+    with pytest.raises(ValueError, match='--incremental'):
+        generate(output, 5, **options)
+    assert os.listdir(tmp_path) == []
+
+
+def test_incremental_parquet_is_rejected_by_the_cli(tmp_path, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        run_generation.main(['--incremental', '--output', str(tmp_path / 'dataset.jsonl'),
+                             '--output-format', 'parquet'])
+    assert exit_info.value.code == 2
+    assert 'parquet output cannot be appended to' in capsys.readouterr().err
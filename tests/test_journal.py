@@ -0,0 +1,88 @@
+import json
+import os
+
+import run_attack_prompts
+from src.journal import JOURNAL_SUFFIX, EvaluationJournal
+from src.loaders import iter_jsonl
+from src.offset_index import OffsetIndex
+from tests.test_offset_index import write_dataset
+from tests.test_run_attack_prompts import FakeClient, evaluate
+
+FIELDS = run_attack_prompts.response_fields()
+PROMPTS = ['plain ascii', 'Привет, мир — ünïcödé ✓', '数据集 🙂', 'one more', 'последний']
+
+
+class FailingClient(FakeClient):
+    """Fails every request for the given prompts, as if the run was cut short before them."""
+
+    def __init__(self, failing):
+        super().__init__()
+        self.failing = failing
+
+    async def create(self, model, messages, **kwargs):
+        if messages[-1]['content'] in self.failing:
+            raise RuntimeError('connection dropped')
+        return await super().create(model, messages, **kwargs)
+
+
+def dataset_records():
+    return [{'original_prompt': prompt, 'attack_prompt': f'[MASK] {prompt}'} for prompt in PROMPTS]
+
+
+def test_journal_restores_by_offset(tmp_path):
+    path = str(tmp_path / 'dataset.jsonl')
+    records = dataset_records()
+    write_dataset(path, records)
+    journal = EvaluationJournal(path)
+    journal.load(FIELDS, len(records))
+    journal.append(1, 'vanilla_response', PROMPTS[1], 'ответ 1')
+    journal.append(1, 'vanilla_response', PROMPTS[1], 'ответ 2')
+    journal.append(2, 'target_response', 'a prompt the record no longer has', 'stale')
+    journal.close()
+    # Torn final line of a killed run
+    with open(path + JOURNAL_SUFFIX, 'a', encoding='utf-8') as f:
+        f.write('{"index": 3, "field": "vanilla_res')
+
+    journal = EvaluationJournal(path)
+    assert journal.load(FIELDS, len(records)) == 2
+    assert journal.restore(1, records[1]) == 1
+    assert records[1]['vanilla_response'] == 'ответ 2'
+    assert journal.restore(2, records[2]) == 0
+    journal.close()
+
+
+def test_interrupted_run_resumes_and_compacts(tmp_path, monkeypatch, capsys):
+    path = str(tmp_path / 'dataset.jsonl')
+    write_dataset(path, dataset_records())
+    OffsetIndex(path).load()
+
+    evaluate(monkeypatch, path, FailingClient({PROMPTS[3], f'[MASK] {PROMPTS[4]}'}), compact=False)
+    assert os.path.exists(path + JOURNAL_SUFFIX)
+    # Nothing is folded in yet; --show applies the journal on the fly
+    assert not any(record.get('vanilla_response') for record in iter_jsonl(path))
+    capsys.readouterr()
+    run_attack_prompts.main(['--input', path, '--show', '2'])
+    shown = capsys.readouterr().out
+    assert '--- record 2/5 ---' in shown
+    assert json.dumps(f'refused: {PROMPTS[1]}', ensure_ascii=False) in shown
+
+    client = FakeClient()
+    evaluate(monkeypatch, path, client)
+    # Only the two prompts that failed before are requested again
+    assert len(client.completed) == 2
+    assert not os.path.exists(path + JOURNAL_SUFFIX)
+
+    records = list(iter_jsonl(path))
+    assert [record['original_prompt'] for record in records] == PROMPTS
+    for record in records:
+        assert record['vanilla_response'] == f"refused: {record['original_prompt']}"
+        assert record['target_response'] == f"refused: {record['attack_prompt']}"
+
+    # Compaction rewrote the sidecar for the new file; it matches a fresh scan
+    offsets = OffsetIndex(path)
+    assert offsets.load() == 5
+    assert [offsets.read(i) for i in range(5)] == records
+    saved = list(offsets.offsets)
+    offsets.close()
+    assert offsets.rebuild() == 5
+    assert list(offsets.offsets) == saved
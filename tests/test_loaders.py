@@ -0,0 +1,41 @@
+import asyncio
+import os
+
+import pytest
+
+from generator.generator import DatasetGenerator
+from src.loaders import is_local_source
+from tests.conftest import ROOT
+from tests.test_generator import load_strategy
+
+VANILLA_PROMPTS = os.path.join(ROOT, 'generator', 'vanilla_prompts.jsonl')
+
+
+@pytest.mark.parametrize('source', [
+    VANILLA_PROMPTS,
+    'generator/vanila_prompts.jsonl',
+    'prompts.jsonl.gz',
+    'data/*.jsonl.gz',
+    './prompts',
+    '/data/prompts',
+    'data/batches/prompts',
+])
+def test_paths_are_local_even_if_missing(source):
+    assert is_local_source(source)
+
+
+@pytest.mark.parametrize('source', ['walledai/AdvBench', 'squad'])
+def test_hub_names_are_not_local(source):
+    assert not is_local_source(source)
+
+
+@pytest.mark.parametrize('source', ['generator/vanila_prompts.jsonl', 'missing/*.jsonl.gz'])
+def test_missing_local_dataset_raises_file_not_found(source):
+    generator = DatasetGenerator(load_strategy(), max_concurrent=1, executor='thread')
+
+    async def first_pair():
+        async for pair in generator.generate_adversarial_pairs(source, 'vanilla', 1):
+            return pair
+
+    with pytest.raises(FileNotFoundError, match='No dataset files match'):
+        asyncio.run(first_pair())
@@ -0,0 +1,33 @@
+import asyncio
+import os
+
+import pytest
+
+from merge_shards import merge_shards
+from run_generation import run_generation
+from src.loaders import iter_records
+from tests.conftest import ROOT
+
+VANILLA_PROMPTS = os.path.join(ROOT, 'generator', 'vanilla_prompts.jsonl')
+
+
+def generate_shards(base_path, output_format, num_shards=2):
+    for shard_index in range(num_shards):
+        asyncio.run(run_generation(
+            output=base_path, dataset=VANILLA_PROMPTS, column='vanilla', max_samples=10, max_concurrent=2,
+            executor='thread', seed=1, output_format=output_format, num_shards=num_shards, shard_index=shard_index
+        ))
+
+
+@pytest.mark.parametrize('output_format', ['jsonl', 'jsonl.gz', 'parquet'])
+def test_merge_reads_shards_in_their_format(tmp_path, output_format):
+    if output_format == 'parquet':
+        pytest.importorskip('pyarrow')
+    suffix = {'jsonl': '.jsonl', 'jsonl.gz': '.jsonl.gz', 'parquet': '.parquet'}[output_format]
+    base_path = str(tmp_path / f'dataset{suffix}')
+    generate_shards(base_path, output_format)
+    merged = str(tmp_path / 'merged.jsonl')
+
+    assert merge_shards(base_path, output=merged) == 0
+    prompts = [record['original_prompt'] for record in iter_records(merged)]
+    assert len(prompts) == len(set(prompts)) == 20
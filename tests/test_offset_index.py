@@ -0,0 +1,72 @@
+import json
+import os
+
+import pytest
+
+from src.offset_index import OffsetIndex
+
+RECORDS = [
+    {'original_prompt': 'plain ascii'},
+    {'original_prompt': 'Привет, мир — ünïcödé ✓'},
+    {'original_prompt': '数据集 🙂', 'target_response': ''},
+]
+
+
+def write_dataset(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def test_read_by_position_with_non_ascii_records(tmp_path):
+    path = str(tmp_path / 'dataset.jsonl')
+    write_dataset(path, RECORDS)
+
+    offsets = OffsetIndex(path)
+    assert offsets.load() == 3
+    assert os.path.exists(path + '.offsets')
+    assert [offsets.read(i) for i in (2, 0, 1)] == [RECORDS[2], RECORDS[0], RECORDS[1]]
+    assert list(offsets) == RECORDS
+    assert sum(offsets.size(i) for i in range(3)) == os.path.getsize(path)
+    with pytest.raises(IndexError):
+        offsets.read(3)
+    offsets.close()
+
+
+def test_sidecar_is_reused_until_the_dataset_changes(tmp_path, monkeypatch):
+    path = str(tmp_path / 'dataset.jsonl')
+    write_dataset(path, RECORDS)
+    OffsetIndex(path).load()
+
+    rebuilds = []
+    rebuild = OffsetIndex.rebuild
+    monkeypatch.setattr(OffsetIndex, 'rebuild', lambda self: rebuilds.append(1) or rebuild(self))
+    assert OffsetIndex(path).load() == 3
+    assert rebuilds == []
+
+    # A new record changes the size
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'original_prompt': 'appended'}) + '\n')
+    offsets = OffsetIndex(path)
+    assert offsets.load() == 4
+    assert offsets.read(3) == {'original_prompt': 'appended'}
+    offsets.close()
+    assert len(rebuilds) == 1
+
+    # Same size, new content: only the modification time tells
+    write_dataset(path, [{'original_prompt': 'APPENDED'}] + RECORDS)
+    os.utime(path, ns=(1, 1))
+    offsets = OffsetIndex(path)
+    assert offsets.load() == 4
+    assert offsets.read(0) == {'original_prompt': 'APPENDED'}
+    offsets.close()
+    assert len(rebuilds) == 2
+
+
+def test_blank_lines_are_not_records(tmp_path):
+    path = tmp_path / 'dataset.jsonl'
+    path.write_text('\n{"a": 1}\n\n{"a": 2}\n\n', encoding='utf-8')
+    offsets = OffsetIndex(str(path))
+    assert offsets.load() == 2
+    assert offsets.read(1) == {'a': 2}
+    offsets.close()
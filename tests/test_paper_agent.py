@@ -0,0 +1,34 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from src import paper_agent
+from src.cache import PageTextCache, StrategyCache
+from src.paper_agent import PaperAgent
+from tests.conftest import ROOT
+
+PDFS = [os.path.join(ROOT, 'Art.pdf'), os.path.join(ROOT, 'Poetry.pdf')]
+
+
+def test_concurrent_extractions_share_one_bounded_pool(tmp_path, monkeypatch):
+    pools = []
+
+    class RecordingPool(ProcessPoolExecutor):
+        def __init__(self, max_workers=None, **kwargs):
+            pools.append(max_workers)
+            super().__init__(max_workers=max_workers, **kwargs)
+
+    monkeypatch.setattr(paper_agent, 'ProcessPoolExecutor', RecordingPool)
+
+    async def run():
+        agent = PaperAgent(api_key='test', cache=StrategyCache(str(tmp_path / 'strategies')),
+                           page_cache=PageTextCache(str(tmp_path / 'pages')), pdf_workers=2, pdf_batch_size=1)
+        try:
+            return await asyncio.gather(*(agent._prepare(pdf, refresh=True) for pdf in PDFS))
+        finally:
+            await agent.close()
+            assert agent._pdf_pool is None
+
+    prepared = asyncio.run(run())
+    assert all(paper_text for _, _, paper_text in prepared)
+    assert pools == [2]
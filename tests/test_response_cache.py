@@ -0,0 +1,44 @@
+import sqlite3
+import time
+
+from src import response_cache
+from src.response_cache import ResponseCache
+
+
+def accessed_at(path, key):
+    with sqlite3.connect(path) as conn:
+        return conn.execute('SELECT accessed_at FROM responses WHERE key = ?', (key,)).fetchone()[0]
+
+
+def test_hits_are_written_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(response_cache, 'ACCESS_FLUSH_SIZE', 3)
+    path = str(tmp_path / 'responses.sqlite3')
+    cache = ResponseCache(path)
+    for key in 'abc':
+        cache.put(key, 'model', f'response {key}')
+    written = {key: accessed_at(path, key) for key in 'abc'}
+    time.sleep(0.01)
+
+    assert cache.get('a') == 'response a' and cache.get('b') == 'response b'
+    assert not cache._conn.in_transaction
+    assert accessed_at(path, 'a') == written['a']
+
+    cache.get('c')
+    assert all(accessed_at(path, key) > written[key] for key in 'abc')
+    cache.close()
+
+
+def test_eviction_uses_buffered_hits(tmp_path):
+    path = str(tmp_path / 'responses.sqlite3')
+    cache = ResponseCache(path, max_entries=2)
+    for key in 'abc':
+        cache.put(key, 'model', f'response {key}')
+        time.sleep(0.01)
+    cache.get('a')
+
+    assert cache.close() == 1
+    cache = ResponseCache(path)
+    assert cache.get('a') == 'response a'
+    assert cache.get('b') is None
+    assert cache.get('c') == 'response c'
+    cache.close()
@@ -0,0 +1,75 @@
+import asyncio
+import json
+import types
+
+import run_attack_prompts
+from src.journal import JOURNAL_SUFFIX
+from src.loaders import iter_jsonl
+from src.rate_limit import RateLimiter
+
+FAST_MODEL = 'fast/model'
+SLOW_MODEL = 'slow/model'
+
+
+class FakeClient:
+    def __init__(self, latency=None):
+        self.chat = types.SimpleNamespace(completions=self)
+        # Model -> seconds each request takes
+        self.latency = latency or {}
+        # Models in the order their requests completed
+        self.completed = []
+
+    async def create(self, model, messages, **kwargs):
+        await asyncio.sleep(self.latency.get(model, 0))
+        self.completed.append(model)
+        message = types.SimpleNamespace(content=f"refused: {messages[-1]['content']}")
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+    async def close(self):
+        pass
+
+
+def test_progress_messages_name_attack_and_vanilla_prompts(capsys):
+    record = {'original_prompt': 'hello', 'attack_prompt': 'h[MASK]llo'}
+    limiters = {run_attack_prompts.MODEL_NAME: RateLimiter(max_concurrency=2)}
+
+    stored = asyncio.run(run_attack_prompts.evaluate_record(FakeClient(), limiters, None, record, 0, 1))
+
+    assert stored == 2
+    assert record['target_response'] == 'refused: h[MASK]llo'
+    assert record['vanilla_response'] == 'refused: hello'
+    output = capsys.readouterr().out
+    assert 'Processed attack prompt for record 1/1' in output
+    assert 'Processed vanilla prompt for record 1/1' in output
+
+
+def write_dataset(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def evaluate(monkeypatch, path, client, **kwargs):
+    monkeypatch.setattr(run_attack_prompts, 'OPENROUTER_API_KEY', 'test')
+    monkeypatch.setattr(run_attack_prompts, 'make_client', lambda base_url: client)
+    asyncio.run(run_attack_prompts.process_dataset(input_file=str(path), cache_path=None, **kwargs))
+
+
+def test_slow_model_does_not_hold_up_fast_model(tmp_path, monkeypatch):
+    path = tmp_path / 'dataset.jsonl'
+    write_dataset(path, [{'original_prompt': f'prompt {i}', 'attack_prompt': f'attack {i}'} for i in range(20)])
+    client = FakeClient({FAST_MODEL: 0.005, SLOW_MODEL: 0.1})
+
+    evaluate(monkeypatch, path, client, models=[FAST_MODEL, SLOW_MODEL], max_concurrent=4, compact=False)
+
+    with open(str(path) + JOURNAL_SUFFIX, encoding='utf-8') as f:
+        fields = [json.loads(line)['field'] for line in f]
+    assert len(fields) == 80
+    models = [field.split(':', 1)[1] for field in fields]
+    assert models[:40] == [FAST_MODEL] * 40
+
+    run_attack_prompts.compact_journal(str(path), [FAST_MODEL, SLOW_MODEL])
+    for i, record in enumerate(iter_jsonl(str(path))):
+        for model in (FAST_MODEL, SLOW_MODEL):
+            assert record[f'target_response:{model}'] == f'refused: attack {i}'
+            assert record[f'vanilla_response:{model}'] == f'refused: prompt {i}'
@@ -0,0 +1,30 @@
+import asyncio
+import os
+
+import run_attack_prompts
+import run_streaming
+from src.loaders import iter_jsonl
+from tests.conftest import ROOT
+from tests.test_run_attack_prompts import FAST_MODEL, SLOW_MODEL, FakeClient
+
+VANILLA_PROMPTS = os.path.join(ROOT, 'generator', 'vanilla_prompts.jsonl')
+
+
+def test_fast_model_is_not_throttled_by_slow_model(tmp_path, monkeypatch):
+    client = FakeClient({FAST_MODEL: 0.005, SLOW_MODEL: 0.1})
+    monkeypatch.setattr(run_attack_prompts, 'OPENROUTER_API_KEY', 'test')
+    monkeypatch.setattr(run_streaming, 'make_client', lambda base_url: client)
+    output = str(tmp_path / 'dataset.jsonl')
+
+    asyncio.run(run_streaming.run_streaming(
+        output=output, dataset=VANILLA_PROMPTS, max_samples=20, executor='thread', seed=1,
+        models=[FAST_MODEL, SLOW_MODEL], max_concurrent=4, cache_path=None
+    ))
+
+    assert client.completed[:40] == [FAST_MODEL] * 40
+    records = list(iter_jsonl(output))
+    assert len(records) == 20
+    for record in records:
+        for model in (FAST_MODEL, SLOW_MODEL):
+            assert record[f'target_response:{model}'] == f"refused: {record['attack_prompt']}"
+            assert record[f'vanilla_response:{model}'] == f"refused: {record['original_prompt']}"